@@ -0,0 +1,8 @@
+"""Benchmarks hors ligne du serveur MCP Pennylane."""
+import os
+import sys
+
+# Permet `python -m benchmarks.run` depuis un checkout sans `pip install -e .`
+_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if os.path.isdir(_SRC) and _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
@@ -0,0 +1,320 @@
+"""Serveur Redis factice (protocole RESP2) pour essayer les backends partagés sans Redis.
+
+Seules les commandes utilisées par `pennylane_mcp.backends` sont implémentées
+(chaînes avec expiration, ensembles, SCAN) ; les scripts Lua ne sont pas
+interprétés : le script du seau à jetons est reconnu par son empreinte SHA1 et
+exécuté par une implémentation Python équivalente.
+
+Utilisation en processus (le serveur tourne dans son propre thread, le client
+Redis synchrone du cache peut donc l'appeler depuis la boucle asyncio) :
+
+    server = FakeRedis()
+    url = server.start()        # redis://127.0.0.1:<port>/0
+    ...
+    server.stop()
+
+Ou comme serveur local partagé par plusieurs processus :
+
+    python -m benchmarks.fake_redis --port 6390
+"""
+import argparse
+import asyncio
+import fnmatch
+import hashlib
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from pennylane_mcp.backends import TOKEN_BUCKET_SCRIPT
+
+
+class _Error(Exception):
+    pass
+
+
+def _sha(script: str | bytes) -> str:
+    return hashlib.sha1(script.encode() if isinstance(script, str) else script).hexdigest()
+
+
+class FakeRedis:
+    """Stockage en mémoire et serveur asyncio parlant RESP2."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.data: dict[bytes, Any] = {}
+        self.expires: dict[bytes, float] = {}
+        self.stats: Counter[str] = Counter()
+        self.scripts = {_sha(TOKEN_BUCKET_SCRIPT): self._token_bucket}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._thread: threading.Thread | None = None
+        self._connections: set[asyncio.Task] = set()
+
+    # ==================== STOCKAGE ====================
+
+    def _alive(self, key: bytes) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _delete(self, key: bytes) -> int:
+        self.expires.pop(key, None)
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    def _set_of(self, key: bytes) -> set[bytes]:
+        value = self.data.get(key) if self._alive(key) else None
+        if value is not None and not isinstance(value, set):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value if value is not None else set()
+
+    def _token_bucket(self, keys: list[bytes], args: list[bytes]) -> bytes:
+        """Équivalent Python de `TOKEN_BUCKET_SCRIPT`."""
+        rate, burst, penalty = (float(arg) for arg in args[:3])
+        now = time.time()
+        state = self.data.get(keys[0]) if self._alive(keys[0]) else None
+        tokens = state["tokens"] if state else burst
+        updated_at = state["updated_at"] if state else now
+        tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+        tokens = min(tokens, 0.0) - penalty * rate if penalty > 0 else tokens - 1
+        self.data[keys[0]] = {"tokens": tokens, "updated_at": now}
+        self.expires[keys[0]] = now + (burst - tokens) / rate + 1
+        return b"0" if tokens >= 0 else str(-tokens / rate).encode()
+
+    # ==================== COMMANDES ====================
+
+    def execute(self, command: list[bytes]) -> Any:
+        name = command[0].decode().upper()
+        args = command[1:]
+        self.stats[name] += 1
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise _Error(f"ERR unknown command '{name}'")
+        return handler(*args)
+
+    def cmd_ping(self, *args: bytes) -> Any:
+        return args[0] if args else "PONG"
+
+    def cmd_client(self, *args: bytes) -> Any:
+        return "OK"
+
+    def cmd_select(self, db: bytes) -> Any:
+        return "OK"
+
+    def cmd_get(self, key: bytes) -> Any:
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, bytes):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_set(self, key: bytes, value: bytes, *options: bytes) -> Any:
+        expires_at = None
+        keep_ttl = False
+        upper = [option.upper() for option in options]
+        for index, option in enumerate(upper):
+            if option == b"PX":
+                expires_at = time.time() + int(options[index + 1]) / 1000
+            elif option == b"EX":
+                expires_at = time.time() + int(options[index + 1])
+            elif option == b"KEEPTTL":
+                keep_ttl = True
+        previous = self.expires.get(key) if keep_ttl and self._alive(key) else None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if expires_at is not None or previous is not None:
+            self.expires[key] = expires_at if expires_at is not None else previous
+        return "OK"
+
+    def cmd_del(self, *keys: bytes) -> Any:
+        return sum(self._delete(key) for key in keys if self._alive(key))
+
+    cmd_unlink = cmd_del
+
+    def cmd_pexpire(self, key: bytes, ms: bytes) -> Any:
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.time() + int(ms) / 1000
+        return 1
+
+    def cmd_pttl(self, key: bytes) -> Any:
+        if not self._alive(key):
+            return -2
+        expires_at = self.expires.get(key)
+        return -1 if expires_at is None else int((expires_at - time.time()) * 1000)
+
+    def cmd_sadd(self, key: bytes, *members: bytes) -> Any:
+        members_set = self._set_of(key)
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        self.data[key] = members_set
+        return added
+
+    def cmd_srem(self, key: bytes, *members: bytes) -> Any:
+        members_set = self._set_of(key)
+        removed = len(members_set & set(members))
+        members_set.difference_update(members)
+        if not members_set:
+            self._delete(key)
+        return removed
+
+    def cmd_smembers(self, key: bytes) -> Any:
+        return sorted(self._set_of(key))
+
+    def cmd_sunion(self, *keys: bytes) -> Any:
+        union: set[bytes] = set()
+        for key in keys:
+            union |= self._set_of(key)
+        return sorted(union)
+
+    def cmd_scan(self, cursor: bytes, *options: bytes) -> Any:
+        pattern = "*"
+        for index, option in enumerate(options):
+            if option.upper() == b"MATCH":
+                pattern = options[index + 1].decode()
+        keys = [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+        return [b"0", keys]
+
+    def cmd_dbsize(self) -> Any:
+        return sum(1 for key in list(self.data) if self._alive(key))
+
+    def cmd_flushall(self, *args: bytes) -> Any:
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    cmd_flushdb = cmd_flushall
+
+    def cmd_script(self, subcommand: bytes, *args: bytes) -> Any:
+        if subcommand.upper() == b"LOAD":
+            sha = _sha(args[0])
+            if sha not in self.scripts:
+                raise _Error("ERR fake_redis cannot run arbitrary Lua scripts")
+            return sha.encode()
+        if subcommand.upper() == b"EXISTS":
+            return [1 if arg.decode() in self.scripts else 0 for arg in args]
+        return "OK"
+
+    def cmd_evalsha(self, sha: bytes, numkeys: bytes, *rest: bytes) -> Any:
+        script = self.scripts.get(sha.decode())
+        if script is None:
+            raise _Error("NOSCRIPT No matching script. Please use EVAL.")
+        count = int(numkeys)
+        return script(list(rest[:count]), list(rest[count:]))
+
+    def cmd_eval(self, source: bytes, numkeys: bytes, *rest: bytes) -> Any:
+        return self.cmd_evalsha(_sha(source).encode(), numkeys, *rest)
+
+    # ==================== PROTOCOLE ====================
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, _Error):
+            return f"-{value}\r\n".encode()
+        if isinstance(value, str):
+            return f"+{value}\r\n".encode()
+        if isinstance(value, bool) or isinstance(value, int):
+            return f":{int(value)}\r\n".encode()
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(FakeRedis._encode(item) for item in value)
+        raise TypeError(f"Cannot encode {type(value).__name__}")
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Commande « inline » (redis-cli, telnet)
+            return line.strip().split()
+        command = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            command.append((await reader.readexactly(size + 2))[:-2])
+        return command
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(asyncio.current_task())
+        try:
+            while (command := await self._read_command(reader)) is not None:
+                if not command:
+                    continue
+                try:
+                    reply = self.execute(command)
+                except _Error as e:
+                    reply = e
+                except (ValueError, TypeError, IndexError) as e:
+                    reply = _Error(f"ERR {e}")
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Connexion fermée par le client, ou serveur arrêté
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def start(self) -> str:
+        """Démarre le serveur dans un thread dédié et retourne son URL."""
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-redis", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.url
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        connections = list(self._connections)
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serveur Redis factice pour les backends partagés")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        server = FakeRedis(args.host, args.port)
+        await server.serve()
+        print(f"Fake Redis listening on {server.url}")
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
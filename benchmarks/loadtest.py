@@ -0,0 +1,360 @@
+"""Générateur de charge MCP : sessions concurrentes en stdio ou Streamable HTTP.
+
+Le générateur rejoue un mélange d'appels d'outils décrit dans un fichier de
+scénario (voir `benchmarks/scenarios/agent_mix.json`) contre un serveur MCP
+Pennylane branché sur l'API factice (`benchmarks.mock_api`), puis rapporte le
+débit soutenu, la latence de queue, le retard de la boucle asyncio du serveur
+et l'évolution de sa mémoire (via l'outil `pennylane_server_stats`).
+
+    python -m benchmarks.loadtest benchmarks/scenarios/agent_mix.json --transport http
+    python -m benchmarks.loadtest benchmarks/scenarios/agent_mix.json --transport stdio --sessions 5
+
+En HTTP, toutes les sessions partagent un seul processus serveur (ou
+`--workers` workers pré-forkés, voir `pennylane_mcp.workers`) ; en stdio,
+chaque session lance son propre processus (comme un client MCP local).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class CallSpec:
+    tool: str
+    weight: float
+    arguments: dict[str, Any]
+
+
+@dataclass
+class LoadScenario:
+    name: str
+    duration_seconds: float
+    sessions: int
+    ramp_up_seconds: float
+    think_time_ms: float
+    calls: list[CallSpec]
+
+    @classmethod
+    def load(cls, path: str) -> "LoadScenario":
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        return cls(
+            name=raw.get("name", os.path.splitext(os.path.basename(path))[0]),
+            duration_seconds=float(raw.get("duration_seconds", 60)),
+            sessions=int(raw.get("sessions", 10)),
+            ramp_up_seconds=float(raw.get("ramp_up_seconds", 0)),
+            think_time_ms=float(raw.get("think_time_ms", 0)),
+            calls=[CallSpec(c["tool"], float(c.get("weight", 1)), c.get("arguments", {})) for c in raw["calls"]],
+        )
+
+
+def render_arguments(template: Any, rng: random.Random) -> Any:
+    """Résout les générateurs `{"$randint": [a, b]}` et `{"$choice": [...]}` d'un gabarit d'arguments."""
+    if isinstance(template, dict):
+        if "$randint" in template:
+            low, high = template["$randint"]
+            return rng.randint(low, high)
+        if "$choice" in template:
+            return rng.choice(template["$choice"])
+        return {key: render_arguments(value, rng) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render_arguments(value, rng) for value in template]
+    return template
+
+
+@dataclass
+class Recorder:
+    """Collecte les résultats des appels et les échantillons du serveur."""
+
+    started: float = field(default_factory=time.perf_counter)
+    calls: list[tuple[float, str, float, bool]] = field(default_factory=list)
+    samples: list[dict[str, Any]] = field(default_factory=list)
+
+    def record(self, tool: str, latency: float, ok: bool) -> None:
+        self.calls.append((time.perf_counter() - self.started, tool, latency, ok))
+
+
+# ==================== PROCESSUS ====================
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def subprocess_env(**extra: str) -> dict[str, str]:
+    env = dict(os.environ)
+    paths = [os.path.join(ROOT, "src"), ROOT]
+    if env.get("PYTHONPATH"):
+        paths.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(paths)
+    env.update(extra)
+    return env
+
+
+async def wait_for_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not become reachable within {timeout}s")
+                await asyncio.sleep(0.2)
+
+
+@contextlib.asynccontextmanager
+async def background_process(args: list[str], env: dict[str, str], ready_url: str) -> AsyncIterator[subprocess.Popen]:
+    process = subprocess.Popen(args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_for_http(ready_url)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ==================== SESSIONS MCP ====================
+@contextlib.asynccontextmanager
+async def stdio_session(env: dict[str, str]):
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=["-m", "pennylane_mcp.server"], env=env)
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                yield session
+
+
+@contextlib.asynccontextmanager
+async def http_session(url: str):
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    async with streamablehttp_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            yield session
+
+
+async def sample_server(session: Any, recorder: Recorder) -> None:
+    result = await session.call_tool("pennylane_server_stats", {})
+    stats = json.loads(result.content[0].text)
+    process = stats.get("process", {})
+    lag = process.get("event_loop_lag_seconds", {})
+    recorder.samples.append({
+        "t": round(time.perf_counter() - recorder.started, 3),
+        "resident_memory_bytes": process.get("resident_memory_bytes"),
+        "event_loop_lag_count": lag.get("count", 0),
+        "event_loop_lag_sum": lag.get("sum", 0.0),
+        "event_loop_lag_p99": lag.get("p99"),
+    })
+
+
+async def session_worker(
+    index: int,
+    open_session: Any,
+    scenario: LoadScenario,
+    recorder: Recorder,
+    stop_at: float,
+    sample_interval: float,
+    seed: int,
+) -> None:
+    rng = random.Random(seed + index)
+    if scenario.ramp_up_seconds and scenario.sessions > 1:
+        await asyncio.sleep(scenario.ramp_up_seconds * index / (scenario.sessions - 1))
+    weights = [call.weight for call in scenario.calls]
+    async with open_session() as session:
+        next_sample = 0.0
+        while time.perf_counter() < stop_at:
+            # La première session échantillonne aussi l'état du serveur
+            if index == 0 and time.perf_counter() >= next_sample:
+                await sample_server(session, recorder)
+                next_sample = time.perf_counter() + sample_interval
+            call = rng.choices(scenario.calls, weights)[0]
+            start = time.perf_counter()
+            ok = True
+            try:
+                result = await session.call_tool(call.tool, render_arguments(call.arguments, rng))
+                text = result.content[0].text if result.content else ""
+                ok = not result.isError and not text.startswith("Error:")
+            except Exception:
+                ok = False
+            recorder.record(call.tool, time.perf_counter() - start, ok)
+            if scenario.think_time_ms:
+                await asyncio.sleep(rng.expovariate(1000 / scenario.think_time_ms))
+        if index == 0:
+            await sample_server(session, recorder)
+
+
+# ==================== RAPPORT ====================
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))] * 1000
+
+    return {
+        "p50": round(rank(0.50), 3),
+        "p95": round(rank(0.95), 3),
+        "p99": round(rank(0.99), 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def build_report(scenario: LoadScenario, transport: str, recorder: Recorder, wall: float, interval: float) -> dict[str, Any]:
+    latencies = [latency for _, _, latency, _ in recorder.calls]
+    errors = sum(1 for *_, ok in recorder.calls if not ok)
+    per_tool: dict[str, list[float]] = {}
+    for _, tool, latency, _ in recorder.calls:
+        per_tool.setdefault(tool, []).append(latency)
+
+    # Débit soutenu : après la montée en charge
+    steady = [c for c in recorder.calls if c[0] >= scenario.ramp_up_seconds]
+    steady_window = max(1e-9, wall - scenario.ramp_up_seconds)
+
+    timeline = []
+    previous = None
+    for sample in recorder.samples:
+        window_start = previous["t"] if previous else 0.0
+        calls = sum(1 for c in recorder.calls if window_start <= c[0] < sample["t"])
+        point = {
+            "t": sample["t"],
+            "calls_per_second": round(calls / max(1e-9, sample["t"] - window_start), 2),
+            "resident_memory_bytes": sample["resident_memory_bytes"],
+            "event_loop_lag_p99_ms": round((sample["event_loop_lag_p99"] or 0) * 1000, 3),
+        }
+        if previous and sample["event_loop_lag_count"] > previous["event_loop_lag_count"]:
+            point["event_loop_lag_mean_ms"] = round(
+                (sample["event_loop_lag_sum"] - previous["event_loop_lag_sum"])
+                / (sample["event_loop_lag_count"] - previous["event_loop_lag_count"]) * 1000, 3
+            )
+        timeline.append(point)
+        previous = sample
+
+    memory = [p["resident_memory_bytes"] for p in timeline if p["resident_memory_bytes"]]
+    growth = memory[-1] - memory[0] if len(memory) > 1 else 0
+    span_minutes = (timeline[-1]["t"] - timeline[0]["t"]) / 60 if len(timeline) > 1 else 0
+    return {
+        "scenario": scenario.name,
+        "transport": transport,
+        "sessions": scenario.sessions,
+        "duration_seconds": round(wall, 3),
+        "sample_interval_seconds": interval,
+        "total_calls": len(recorder.calls),
+        "errors": errors,
+        "error_rate": round(errors / len(recorder.calls), 4) if recorder.calls else 0.0,
+        "sustained_calls_per_second": round(len(steady) / steady_window, 2),
+        "latency_ms": percentiles(latencies),
+        "per_tool": {tool: {"calls": len(values), **percentiles(values)} for tool, values in sorted(per_tool.items())},
+        "memory_growth_bytes": growth,
+        "memory_growth_bytes_per_minute": round(growth / span_minutes) if span_minutes else None,
+        "timeline": timeline,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    scenario = LoadScenario.load(args.scenario)
+    if args.sessions:
+        scenario.sessions = args.sessions
+    if args.duration:
+        scenario.duration_seconds = args.duration
+
+    async with contextlib.AsyncExitStack() as stack:
+        upstream = args.upstream
+        if not upstream:
+            port = free_port()
+            upstream = f"http://127.0.0.1:{port}"
+            await stack.enter_async_context(background_process(
+                [sys.executable, "-m", "benchmarks.mock_api", "--port", str(port),
+                 "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)],
+                subprocess_env(), f"{upstream}/_stats",
+            ))
+        server_env = subprocess_env(PENNYLANE_API_KEY="loadtest", PENNYLANE_BASE_URL=upstream)
+
+        if args.transport == "http":
+            server_url = args.server_url
+            if not server_url:
+                port = free_port()
+                server_url = f"http://127.0.0.1:{port}/mcp"
+                await stack.enter_async_context(background_process(
+                    [sys.executable, "-m", "pennylane_mcp.server"],
+                    {**server_env, "PENNYLANE_TRANSPORT": "http", "PENNYLANE_HTTP_HOST": "127.0.0.1",
+                     "PENNYLANE_HTTP_PORT": str(port), "PENNYLANE_WORKERS": str(args.workers)},
+                    f"http://127.0.0.1:{port}/metrics",
+                ))
+            open_session = lambda: http_session(server_url)  # noqa: E731
+        else:
+            open_session = lambda: stdio_session(server_env)  # noqa: E731
+
+        recorder = Recorder()
+        stop_at = recorder.started + scenario.ramp_up_seconds + scenario.duration_seconds
+        print(
+            f"Running {scenario.name}: {scenario.sessions} {args.transport} sessions for "
+            f"{scenario.duration_seconds:.0f}s (+{scenario.ramp_up_seconds:.0f}s ramp-up)",
+            file=sys.stderr,
+        )
+        await asyncio.gather(*(
+            session_worker(i, open_session, scenario, recorder, stop_at, args.sample_interval, args.seed)
+            for i in range(scenario.sessions)
+        ))
+        wall = time.perf_counter() - recorder.started
+    return build_report(scenario, args.transport, recorder, wall, args.sample_interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test de charge MCP du serveur Pennylane")
+    parser.add_argument("scenario", help="Fichier JSON de scénario")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="http")
+    parser.add_argument("--sessions", type=int, help="Nombre de sessions (remplace le scénario)")
+    parser.add_argument("--duration", type=float, help="Durée en secondes (remplace le scénario)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers HTTP du serveur démarré (PENNYLANE_WORKERS)")
+    parser.add_argument("--server-url", help="URL /mcp d'un serveur déjà démarré (transport http)")
+    parser.add_argument("--upstream", help="URL d'une API factice déjà démarrée")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latence de l'API factice")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Gigue de l'API factice")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Intervalle d'échantillonnage du serveur")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Fichier JSON du rapport (défaut: stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    latency = report["latency_ms"]
+    print(
+        f"{report['sustained_calls_per_second']} calls/s sustained, p95 {latency.get('p95')} ms, "
+        f"p99 {latency.get('p99')} ms, errors {report['errors']}, "
+        f"memory growth {report['memory_growth_bytes'] / 1024:.0f} KiB",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""API Pennylane factice (application ASGI) pour les benchmarks hors ligne.
+
+L'application génère des données déterministes (factures, devis, clients,
+fournisseurs, transactions, référentiels) et simule la pagination par curseur
+de l'API v2. La latence, la taille des pages et la taille des réponses sont
+configurables via `MockConfig`.
+
+Utilisation en processus (sans réseau) :
+
+    transport = httpx.ASGITransport(app=create_app(MockConfig(latency_ms=20)))
+    client = PennylaneClient("bench", "http://mock.pennylane", transport=transport)
+
+Ou comme serveur HTTP local (pour les tests de charge) :
+
+    python -m benchmarks.mock_api --port 8900 --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+CURSOR_RESOURCES = (
+    "customer_invoices", "supplier_invoices", "quotes", "customers", "suppliers",
+    "transactions", "categories", "bank_accounts",
+)
+PAGE_RESOURCES = ("ledger_accounts", "trial_balance")
+
+COMPANY_NAMES = (
+    "Boulangerie Martin", "Atelier Durand", "Transports Petit", "Cabinet Moreau",
+    "Garage Lefebvre", "Studio Lambert", "Conseil Girard", "Imprimerie Roux",
+)
+LEGAL_FORMS = ("SAS", "SARL", "", "S.A.S.", "EURL")
+RECURRING_LABELS = (
+    ("PRLV LOYER BUREAUX", "-2400.00", 5),
+    ("PRLV URSSAF", "-1830.50", 15),
+    ("VIR SALAIRES", "-12500.00", 28),
+)
+
+
+@dataclass
+class MockConfig:
+    """Paramètres de l'API factice."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    slow_ratio: float = 0.0
+    slow_latency_ms: float = 0.0
+    max_page_size: int = 100
+    records: int = 1000
+    invoice_lines: int = 3
+    payload_bytes: int = 0
+    customers: int = 200
+    suppliers: int = 100
+    bank_accounts: int = 2
+    error_ratio: float = 0.0
+    today: date = field(default_factory=date.today)
+    seed: int = 42
+
+
+class MockData:
+    """Générateur déterministe des enregistrements Pennylane."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.overrides: dict[str, dict[int, dict[str, Any]]] = {}
+        self._generated: dict[tuple[str, int], dict[str, Any] | None] = {}
+        self.next_id = 10_000_000
+
+    def _rng(self, resource: str, record_id: int) -> random.Random:
+        return random.Random(f"{self.config.seed}:{resource}:{record_id}")
+
+    def count(self, resource: str) -> int:
+        return {
+            "customers": self.config.customers,
+            "suppliers": self.config.suppliers,
+            "bank_accounts": self.config.bank_accounts,
+            "categories": 50,
+            "ledger_accounts": 300,
+            "trial_balance": 300,
+        }.get(resource, self.config.records)
+
+    def _padding(self) -> str:
+        return "x" * self.config.payload_bytes
+
+    def _lines(self, rng: random.Random) -> tuple[list[dict[str, Any]], int]:
+        lines = []
+        total = 0
+        for index in range(self.config.invoice_lines):
+            quantity = rng.randint(1, 10)
+            unit_cents = rng.randint(1000, 100000)
+            amount = quantity * unit_cents
+            total += amount
+            lines.append({
+                "id": index + 1,
+                "label": f"Prestation {index + 1}",
+                "quantity": str(quantity),
+                "unit": "jour",
+                "vat_rate": "FR_200",
+                "raw_currency_unit_price": f"{unit_cents / 100:.2f}",
+                "currency_amount": f"{amount * 1.2 / 100:.2f}",
+                "amount": f"{amount * 1.2 / 100:.2f}",
+                "tax": f"{amount * 0.2 / 100:.2f}",
+            })
+        return lines, total
+
+    def invoice(self, resource: str, record_id: int) -> dict[str, Any]:
+        rng = self._rng(resource, record_id)
+        issued = self.config.today - timedelta(days=rng.randint(0, 240))
+        deadline = issued + timedelta(days=rng.choice((0, 15, 30, 45, 60)))
+        lines, before_tax = self._lines(rng)
+        amount = round(before_tax * 1.2)
+        paid = rng.random() < 0.55
+        remaining = 0 if paid else (amount if rng.random() < 0.85 else amount // 2)
+        counterparty = "customer" if resource == "customer_invoices" else "supplier"
+        count = self.config.customers if counterparty == "customer" else self.config.suppliers
+        counterparty_id = 1 + rng.randrange(count)
+        return {
+            "id": record_id,
+            "label": f"Facture {counterparty} {record_id}",
+            "invoice_number": f"F-{record_id:06d}",
+            counterparty: {"id": counterparty_id, "url": f"/{counterparty}s/{counterparty_id}"},
+            "date": issued.isoformat(),
+            "deadline": deadline.isoformat(),
+            "currency": "EUR",
+            "amount": f"{amount / 100:.2f}",
+            "currency_amount": f"{amount / 100:.2f}",
+            "currency_amount_before_tax": f"{before_tax / 100:.2f}",
+            "tax": f"{(amount - before_tax) / 100:.2f}",
+            "remaining_amount": f"{remaining / 100:.2f}",
+            "paid": paid,
+            "draft": False,
+            "status": "paid" if paid else ("partially_paid" if remaining < amount else "upcoming"),
+            "invoice_lines": lines,
+            "notes": self._padding(),
+        }
+
+    def quote(self, record_id: int) -> dict[str, Any]:
+        rng = self._rng("quotes", record_id)
+        issued = self.config.today - timedelta(days=rng.randint(0, 120))
+        lines, before_tax = self._lines(rng)
+        customer_id = 1 + rng.randrange(self.config.customers)
+        return {
+            "id": record_id,
+            "label": f"Devis {record_id}",
+            "quote_number": f"D-{record_id:06d}",
+            "customer": {"id": customer_id, "url": f"/customers/{customer_id}"},
+            "date": issued.isoformat(),
+            "deadline": (issued + timedelta(days=30)).isoformat(),
+            "currency": "EUR",
+            "currency_amount_before_tax": f"{before_tax / 100:.2f}",
+            "amount": f"{before_tax * 1.2 / 100:.2f}",
+            "status": rng.choice(("pending", "accepted", "accepted", "denied", "invoiced")),
+            "invoice_lines": lines,
+            "notes": self._padding(),
+        }
+
+    def company(self, resource: str, record_id: int) -> dict[str, Any]:
+        rng = self._rng(resource, record_id)
+        # Un enregistrement sur dix est un quasi-doublon d'un autre
+        base_id = record_id - 1 if record_id % 10 == 0 and record_id > 1 else record_id
+        base = self._rng(resource, base_id)
+        name = f"{COMPANY_NAMES[base.randrange(len(COMPANY_NAMES))]} {base_id}"
+        form = LEGAL_FORMS[rng.randrange(len(LEGAL_FORMS))]
+        siren = f"{base.randrange(10**8, 10**9)}"
+        record = {
+            "id": record_id,
+            "name": f"{name} {form}".strip() if record_id == base_id else name.upper(),
+            "reg_no": siren,
+            "vat_number": f"FR{base.randrange(10, 99)}{siren}",
+            "emails": [f"compta@societe{base_id}.fr"],
+            "billing_address": {"address": f"{base_id} rue de la Paix", "postal_code": "75002", "city": "Paris", "country_alpha2": "FR"},
+            "notes": self._padding(),
+        }
+        if resource == "suppliers":
+            record["iban"] = f"FR76{base.randrange(10**22, 10**23)}"
+            record["postal_address"] = record.pop("billing_address")
+        else:
+            record["customer_type"] = "company"
+        return record
+
+    def transaction(self, record_id: int) -> dict[str, Any]:
+        rng = self._rng("transactions", record_id)
+        account_id = 1 + record_id % self.config.bank_accounts
+        if record_id % 7 == 0:
+            label, amount, day = RECURRING_LABELS[(record_id // 7) % len(RECURRING_LABELS)]
+            months_back = (record_id // 21) % 12
+            month_start = (self.config.today.replace(day=1) - timedelta(days=30 * months_back)).replace(day=1)
+            tx_date = month_start.replace(day=min(day, 28))
+        else:
+            label = f"VIR CLIENT {rng.randrange(self.config.customers)}"
+            amount = f"{rng.randint(-50000, 150000) / 100:.2f}"
+            tx_date = self.config.today - timedelta(days=rng.randint(0, 365))
+        return {
+            "id": record_id,
+            "label": label,
+            "date": tx_date.isoformat(),
+            "amount": amount,
+            "currency": "EUR",
+            "currency_amount": amount,
+            "fee": "0.00",
+            "bank_account": {"id": account_id, "url": f"/bank_accounts/{account_id}"},
+            "notes": self._padding(),
+        }
+
+    def record(self, resource: str, record_id: int) -> dict[str, Any] | None:
+        if record_id in self.overrides.get(resource, {}):
+            return self.overrides[resource][record_id]
+        if not 1 <= record_id <= self.count(resource):
+            return None
+        key = (resource, record_id)
+        if key not in self._generated:
+            self._generated[key] = self._generate(resource, record_id)
+        return self._generated[key]
+
+    def _generate(self, resource: str, record_id: int) -> dict[str, Any] | None:
+        if resource in ("customer_invoices", "supplier_invoices"):
+            return self.invoice(resource, record_id)
+        if resource == "quotes":
+            return self.quote(record_id)
+        if resource in ("customers", "suppliers"):
+            return self.company(resource, record_id)
+        if resource == "transactions":
+            return self.transaction(record_id)
+        if resource == "bank_accounts":
+            return {"id": record_id, "name": f"Compte courant {record_id}", "currency": "EUR", "balance": f"{25000 * record_id:.2f}"}
+        if resource == "categories":
+            return {"id": record_id, "label": f"Catégorie {record_id}", "direction": "cash_out" if record_id % 2 else "cash_in"}
+        if resource == "ledger_accounts":
+            return {"id": record_id, "number": f"{400000 + record_id}", "label": f"Compte {record_id}", "enabled": True}
+        if resource == "trial_balance":
+            rng = self._rng(resource, record_id)
+            return {"number": f"{400000 + record_id}", "label": f"Compte {record_id}",
+                    "debits": f"{rng.randint(0, 10**7) / 100:.2f}", "credits": f"{rng.randint(0, 10**7) / 100:.2f}"}
+        return None
+
+
+def _parse_filter(raw: str | None) -> list[tuple[str, str, Any]]:
+    if not raw:
+        return []
+    try:
+        return [(f["field"], f["operator"], f["value"]) for f in json.loads(raw)]
+    except (ValueError, TypeError, KeyError):
+        conditions = []
+        for part in raw.split(","):
+            field_name, operator, value = part.split(":", 2)
+            conditions.append((field_name, operator, value))
+        return conditions
+
+
+def _field(record: dict[str, Any], name: str) -> Any:
+    if name.endswith("_id") and isinstance(record.get(name[:-3]), dict):
+        return record[name[:-3]]["id"]
+    return record.get(name)
+
+
+def _matches(record: dict[str, Any], conditions: list[tuple[str, str, Any]]) -> bool:
+    for name, operator, expected in conditions:
+        value = _field(record, name)
+        if isinstance(value, bool):
+            value = str(value).lower()
+        elif isinstance(value, (int, float)):
+            value = str(value)
+        if operator == "in":
+            if value not in [str(v) for v in (expected if isinstance(expected, list) else str(expected).split("|"))]:
+                return False
+            continue
+        expected = str(expected).lower() if isinstance(expected, bool) else str(expected)
+        if value is None:
+            return False
+        if operator == "eq" and value != expected:
+            return False
+        if operator == "not_eq" and value == expected:
+            return False
+        if operator == "lt" and not value < expected:
+            return False
+        if operator == "lteq" and not value <= expected:
+            return False
+        if operator == "gt" and not value > expected:
+            return False
+        if operator == "gteq" and not value >= expected:
+            return False
+        if operator == "start_with" and not value.lower().startswith(expected.lower()):
+            return False
+    return True
+
+
+def create_app(config: MockConfig | None = None) -> Starlette:
+    """Construit l'application ASGI de l'API factice."""
+    config = config or MockConfig()
+    data = MockData(config)
+    rng = random.Random(config.seed)
+    stats = {"requests": 0}
+
+    async def simulate_latency() -> None:
+        stats["requests"] += 1
+        delay = config.latency_ms
+        if config.jitter_ms:
+            delay += rng.uniform(0, config.jitter_ms)
+        if config.slow_ratio and rng.random() < config.slow_ratio:
+            delay = config.slow_latency_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def maybe_error() -> JSONResponse | None:
+        if config.error_ratio and rng.random() < config.error_ratio:
+            return JSONResponse({"error": "Service unavailable"}, status_code=503)
+        return None
+
+    def _select(resource: str, raw_filter: str | None):
+        conditions = _parse_filter(raw_filter)
+        for record_id in range(1, data.count(resource) + 1):
+            record = data.record(resource, record_id)
+            if record is not None and _matches(record, conditions):
+                yield record
+        for record in data.overrides.get(resource, {}).values():
+            if record["id"] > data.count(resource) and _matches(record, conditions):
+                yield record
+
+    # Sélections filtrées mémorisées (vidées à chaque écriture) : parcourir
+    # toutes les pages d'un filtre ne refiltre pas la ressource à chaque page
+    selections: dict[tuple[str, str | None], list[dict[str, Any]]] = {}
+
+    def select(resource: str, raw_filter: str | None) -> list[dict[str, Any]]:
+        key = (resource, raw_filter)
+        if key not in selections:
+            selections[key] = list(_select(resource, raw_filter))
+        return selections[key]
+
+    async def list_resource(request: Request) -> JSONResponse:
+        await simulate_latency()
+        if (error := maybe_error()) is not None:
+            return error
+        resource = request.path_params["resource"]
+        params = request.query_params
+        if resource in PAGE_RESOURCES:
+            per_page = min(int(params.get("per_page", 100)), 1000)
+            page = int(params.get("page", 1))
+            records = select(resource, params.get("filter"))
+            start = (page - 1) * per_page
+            return JSONResponse({
+                "total_pages": max(1, -(-len(records) // per_page)),
+                "current_page": page,
+                "total_items": len(records),
+                "per_page": per_page,
+                "items": records[start:start + per_page],
+            })
+        if resource not in CURSOR_RESOURCES:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        limit = min(int(params.get("limit", 20)), config.max_page_size)
+        offset = int(params.get("cursor") or 0)
+        records = select(resource, params.get("filter"))
+        items = records[offset:offset + limit]
+        has_more = offset + limit < len(records)
+        return JSONResponse({
+            "has_more": has_more,
+            "next_cursor": str(offset + limit) if has_more else None,
+            "items": items,
+        })
+
+    async def get_record(request: Request) -> JSONResponse:
+        await simulate_latency()
+        if (error := maybe_error()) is not None:
+            return error
+        record = data.record(request.path_params["resource"], int(request.path_params["record_id"]))
+        if record is None:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return JSONResponse(record)
+
+    async def sub_resource(request: Request) -> JSONResponse:
+        await simulate_latency()
+        resource = request.path_params["resource"]
+        record = data.record(resource, int(request.path_params["record_id"]))
+        if record is None:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        sub = request.path_params["sub"]
+        if sub == "invoice_lines":
+            items = record.get("invoice_lines", [])
+        elif sub == "invoice_line_sections":
+            items = [{"id": 1, "title": "Prestations", "rank": 1}]
+        elif sub == "matched_transactions" and record.get("paid"):
+            # Paiement reçu entre 0 et 75 jours après l'émission
+            paid_on = date.fromisoformat(record["date"]) + timedelta(days=record["id"] * 7 % 76)
+            items = [{"id": 10**6 + record["id"], "label": f"VIR {record.get('invoice_number', record['id'])}",
+                      "date": paid_on.isoformat(), "currency": record.get("currency", "EUR"), "amount": record.get("amount")}]
+        else:
+            items = []
+        return JSONResponse({"has_more": False, "next_cursor": None, "items": items})
+
+    async def write(request: Request) -> JSONResponse:
+        await simulate_latency()
+        if (error := maybe_error()) is not None:
+            return error
+        resource = request.path_params["resource"]
+        selections.clear()
+        body = await request.body()
+        payload = json.loads(body) if body else {}
+        if request.method == "POST" and "record_id" not in request.path_params:
+            data.next_id += 1
+            record = {"id": data.next_id, **payload}
+            data.overrides.setdefault(resource, {})[data.next_id] = record
+            return JSONResponse(record, status_code=201)
+        record_id = int(request.path_params.get("record_id", 0))
+        if request.method == "DELETE":
+            return JSONResponse({})
+        record = dict(data.record(resource, record_id) or {"id": record_id})
+        if request.path_params.get("sub") == "update_status":
+            record["status"] = payload.get("status")
+        elif "sub" not in request.path_params:
+            record.update(payload)
+        data.overrides.setdefault(resource, {})[record_id] = record
+        return JSONResponse(record)
+
+    async def stats_endpoint(request: Request) -> JSONResponse:
+        return JSONResponse(stats)
+
+    routes = [
+        Route("/_stats", stats_endpoint, methods=["GET"]),
+        Route("/{resource}", list_resource, methods=["GET"]),
+        Route("/{resource}", write, methods=["POST"]),
+        Route("/{resource}/{record_id:int}", get_record, methods=["GET"]),
+        Route("/{resource}/{record_id:int}", write, methods=["PUT", "DELETE"]),
+        Route("/{resource}/{record_id:int}/{sub}", sub_resource, methods=["GET"]),
+        Route("/{resource}/{record_id:int}/{sub}", write, methods=["POST", "PUT"]),
+        Route("/{resource}/{record_id:int}/{sub}/{sub_id:int}", write, methods=["DELETE"]),
+    ]
+    app = Starlette(routes=routes)
+    app.state.data = data
+    app.state.stats = stats
+    return app
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Ajoute les options de `MockConfig` à un parseur d'arguments."""
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence simulée par requête")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Gigue aléatoire ajoutée à la latence")
+    parser.add_argument("--page-size", type=int, default=100, help="Taille maximale des pages")
+    parser.add_argument("--records", type=int, default=1000, help="Nombre d'enregistrements par ressource")
+    parser.add_argument("--lines", type=int, default=3, help="Lignes par facture/devis")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Octets de remplissage par enregistrement")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    """Construit un `MockConfig` depuis les options de `add_config_arguments`."""
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        max_page_size=args.page_size,
+        records=args.records,
+        invoice_lines=args.lines,
+        payload_bytes=args.payload_bytes,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API Pennylane factice")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
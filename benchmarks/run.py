@@ -0,0 +1,443 @@
+"""Suite de benchmarks hors ligne contre l'API Pennylane factice.
+
+Chaque scénario exécute les fonctions des outils ou `call_tool` contre
+`benchmarks.mock_api` (via `httpx.ASGITransport`, sans réseau) et mesure le
+débit, les percentiles de latence et le pic mémoire (tracemalloc). Les
+résultats sont écrits en JSON pour comparer les versions entre elles :
+
+    python -m benchmarks.run --latency-ms 20 --output bench.json
+    python -m benchmarks.run --compare benchmarks/results/previous.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from .mock_api import MockConfig, add_config_arguments, config_from_args, create_app
+
+import pennylane_mcp
+from pennylane_mcp import amounts, server, validation
+from pennylane_mcp.cache import ResponseCache
+from pennylane_mcp.client import PennylaneClient
+from pennylane_mcp.hedging import Hedger
+from pennylane_mcp.manifest import TOOL_DEFINITIONS
+from pennylane_mcp.tools import invoices
+
+BASE_URL = "http://mock.pennylane"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class BenchEnv:
+    """Client Pennylane branché sur l'API factice en processus."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.app = create_app(config)
+        self.client = PennylaneClient("bench", BASE_URL, transport=httpx.ASGITransport(app=self.app))
+        server.pennylane_client = self.client
+        self.extra: dict[str, Any] = {}
+
+    @property
+    def upstream_requests(self) -> int:
+        return self.app.state.stats["requests"]
+
+    async def call(self, name: str, arguments: dict[str, Any]) -> str:
+        """Appelle un outil via `call_tool` et retourne le texte de la réponse."""
+        text = (await server.call_tool(name, arguments))[0].text
+        if text.startswith("Error:"):
+            raise RuntimeError(f"{name} failed: {text}")
+        return text
+
+    async def close(self) -> None:
+        await self.client.close()
+        server.pennylane_client = None
+
+
+ScenarioFunc = Callable[[BenchEnv, int], Awaitable[list[float]]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    ops: int
+    func: ScenarioFunc
+
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(name: str, description: str, ops: int = 200):
+    """Enregistre un scénario ; la fonction retourne la latence de chaque opération."""
+
+    def decorator(func: ScenarioFunc) -> ScenarioFunc:
+        SCENARIOS[name] = Scenario(name, description, ops, func)
+        return func
+
+    return decorator
+
+
+async def timed(awaitable: Awaitable[Any]) -> float:
+    start = time.perf_counter()
+    await awaitable
+    return time.perf_counter() - start
+
+
+async def run_concurrently(ops: int, concurrency: int, make_call: Callable[[int], Awaitable[Any]]) -> list[float]:
+    """Exécute `ops` appels avec au plus `concurrency` appels simultanés."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> float:
+        async with semaphore:
+            return await timed(make_call(index))
+
+    return list(await asyncio.gather(*(one(i) for i in range(ops))))
+
+
+# ==================== SCÉNARIOS ====================
+@scenario("tool_get_detail", "call_tool séquentiel sur pennylane_get_customer_invoice")
+async def tool_get_detail(env: BenchEnv, ops: int) -> list[float]:
+    records = env.config.records
+    return [
+        await timed(env.call("pennylane_get_customer_invoice", {"invoice_id": 1 + i % records}))
+        for i in range(ops)
+    ]
+
+
+@scenario("tool_concurrent_get", "call_tool en parallèle (32 appels simultanés) sur des détails", ops=1000)
+async def tool_concurrent_get(env: BenchEnv, ops: int) -> list[float]:
+    records = env.config.records
+    return await run_concurrently(
+        ops, 32, lambda i: env.call("pennylane_get_customer_invoice", {"invoice_id": 1 + i % records})
+    )
+
+
+@scenario("pagination_crawl", "Parcours complet de customer_invoices page par page", ops=1)
+async def pagination_crawl(env: BenchEnv, ops: int) -> list[float]:
+    latencies = []
+    items = 0
+    for _ in range(ops):
+        cursor = None
+        while True:
+            start = time.perf_counter()
+            page = await invoices.list_customer_invoices(env.client, limit=env.config.max_page_size, cursor=cursor)
+            latencies.append(time.perf_counter() - start)
+            items += len(page["items"])
+            cursor = page.get("next_cursor")
+            if not page.get("has_more"):
+                break
+    env.extra["items"] = items
+    return latencies
+
+
+@scenario("serialization", "json.dumps d'une page de 100 factures (formatage de call_tool)", ops=100)
+async def serialization(env: BenchEnv, ops: int) -> list[float]:
+    page = await invoices.list_customer_invoices(env.client, limit=100)
+    latencies = []
+    size = 0
+    for _ in range(ops):
+        start = time.perf_counter()
+        size = len(json.dumps(page, indent=2, ensure_ascii=False).encode("utf-8"))
+        latencies.append(time.perf_counter() - start)
+    env.extra["response_bytes"] = size
+    return latencies
+
+
+@scenario("reference_data_repeat", "Appels répétés de pennylane_list_categories (efficacité des caches)")
+async def reference_data_repeat(env: BenchEnv, ops: int) -> list[float]:
+    before = env.upstream_requests
+    latencies = [await timed(env.call("pennylane_list_categories", {})) for _ in range(ops)]
+    env.extra["upstream_requests"] = env.upstream_requests - before
+    return latencies
+
+
+AMOUNT_ROWS = 1_000_000
+
+
+def _amount_rows(count: int) -> list[dict[str, Any]]:
+    rng = random.Random(42)
+    # Chaînes partagées : seul le coût de conversion est mesuré, pas la génération
+    pool = [f"{rng.randint(-500000, 5000000) / 100:.2f}" for _ in range(4096)]
+    currencies = ("EUR",) * 9 + ("USD",)
+    return [
+        {"amount": pool[i % 4096], "remaining_amount": pool[(i * 7) % 4096], "currency": currencies[i % 10], "customer": i % 500}
+        for i in range(count)
+    ]
+
+
+@scenario("amount_aggregation", f"Conversion de {AMOUNT_ROWS:,} montants puis totaux par devise et par client (centimes vs Decimal)", ops=3)
+async def amount_aggregation(env: BenchEnv, ops: int) -> list[float]:
+    rows = _amount_rows(AMOUNT_ROWS)
+    customers = [row["customer"] for row in rows]
+    latencies = []
+    parse_latencies = []
+    decimal_latencies = []
+    for _ in range(ops):
+        start = time.perf_counter()
+        table = amounts.AmountTable(rows, ("amount", "remaining_amount"))
+        parse_latencies.append(time.perf_counter() - start)
+        by_currency = table.total("amount")
+        table.total("remaining_amount")
+        table.group_total("remaining_amount", customers)
+        latencies.append(time.perf_counter() - start)
+
+        # Référence naïve : une boucle Python avec Decimal pour les mêmes totaux
+        start = time.perf_counter()
+        decimal_totals: dict[str, Decimal] = {}
+        decimal_remaining: dict[str, Decimal] = {}
+        decimal_groups: dict[tuple[str, int], Decimal] = {}
+        for row, customer in zip(rows, customers):
+            currency = row["currency"]
+            remaining = Decimal(row["remaining_amount"])
+            decimal_totals[currency] = decimal_totals.get(currency, Decimal(0)) + Decimal(row["amount"])
+            decimal_remaining[currency] = decimal_remaining.get(currency, Decimal(0)) + remaining
+            key = (currency, customer)
+            decimal_groups[key] = decimal_groups.get(key, Decimal(0)) + remaining
+        decimal_latencies.append(time.perf_counter() - start)
+
+        if amounts.format_totals(by_currency) != {k: f"{v:.2f}" for k, v in decimal_totals.items()}:
+            raise RuntimeError("amount totals differ from Decimal reference")
+    env.extra["rows"] = AMOUNT_ROWS
+    env.extra["parse_mean_ms"] = round(sum(parse_latencies) / len(parse_latencies) * 1000, 2)
+    env.extra["aggregate_mean_ms"] = round((sum(latencies) - sum(parse_latencies)) / len(latencies) * 1000, 2)
+    env.extra["decimal_mean_ms"] = round(sum(decimal_latencies) / len(decimal_latencies) * 1000, 2)
+    env.extra["speedup_vs_decimal"] = round(sum(decimal_latencies) / sum(latencies), 2)
+    return latencies
+
+
+AGING_INVOICES = 50_000
+
+
+@scenario("aged_receivables", f"pennylane_aged_receivables sur {AGING_INVOICES:,} factures clients", ops=3)
+async def aged_receivables(env: BenchEnv, ops: int) -> list[float]:
+    aging_env = BenchEnv(replace(env.config, records=AGING_INVOICES, invoice_lines=1))
+    try:
+        # Génération des factures factices hors mesure
+        for record_id in range(1, AGING_INVOICES + 1):
+            aging_env.app.state.data.record("customer_invoices", record_id)
+        before = aging_env.upstream_requests
+        latencies = [await timed(aging_env.call("pennylane_aged_receivables", {"top": 20})) for _ in range(ops)]
+        env.extra["upstream_requests_per_op"] = (aging_env.upstream_requests - before) / ops
+    finally:
+        await aging_env.close()
+        server.pennylane_client = env.client
+    return latencies
+
+
+HEDGE_OPS = 2000
+
+
+@scenario("hedged_get", "GET de détails avec 2 % de réponses lentes (500 ms), avec et sans couverture p95", ops=HEDGE_OPS)
+async def hedged_get(env: BenchEnv, ops: int) -> list[float]:
+    config = replace(env.config, latency_ms=max(env.config.latency_ms, 10), jitter_ms=5, slow_ratio=0.02, slow_latency_ms=500)
+    percentiles = {}
+    latencies: list[float] = []
+    for hedged in (False, True):
+        app = create_app(config)
+        client = PennylaneClient(
+            "bench",
+            BASE_URL,
+            transport=httpx.ASGITransport(app=app),
+            cache=ResponseCache(ttl=0),
+            hedger=Hedger(quantile=0.95 if hedged else 0, budget=0.05),
+        )
+        try:
+            latencies = await run_concurrently(ops, 8, lambda i: client.get(f"customer_invoices/{1 + i % 500}"))
+        finally:
+            await client.close()
+        ordered = sorted(latencies)
+        percentiles[hedged] = percentile(ordered, 0.99)
+        if hedged:
+            env.extra["extra_requests_ratio"] = round(app.state.stats["requests"] / ops - 1, 4)
+    env.extra["unhedged_p99_ms"] = round(percentiles[False] * 1000, 4)
+    # Latences rapportées : variante couverte
+    return latencies
+
+
+@scenario("argument_validation", "Validation des arguments de pennylane_create_customer_invoice (validateur compilé vs jsonschema)", ops=2000)
+async def argument_validation(env: BenchEnv, ops: int) -> list[float]:
+    import jsonschema
+
+    tool = "pennylane_create_customer_invoice"
+    schema = next(d["inputSchema"] for d in TOOL_DEFINITIONS if d["name"] == tool)
+    line = {"label": "Prestation", "raw_currency_unit_price": "750.00", "quantity": 2, "unit": "jour", "vat_rate": "FR_200"}
+    arguments = {"customer_id": 12, "date": "2026-01-31", "deadline": "2026-02-28", "invoice_lines": [line] * 10, "draft": True}
+    latencies = []
+    for _ in range(ops):
+        start = time.perf_counter()
+        validation.validate(tool, arguments)
+        latencies.append(time.perf_counter() - start)
+    # Référence : validation du SDK MCP (jsonschema.validate à chaque appel), sur moins d'itérations
+    reference_ops = max(1, ops // 20)
+    start = time.perf_counter()
+    for _ in range(reference_ops):
+        jsonschema.validate(instance=arguments, schema=schema)
+    env.extra["jsonschema_mean_us"] = round((time.perf_counter() - start) / reference_ops * 1e6, 2)
+    return latencies
+
+
+# ==================== EXÉCUTION ====================
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Méthode du rang le plus proche
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(item: Scenario, config: MockConfig, ops: int, measure_memory: bool) -> dict[str, Any]:
+    env = BenchEnv(config)
+    try:
+        start = time.perf_counter()
+        latencies = await item.func(env, ops)
+        wall = time.perf_counter() - start
+        extra = dict(env.extra)
+    finally:
+        await env.close()
+
+    result: dict[str, Any] = {
+        "description": item.description,
+        "ops": len(latencies),
+        "wall_seconds": round(wall, 6),
+        "throughput_ops_s": round(len(latencies) / wall, 3) if wall else None,
+        "latency_ms": {},
+        "extra": extra,
+    }
+    ordered = sorted(latencies)
+    if ordered:
+        result["latency_ms"] = {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 4),
+            "p50": round(percentile(ordered, 0.50) * 1000, 4),
+            "p95": round(percentile(ordered, 0.95) * 1000, 4),
+            "p99": round(percentile(ordered, 0.99) * 1000, 4),
+            "max": round(ordered[-1] * 1000, 4),
+        }
+
+    if measure_memory:
+        # Passe séparée : tracemalloc ralentit fortement l'exécution
+        env = BenchEnv(config)
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            await item.func(env, ops)
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+            await env.close()
+    return result
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Liste les régressions (débit en baisse ou p95 en hausse de plus de `threshold` %)."""
+    regressions = []
+    for name, result in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous.get("throughput_ops_s") and result.get("throughput_ops_s"):
+            change = (result["throughput_ops_s"] / previous["throughput_ops_s"] - 1) * 100
+            if change < -threshold:
+                regressions.append(f"{name}: throughput {change:+.1f}%")
+        p95, previous_p95 = result["latency_ms"].get("p95"), previous.get("latency_ms", {}).get("p95")
+        if p95 and previous_p95:
+            change = (p95 / previous_p95 - 1) * 100
+            if change > threshold:
+                regressions.append(f"{name}: p95 latency {change:+.1f}%")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    config = config_from_args(args)
+    names = args.scenario or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+
+    report: dict[str, Any] = {
+        "version": pennylane_mcp.__version__,
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mock_config": {k: str(v) if not isinstance(v, (int, float)) else v for k, v in asdict(config).items()},
+        "scenarios": {},
+    }
+    for name in names:
+        item = SCENARIOS[name]
+        result = await run_scenario(item, config, args.ops or item.ops, not args.no_memory)
+        report["scenarios"][name] = result
+        latency = result["latency_ms"]
+        print(
+            f"{name:28s} {result['throughput_ops_s'] or 0:10.1f} ops/s  "
+            f"p50 {latency.get('p50', 0):8.2f} ms  p95 {latency.get('p95', 0):8.2f} ms  "
+            f"p99 {latency.get('p99', 0):8.2f} ms  peak {result.get('peak_memory_bytes', 0) / 1024:8.0f} KiB",
+            file=sys.stderr,
+        )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne du serveur MCP Pennylane")
+    parser.add_argument("--scenario", action="append", help="Scénario à exécuter (répétable, défaut: tous)")
+    parser.add_argument("--list", action="store_true", help="Liste les scénarios disponibles")
+    parser.add_argument("--ops", type=int, help="Nombre d'opérations par scénario")
+    parser.add_argument("--no-memory", action="store_true", help="Ne mesure pas le pic mémoire")
+    parser.add_argument("--output", help="Fichier JSON de résultats (défaut: benchmarks/results/)")
+    parser.add_argument("--compare", help="Fichier JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Seuil de régression en %%")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.list:
+        for item in SCENARIOS.values():
+            print(f"{item.name:28s} {item.description}")
+        return
+
+    # Les logs par requête faussent les mesures
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"bench-{report['version']}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
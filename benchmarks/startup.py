@@ -0,0 +1,125 @@
+"""Benchmark de démarrage à froid : délai jusqu'à la première réponse MCP.
+
+Chaque exécution lance un nouveau processus `python -m pennylane_mcp.server`
+en stdio (comme un client MCP local ou un redémarrage Railway) et mesure :
+
+- `initialize_ms` : du lancement à la réponse à `initialize` ;
+- `tools_list_ms` : du lancement à la réponse à `tools/list` ;
+- `first_call_ms` : du lancement à la réponse au premier `tools/call`.
+
+    python -m benchmarks.startup --runs 20 --output startup.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUESTS = [
+    {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+        "protocolVersion": "2025-03-26",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-bench", "version": "0"},
+    }},
+    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+    {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+    {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {"name": "pennylane_server_stats", "arguments": {}}},
+]
+MILESTONES = {1: "initialize_ms", 2: "tools_list_ms", 3: "first_call_ms"}
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(ROOT, "src"), env.get("PYTHONPATH")]))
+    env.setdefault("PENNYLANE_API_KEY", "startup-bench")
+    env.setdefault("PENNYLANE_BASE_URL", "http://127.0.0.1:9")
+    return env
+
+
+def measure_once(env: dict[str, str]) -> dict[str, float]:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "pennylane_mcp.server"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env,
+    )
+    timings: dict[str, float] = {}
+    try:
+        # Les requêtes sont envoyées d'emblée : le serveur les lit dès qu'il est prêt
+        process.stdin.write("".join(json.dumps(r) + "\n" for r in REQUESTS).encode())
+        process.stdin.flush()
+        while len(timings) < len(MILESTONES):
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError("server exited before answering")
+            message = json.loads(line)
+            if message.get("id") in MILESTONES:
+                timings[MILESTONES[message["id"]]] = (time.perf_counter() - start) * 1000
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return timings
+
+
+def import_time_ms(env: dict[str, str]) -> float:
+    """Durée cumulée d'import de `pennylane_mcp.server` (`-X importtime`)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pennylane_mcp.server"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    for line in reversed(result.stderr.splitlines()):
+        if line.rstrip().endswith("| pennylane_mcp.server"):
+            return int(line.split("|")[1]) / 1000
+    return 0.0
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    return {
+        "min": round(ordered[0], 2),
+        "p50": round(rank(0.50), 2),
+        "p95": round(rank(0.95), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de démarrage à froid du serveur MCP")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Fichier JSON de résultats (défaut: stdout)")
+    args = parser.parse_args()
+
+    env = _env()
+    measure_once(env)  # chauffe le cache disque et les .pyc
+    runs = [measure_once(env) for _ in range(args.runs)]
+    report: dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": round(import_time_ms(env), 2),
+    }
+    for key in MILESTONES.values():
+        report[key] = summarize([run[key] for run in runs])
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
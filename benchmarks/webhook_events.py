@@ -0,0 +1,125 @@
+"""Générateur local de notifications webhook Pennylane signées.
+
+Envoie des événements `<objet>.<action>` réalistes (factures payées, nouvelles
+transactions, clients modifiés, suppressions) au endpoint `/webhooks/pennylane`
+du serveur, signés avec `PENNYLANE_WEBHOOK_SECRET`. Avec `--mock-url`, chaque
+modification est aussi appliquée à l'API factice (`benchmarks.mock_api`) pour
+que le cache du serveur et l'« API » restent cohérents.
+
+    python -m benchmarks.webhook_events --url http://127.0.0.1:8000/webhooks/pennylane \\
+        --secret s3cret --count 200 --rate 50 --mock-url http://127.0.0.1:8900
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any
+
+import httpx
+
+from .mock_api import MockConfig, MockData
+
+from pennylane_mcp import webhooks
+
+RESOURCES = ("customer_invoices", "supplier_invoices", "customers", "transactions")
+
+
+def build_event(data: MockData, rng: random.Random, resource: str, next_id: list[int]) -> tuple[str, dict[str, Any], dict[str, Any] | None]:
+    """Retourne (nom de l'événement, données, enregistrement complet à écrire dans le mock)."""
+    obj = resource[:-1]
+    record_id = 1 + rng.randrange(data.count(resource))
+    roll = rng.random()
+    if roll < 0.05:
+        return f"{obj}.deleted", {"id": record_id}, None
+    if resource in ("customer_invoices", "supplier_invoices"):
+        record = dict(data.record(resource, record_id))
+        record.update(paid=True, remaining_amount="0.00", status="paid")
+        return f"{obj}.updated", {"id": record_id, "paid": True, "remaining_amount": "0.00", "status": "paid"}, record
+    if resource == "customers":
+        record = dict(data.record(resource, record_id))
+        record["emails"] = [f"compta+{rng.randrange(1000)}@example.com"]
+        return f"{obj}.updated", {"id": record_id, "emails": record["emails"]}, record
+    next_id[0] += 1
+    record = {
+        "id": next_id[0],
+        "label": rng.choice(("VIR CLIENT 42", "PRLV URSSAF", "CB FOURNITURES")),
+        "date": (date.today() - timedelta(days=rng.randint(0, 3))).isoformat(),
+        "amount": f"{rng.randint(-50000, 150000) / 100:.2f}",
+        "currency": "EUR",
+        "bank_account": {"id": 1 + rng.randrange(data.config.bank_accounts)},
+    }
+    return f"{obj}.created", record, record
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    rng = random.Random(args.seed)
+    data = MockData(MockConfig(records=args.records, seed=args.seed))
+    next_id = [20_000_000]
+    statuses: Counter[str] = Counter()
+    latencies: list[float] = []
+    resources = args.resource or list(RESOURCES)
+    interval = 1 / args.rate if args.rate else 0.0
+
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        for index in range(args.count):
+            resource = rng.choice(resources)
+            name, payload_data, record = build_event(data, rng, resource, next_id)
+            if args.mock_url and record is not None:
+                method = "POST" if name.endswith(".created") else "PUT"
+                path = resource if method == "POST" else f"{resource}/{record['id']}"
+                await client.request(method, f"{args.mock_url.rstrip('/')}/{path}", json=record)
+            body = json.dumps({"id": f"evt_{secrets.token_hex(8)}", "event": name, "data": payload_data}).encode()
+            timestamp = int(time.time())
+            signature = webhooks.sign(args.secret, body, timestamp)
+            if args.bad_signature_ratio and rng.random() < args.bad_signature_ratio:
+                signature = "sha256=" + "0" * 64
+            start = time.perf_counter()
+            response = await client.post(args.url, content=body, headers={
+                "Content-Type": "application/json",
+                "X-Pennylane-Signature": signature,
+                "X-Pennylane-Timestamp": str(timestamp),
+            })
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] += 1
+            if interval:
+                await asyncio.sleep(max(0.0, interval - latencies[-1]))
+
+    latencies.sort()
+    return {
+        "sent": args.count,
+        "statuses": dict(statuses),
+        "latency_ms": {
+            "p50": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Générateur local de webhooks Pennylane")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/webhooks/pennylane")
+    parser.add_argument("--secret", default=os.getenv("PENNYLANE_WEBHOOK_SECRET"))
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0.0, help="Événements par seconde (0: au plus vite)")
+    parser.add_argument("--resource", action="append", choices=RESOURCES, help="Ressource (répétable, défaut: toutes)")
+    parser.add_argument("--records", type=int, default=1000, help="Enregistrements de l'API factice visée")
+    parser.add_argument("--mock-url", help="Applique aussi chaque modification à l'API factice")
+    parser.add_argument("--bad-signature-ratio", type=float, default=0.0, help="Proportion d'événements mal signés")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("--secret or PENNYLANE_WEBHOOK_SECRET is required")
+
+    report = asyncio.run(run(args))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
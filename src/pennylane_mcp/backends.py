@@ -0,0 +1,430 @@
+"""Backends partagés du cache des réponses et de la limitation de débit.
+
+Plusieurs réplicas derrière un répartiteur de charge ont chacun leur cache et
+leur propre vision du débit autorisé par l'API. Les interfaces de ce module
+permettent de brancher des implémentations partagées :
+
+- `CacheBackend` : second niveau du cache des réponses (`cache.py`), implémenté
+  localement par `DiskCache` (SQLite) et, partagé entre réplicas, par
+  `RedisCache` ;
+- `RateLimiter` : seau à jetons appliqué à chaque requête du client, local
+  (`ratelimit.TokenBucket`), partagé par les workers d'une machine
+  (`FileRateLimiter`, fichier verrouillé) ou global par clé d'API
+  (`RedisTokenBucket`, script Lua atomique sur l'horloge du serveur Redis).
+
+Les backends Redis utilisent `redis-py` (dépendance optionnelle :
+`pip install pennylane-mcp[redis]`) et parlent le protocole Redis : tout serveur
+compatible convient (Redis, Valkey, KeyDB, `benchmarks/fake_redis.py` pour les
+essais locaux). Une erreur Redis n'interrompt pas les outils : le cache répond
+comme une absence et le seau à jetons se replie sur une limite locale.
+
+Définir `PENNYLANE_REDIS_URL` active le cache partagé de toutes les réponses
+GET (listes comprises) pendant `PENNYLANE_REDIS_CACHE_TTL`, 60 s par défaut :
+une modification faite dans Pennylane sans webhook peut rester invisible
+jusqu'à cette durée. `PENNYLANE_REDIS_CACHE_TTL=0` garde Redis pour la seule
+limitation de débit.
+
+Variables d'environnement :
+    PENNYLANE_REDIS_URL: URL du serveur Redis (backends partagés désactivés si absent)
+    PENNYLANE_REDIS_PREFIX: préfixe des clés Redis (défaut "pennylane-mcp:")
+    PENNYLANE_REDIS_CACHE_TTL: durée de vie des réponses partagées (secondes, défaut 60 ; 0 désactive le cache partagé)
+    PENNYLANE_REDIS_REFERENCE_TTL: durée de vie des données de référence partagées (secondes, défaut 86400)
+    PENNYLANE_RATE_LIMIT: requêtes par seconde vers l'API, par clé d'API (défaut 0 : pas de limite)
+    PENNYLANE_RATE_BURST: rafale maximale du seau à jetons (défaut : PENNYLANE_RATE_LIMIT)
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Any
+
+from . import metrics
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("PENNYLANE_REDIS_URL")
+REDIS_PREFIX = os.getenv("PENNYLANE_REDIS_PREFIX", "pennylane-mcp:")
+REDIS_CACHE_TTL = float(os.getenv("PENNYLANE_REDIS_CACHE_TTL", "60"))
+REDIS_REFERENCE_TTL = float(os.getenv("PENNYLANE_REDIS_REFERENCE_TTL", "86400"))
+RATE_LIMIT = float(os.getenv("PENNYLANE_RATE_LIMIT", "0"))
+RATE_BURST = float(os.getenv("PENNYLANE_RATE_BURST") or RATE_LIMIT or 1)
+
+# Données de référence : listes et détails conservés longtemps (cache disque et cache partagé)
+REFERENCE_RESOURCES = frozenset({"categories", "ledger_accounts", "bank_accounts"})
+
+# Délais réseau courts : un Redis lent ne doit pas ralentir les outils ; protocole RESP2 (tous serveurs compatibles)
+_CONNECTION_OPTIONS = {"socket_timeout": 0.25, "socket_connect_timeout": 0.5, "protocol": 2}
+
+BACKEND_ERRORS = metrics.register(metrics.Counter(
+    "pennylane_backend_errors_total", "Erreurs des backends partagés (ignorées)", ("backend", "operation")
+))
+
+
+class CacheBackend:
+    """Second niveau du cache des réponses : réponses sérialisables avec expiration (horloge murale).
+
+    Les méthodes sont asynchrones : un backend réseau (Redis) ne doit pas bloquer
+    la boucle asyncio, donc les autres outils, pendant ses allers-retours.
+    """
+
+    # Nom du niveau dans `pennylane_cache_lookups_total`
+    name = "backend"
+
+    async def get(self, key: str, stale_ttl: float = 0.0) -> tuple[Any, float] | None:
+        """Réponse et date d'expiration, ou None ; `stale_ttl` accepte les réponses expirées depuis moins longtemps."""
+        raise NotImplementedError
+
+    async def put(self, key: str, resource: str, record_id: int | None, value: Any) -> bool:
+        """Conserve une réponse (False si le backend ne la conserve pas)."""
+        raise NotImplementedError
+
+    async def merge(self, key: str, data: dict[str, Any]) -> bool:
+        """Met à jour en place une réponse de détail, en conservant son expiration."""
+        raise NotImplementedError
+
+    async def invalidate(self, resource: str, record_id: int | None = None, keep: str | None = None) -> int:
+        """Supprime les listes d'une ressource et les entrées de `record_id` (toutes sans `record_id`), sauf la clé `keep`."""
+        raise NotImplementedError
+
+    async def invalidate_lists(self, resource: str) -> int:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class RateLimiter:
+    """Limitation de débit des requêtes vers l'API (interface de `ratelimit.TokenBucket`)."""
+
+    async def acquire(self) -> None:
+        """Attend qu'une requête soit autorisée."""
+        raise NotImplementedError
+
+    def penalize(self, seconds: float) -> None:
+        """Suspend les requêtes (réponse 429 avec `Retry-After`)."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalRateLimiter(RateLimiter):
+    """Seau à jetons propre au processus."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.bucket = TokenBucket(rate, burst)
+
+    async def acquire(self) -> None:
+        await self.bucket.acquire()
+
+    def penalize(self, seconds: float) -> None:
+        self.bucket.penalize(seconds)
+
+
+class FileRateLimiter(RateLimiter):
+    """Seau à jetons partagé par les processus d'une machine (workers pré-forkés).
+
+    L'état (jetons, date de mise à jour) tient en 16 octets dans un fichier,
+    lu et écrit sous verrou `flock` exclusif : quelques µs, accès synchrone.
+    Comme `RedisTokenBucket`, chaque acquisition réserve un jeton puis attend.
+    """
+
+    _STATE = struct.Struct("dd")
+
+    def __init__(self, path: str, rate: float, burst: float = 1.0):
+        self.path = path
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def _take(self, penalty: float = 0.0) -> float:
+        """Retire un jeton (ou applique une pénalité) et retourne l'attente nécessaire."""
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            now = time.time()
+            raw = os.pread(self.fd, self._STATE.size, 0)
+            tokens, updated_at = self._STATE.unpack(raw) if len(raw) == self._STATE.size else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+            tokens = min(tokens, 0.0) - penalty * self.rate if penalty > 0 else tokens - 1
+            os.pwrite(self.fd, self._STATE.pack(tokens, now), 0)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+    async def acquire(self) -> None:
+        wait = self._take()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        self._take(seconds)
+
+    async def close(self) -> None:
+        os.close(self.fd)
+
+
+def _require_redis():
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError("PENNYLANE_REDIS_URL requires redis-py (pip install pennylane-mcp[redis])") from e
+    return redis
+
+
+def _encode(value: Any, expires_at: float) -> bytes:
+    body = zlib.compress(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode())
+    return struct.pack("!d", expires_at) + body
+
+
+def _decode(blob: bytes) -> tuple[Any, float]:
+    return json.loads(zlib.decompress(blob[8:])), struct.unpack("!d", blob[:8])[0]
+
+
+class RedisCache(CacheBackend):
+    """Réponses partagées entre réplicas dans Redis, indexées par ressource et par enregistrement.
+
+    Chaque réponse est une chaîne (date d'expiration + JSON compressé) dont
+    l'expiration Redis couvre aussi la période de service périmé ; des
+    ensembles par ressource (listes, enregistrements) permettent d'invalider
+    précisément les entrées, quel que soit le réplica qui les a écrites.
+    Le client est asynchrone (`redis.asyncio`) : un Redis lent ou injoignable
+    retarde l'outil concerné (délais de `_CONNECTION_OPTIONS`), pas les autres.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = REDIS_PREFIX,
+        ttl: float = REDIS_CACHE_TTL,
+        reference_ttl: float = REDIS_REFERENCE_TTL,
+        stale_ttl: float = 3600.0,
+    ):
+        redis = _require_redis()
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url, **_CONNECTION_OPTIONS)
+        self.errors = (redis.RedisError, OSError)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.reference_ttl = reference_ttl
+        self.stale_ttl = stale_ttl
+
+    def ttl_for(self, resource: str, record_id: int | None) -> float:
+        return self.reference_ttl if resource in REFERENCE_RESOURCES else self.ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}c:{key}"
+
+    def _index(self, resource: str, record_id: int | str | None = None) -> str:
+        """Ensemble des clés d'une ressource : toutes (`record_id` None), ses listes ("lists") ou un enregistrement."""
+        suffix = "" if record_id is None else f":{record_id}"
+        return f"{self.prefix}i:{resource}{suffix}"
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        BACKEND_ERRORS.inc(backend="redis_cache", operation=operation)
+        logger.warning(f"Redis cache {operation} failed: {error}")
+
+    async def get(self, key: str, stale_ttl: float = 0.0) -> tuple[Any, float] | None:
+        try:
+            blob = await self.redis.get(self._key(key))
+        except self.errors as e:
+            self._failed("get", e)
+            return None
+        if blob is None:
+            return None
+        value, expires_at = _decode(blob)
+        if expires_at + stale_ttl <= time.time():
+            return None
+        return value, expires_at
+
+    async def put(self, key: str, resource: str, record_id: int | None, value: Any) -> bool:
+        ttl = self.ttl_for(resource, record_id)
+        if ttl <= 0:
+            return False
+        keep_ms = int((ttl + self.stale_ttl) * 1000)
+        redis_key = self._key(key)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(redis_key, _encode(value, time.time() + ttl), px=keep_ms)
+                for index in (self._index(resource), self._index(resource, "lists" if record_id is None else record_id)):
+                    pipe.sadd(index, redis_key)
+                    pipe.pexpire(index, keep_ms)
+                await pipe.execute()
+        except self.errors as e:
+            self._failed("put", e)
+            return False
+        return True
+
+    async def merge(self, key: str, data: dict[str, Any]) -> bool:
+        redis_key = self._key(key)
+        try:
+            blob = await self.redis.get(redis_key)
+            if blob is None:
+                return False
+            value, expires_at = _decode(blob)
+            if not isinstance(value, dict):
+                return False
+            await self.redis.set(redis_key, _encode({**value, **data}, expires_at), keepttl=True)
+        except self.errors as e:
+            self._failed("merge", e)
+            return False
+        return True
+
+    async def _delete_members(self, indexes: list[str], keep: str | None = None) -> int:
+        members = await self.redis.sunion(indexes)
+        keys = [member for member in members if member.decode() != keep]
+        if not keys:
+            return 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            for index in indexes:
+                pipe.srem(index, *keys)
+            return (await pipe.execute())[0]
+
+    async def invalidate(self, resource: str, record_id: int | None = None, keep: str | None = None) -> int:
+        try:
+            if record_id is None:
+                removed = await self._delete_members([self._index(resource)])
+                await self.redis.delete(self._index(resource))
+                return removed
+            indexes = [self._index(resource, "lists"), self._index(resource, record_id)]
+            return await self._delete_members(indexes, keep=self._key(keep) if keep else None)
+        except self.errors as e:
+            self._failed("invalidate", e)
+            return 0
+
+    async def invalidate_lists(self, resource: str) -> int:
+        try:
+            return await self._delete_members([self._index(resource, "lists")])
+        except self.errors as e:
+            self._failed("invalidate", e)
+            return 0
+
+    async def clear(self) -> None:
+        try:
+            keys = [key async for key in self.redis.scan_iter(match=f"{self.prefix}[ci]:*", count=1000)]
+            for start in range(0, len(keys), 1000):
+                await self.redis.delete(*keys[start:start + 1000])
+        except self.errors as e:
+            self._failed("clear", e)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+# Seau à jetons partagé : remplissage, prise d'un jeton (ou pénalité) et attente, en une étape atomique.
+# L'horloge du serveur Redis est commune à tous les réplicas.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local penalty = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+if penalty > 0 then
+    tokens = math.min(tokens, 0) - penalty * rate
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisTokenBucket(RateLimiter):
+    """Seau à jetons global par clé d'API, partagé par tous les réplicas via Redis.
+
+    Chaque acquisition réserve un jeton (le solde peut devenir négatif) et
+    attend le délai retourné par le script : les réplicas se partagent le débit
+    dans l'ordre de leurs demandes. Si Redis est injoignable, le seau local
+    prend le relais.
+    """
+
+    def __init__(self, url: str, api_key: str, rate: float, burst: float = 1.0, prefix: str = REDIS_PREFIX):
+        redis = _require_redis()
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url, **_CONNECTION_OPTIONS)
+        self.errors = (redis.RedisError, OSError)
+        self.script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        # Clé dérivée de la clé d'API (jamais stockée en clair)
+        self.key = f"{prefix}bucket:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.fallback = TokenBucket(rate, burst)
+        self._pending: set[asyncio.Task] = set()
+
+    async def _call(self, penalty: float) -> float:
+        wait = await self.script(keys=[self.key], args=[self.rate, self.burst, penalty])
+        return float(wait)
+
+    async def acquire(self) -> None:
+        try:
+            wait = await self._call(0)
+        except self.errors as e:
+            BACKEND_ERRORS.inc(backend="redis_rate_limit", operation="acquire")
+            logger.warning(f"Redis rate limiter unavailable, using local bucket: {e}")
+            await self.fallback.acquire()
+            return
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        self.fallback.penalize(seconds)
+        task = asyncio.get_running_loop().create_task(self._penalize(seconds))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _penalize(self, seconds: float) -> None:
+        try:
+            await self._call(seconds)
+        except self.errors as e:
+            BACKEND_ERRORS.inc(backend="redis_rate_limit", operation="penalize")
+            logger.warning(f"Redis rate limiter penalty failed: {e}")
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.redis.aclose()
+
+
+def configure_cache_from_env(stale_ttl: float = 3600.0) -> RedisCache | None:
+    """Cache partagé si `PENNYLANE_REDIS_URL` est défini (et `PENNYLANE_REDIS_CACHE_TTL` non nul)."""
+    if not REDIS_URL or REDIS_CACHE_TTL <= 0:
+        return None
+    logger.info(f"Shared response cache: Redis ({REDIS_PREFIX}*)")
+    return RedisCache(REDIS_URL, stale_ttl=stale_ttl)
+
+
+def configure_rate_limiter_from_env(api_key: str, shared_file: str | None = None) -> RateLimiter | None:
+    """Limitation de débit si `PENNYLANE_RATE_LIMIT` est défini.
+
+    Globale avec Redis, partagée par les workers de la machine avec `shared_file`, propre au processus sinon.
+    """
+    if RATE_LIMIT <= 0:
+        return None
+    if REDIS_URL:
+        logger.info(f"Rate limit: {RATE_LIMIT:g} req/s shared through Redis")
+        return RedisTokenBucket(REDIS_URL, api_key, RATE_LIMIT, RATE_BURST)
+    if shared_file:
+        logger.info(f"Rate limit: {RATE_LIMIT:g} req/s shared by local workers")
+        return FileRateLimiter(shared_file, RATE_LIMIT, RATE_BURST)
+    logger.info(f"Rate limit: {RATE_LIMIT:g} req/s (local)")
+    return LocalRateLimiter(RATE_LIMIT, RATE_BURST)
@@ -0,0 +1,134 @@
+"""Disjoncteurs par famille d'endpoints Pennylane (`customer_invoices`, `transactions`, ...).
+
+Après `PENNYLANE_BREAKER_THRESHOLD` échecs consécutifs (expiration, erreur
+réseau, 5xx), le circuit de la famille s'ouvre : les appels échouent aussitôt
+(`CircuitOpenError`) au lieu d'attendre le délai d'expiration HTTP, et le client
+sert les lectures depuis le cache, même périmé. Après `PENNYLANE_BREAKER_RESET`
+secondes, le circuit passe en semi-ouverture : une seule requête de test est
+autorisée, qui le referme si elle aboutit ou le rouvre sinon. Une requête de
+test sans verdict (429, annulation, échéance de l'outil) libère sa place : la
+requête suivante sert de test, sans attendre un nouveau délai. Les réponses 429
+ne comptent jamais comme des échecs.
+
+Variables d'environnement :
+    PENNYLANE_BREAKER_THRESHOLD: échecs consécutifs avant ouverture (défaut 5 ; 0 désactive)
+    PENNYLANE_BREAKER_RESET: durée d'ouverture avant test (secondes, défaut 30)
+"""
+import logging
+import math
+import os
+import time
+from typing import Any
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+BREAKER_THRESHOLD = int(os.getenv("PENNYLANE_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("PENNYLANE_BREAKER_RESET", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.register(metrics.Gauge(
+    "pennylane_circuit_state", "État du disjoncteur par famille d'endpoints (0 fermé, 1 semi-ouvert, 2 ouvert)", ("family",)
+))
+CIRCUIT_REJECTIONS = metrics.register(metrics.Counter(
+    "pennylane_circuit_rejections_total", "Appels refusés par un disjoncteur ouvert", ("family",)
+))
+
+
+class CircuitOpenError(Exception):
+    """Appel refusé : l'API Pennylane est dégradée pour cette famille d'endpoints."""
+
+    def __init__(self, family: str, retry_in: float):
+        super().__init__(
+            f"Pennylane API unavailable for {family} (circuit open after repeated failures, retry in {math.ceil(retry_in)}s)"
+        )
+        self.family = family
+        self.retry_in = retry_in
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "opened_at", "probe_started_at")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: float | None = None
+
+
+class CircuitBreaker:
+    """Ensemble des disjoncteurs, un par famille d'endpoints."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._circuits: dict[str, _Circuit] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def _set_state(self, family: str, circuit: _Circuit, state: str) -> None:
+        if circuit.state != state:
+            logger.warning(f"Circuit {family}: {circuit.state} -> {state}")
+        circuit.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], family=family)
+
+    def state(self, family: str) -> str:
+        circuit = self._circuits.get(family)
+        return circuit.state if circuit else CLOSED
+
+    def before_request(self, family: str) -> bool:
+        """Autorise la requête ou lève `CircuitOpenError` ; vrai si la requête est le test de semi-ouverture."""
+        if not self.enabled:
+            return False
+        circuit = self._circuits.get(family)
+        if circuit is None or circuit.state == CLOSED:
+            return False
+        now = time.monotonic()
+        if circuit.state == OPEN:
+            retry_in = circuit.opened_at + self.reset_timeout - now
+            if retry_in > 0:
+                CIRCUIT_REJECTIONS.inc(family=family)
+                raise CircuitOpenError(family, retry_in)
+            self._set_state(family, circuit, HALF_OPEN)
+        # Semi-ouvert : une requête de test à la fois (relancée si la précédente a été abandonnée)
+        if circuit.probe_started_at is not None and now - circuit.probe_started_at < self.reset_timeout:
+            CIRCUIT_REJECTIONS.inc(family=family)
+            raise CircuitOpenError(family, circuit.probe_started_at + self.reset_timeout - now)
+        circuit.probe_started_at = now
+        return True
+
+    def release(self, family: str) -> None:
+        """Libère la place de test d'une requête terminée sans verdict (429, annulation, échéance)."""
+        circuit = self._circuits.get(family)
+        if circuit is not None and circuit.state == HALF_OPEN:
+            circuit.probe_started_at = None
+
+    def record_success(self, family: str) -> None:
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            return
+        circuit.failures = 0
+        circuit.probe_started_at = None
+        if circuit.state != CLOSED:
+            self._set_state(family, circuit, CLOSED)
+
+    def record_failure(self, family: str) -> None:
+        if not self.enabled:
+            return
+        circuit = self._circuits.setdefault(family, _Circuit())
+        circuit.failures += 1
+        circuit.probe_started_at = None
+        if circuit.state == HALF_OPEN or circuit.failures >= self.threshold:
+            circuit.opened_at = time.monotonic()
+            self._set_state(family, circuit, OPEN)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            family: {"state": circuit.state, "consecutive_failures": circuit.failures}
+            for family, circuit in self._circuits.items()
+        }
@@ -0,0 +1,278 @@
+"""Cache des réponses GET de l'API Pennylane.
+
+Les réponses sont conservées (LRU, bornées en durée et en octets) sous la clé
+`(endpoint, paramètres)` et indexées par ressource (`customer_invoices`, ...)
+et par enregistrement, pour être invalidées précisément :
+- par les écritures du client (POST/PUT/DELETE) ;
+- par les événements webhook Pennylane (`webhooks.py`), qui peuvent aussi
+  mettre à jour en place le détail d'un enregistrement.
+
+Les réponses expirées restent disponibles (`get_stale`) jusqu'à
+`PENNYLANE_CACHE_STALE_TTL` pour servir les lectures quand le disjoncteur de
+l'API est ouvert (`breaker.py`) ; elles sont évincées en priorité (LRU).
+
+Par défaut, seules les données de référence (`backends.REFERENCE_RESOURCES` :
+catégories, plan comptable, comptes bancaires) sont gardées en mémoire. Les
+autres réponses ne le sont qu'avec `PENNYLANE_CACHE_TTL` : une écriture
+n'invalide que sa propre ressource (une facture créée ne périme pas les
+transactions ni la fiche du client en cache), et sans webhooks une
+modification faite dans Pennylane n'est vue qu'à l'expiration.
+
+Les réponses sont conservées sous forme JSON et décodées à chaque lecture :
+l'appelant reçoit sa propre copie et peut la modifier sans altérer le cache.
+
+Avec un cache disque (`diskcache.py`), les données de référence et les détails
+sont aussi conservés sur disque ; avec un cache partagé (`backends.RedisCache`),
+les réponses sont partagées entre réplicas. Une absence en mémoire est
+recherchée dans ces niveaux (disque puis partagé) avant d'appeler l'API, et les
+invalidations s'appliquent à tous les niveaux. Ces niveaux appliquent leurs
+propres durées de vie : avec `PENNYLANE_REDIS_URL`, toutes les listes et tous
+les détails sont partagés pendant `PENNYLANE_REDIS_CACHE_TTL` (60 s par défaut),
+et pas seulement les données de référence. Les méthodes qui consultent ces
+niveaux sont asynchrones, pour ne pas bloquer la boucle pendant un aller-retour
+réseau.
+
+Variables d'environnement :
+    PENNYLANE_CACHE_TTL: durée de vie des réponses (secondes, défaut 0 : données de référence seulement)
+    PENNYLANE_CACHE_REFERENCE_TTL: durée de vie des données de référence (secondes, défaut 300 ; 0 les exclut)
+    PENNYLANE_CACHE_MAX_BYTES: taille maximale du cache (octets, défaut 32 Mo)
+    PENNYLANE_CACHE_STALE_TTL: âge maximal d'une réponse servie périmée (secondes, défaut 3600)
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any
+
+from . import metrics
+from .backends import REFERENCE_RESOURCES, CacheBackend
+
+CACHE_TTL = float(os.getenv("PENNYLANE_CACHE_TTL", "0"))
+CACHE_REFERENCE_TTL = float(os.getenv("PENNYLANE_CACHE_REFERENCE_TTL", "300"))
+CACHE_MAX_BYTES = int(os.getenv("PENNYLANE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_STALE_TTL = float(os.getenv("PENNYLANE_CACHE_STALE_TTL", "3600"))
+
+CACHE_BYTES = metrics.register(metrics.Gauge(
+    "pennylane_response_cache_bytes", "Octets conservés dans le cache des réponses GET"
+))
+CACHE_INVALIDATIONS = metrics.register(metrics.Counter(
+    "pennylane_response_cache_invalidations_total", "Entrées du cache invalidées", ("resource", "reason")
+))
+
+# Valeur retournée par `get` en cas d'absence (None est une réponse valide)
+MISSING = object()
+
+CacheKey = tuple[str, str]
+
+
+def split_endpoint(endpoint: str) -> tuple[str, int | None]:
+    """Ressource et identifiant d'un endpoint (`customer_invoices/12/invoice_lines` -> ("customer_invoices", 12))."""
+    parts = endpoint.strip("/").split("/")
+    record_id = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+    return parts[0], record_id
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class _Entry:
+    __slots__ = ("data", "expires_at", "resource", "record_id")
+
+    def __init__(self, data: bytes, expires_at: float, resource: str, record_id: int | None):
+        # JSON de la réponse : chaque lecture décode une copie indépendante
+        self.data = data
+        self.expires_at = expires_at
+        self.resource = resource
+        self.record_id = record_id
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def value(self) -> Any:
+        return json.loads(self.data)
+
+
+class ResponseCache:
+    """Cache LRU des réponses GET, invalidable par ressource ou par enregistrement."""
+
+    def __init__(
+        self,
+        ttl: float = CACHE_TTL,
+        reference_ttl: float = CACHE_REFERENCE_TTL,
+        max_bytes: int = CACHE_MAX_BYTES,
+        stale_ttl: float = CACHE_STALE_TTL,
+        disk: CacheBackend | None = None,
+        shared: CacheBackend | None = None,
+    ):
+        self.ttl = ttl
+        self.reference_ttl = reference_ttl
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        # Seconds niveaux, du plus proche au plus lointain
+        self.tiers: list[CacheBackend] = [tier for tier in (disk, shared) if tier is not None]
+        self.total_bytes = 0
+        self._entries: OrderedDict[CacheKey, _Entry] = OrderedDict()
+        self._by_resource: dict[str, set[CacheKey]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 or self.reference_ttl > 0 or bool(self.tiers)
+
+    def ttl_for(self, resource: str) -> float:
+        """Durée de vie en mémoire des réponses d'une ressource (0 : pas de cache mémoire)."""
+        return self.reference_ttl if resource in REFERENCE_RESOURCES else self.ttl
+
+    @staticmethod
+    def key(endpoint: str, params: dict[str, Any] | None) -> CacheKey:
+        return endpoint.strip("/"), json.dumps(params or {}, sort_keys=True, default=str)
+
+    @staticmethod
+    def _tier_key(key: CacheKey) -> str:
+        return f"{key[0]}?{key[1]}"
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+        keys = self._by_resource.get(entry.resource)
+        if keys:
+            keys.discard(key)
+
+    async def get(self, endpoint: str, params: dict[str, Any] | None = None) -> Any:
+        """Retourne la réponse en cache, ou `MISSING`."""
+        key = self.key(endpoint, params)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            # Réponse expirée conservée pour `get_stale` (évincée en premier)
+            metrics.record_cache("response", False)
+            return await self._get_tiers(key)
+        self._entries.move_to_end(key)
+        metrics.record_cache("response", True)
+        return entry.value
+
+    async def _get_tiers(self, key: CacheKey) -> Any:
+        """Réponse d'un second niveau (disque, partagé), remise en mémoire pour les lectures suivantes."""
+        for tier in self.tiers:
+            found = await tier.get(self._tier_key(key))
+            metrics.record_cache(tier.name, found is not None)
+            if found is None:
+                continue
+            value, expires_at = found
+            # Jamais plus longtemps en mémoire que dans le niveau d'origine
+            ttl = min(self.ttl_for(split_endpoint(key[0])[0]), expires_at - time.time())
+            if ttl > 0:
+                self._store(key, _encode(value), ttl)
+            return value
+        return MISSING
+
+    async def get_stale(self, endpoint: str, params: dict[str, Any] | None = None) -> Any:
+        """Retourne la réponse en cache même expirée (dans la limite de `stale_ttl`), ou `MISSING`."""
+        key = self.key(endpoint, params)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at + self.stale_ttl <= time.monotonic():
+            for tier in self.tiers:
+                found = await tier.get(self._tier_key(key), self.stale_ttl)
+                if found is not None:
+                    metrics.record_cache("response_stale", True)
+                    return found[0]
+            metrics.record_cache("response_stale", False)
+            return MISSING
+        metrics.record_cache("response_stale", True)
+        return entry.value
+
+    async def put(self, endpoint: str, params: dict[str, Any] | None, value: Any, data: bytes | None = None) -> None:
+        """Conserve une réponse ; `data` est son JSON brut (corps de la réponse HTTP), réencodé s'il manque."""
+        key = self.key(endpoint, params)
+        resource, record_id = split_endpoint(endpoint)
+        # Les seconds niveaux, configurés explicitement, appliquent leurs propres durées de vie
+        for tier in self.tiers:
+            await tier.put(self._tier_key(key), resource, record_id, value)
+        ttl = self.ttl_for(resource)
+        if ttl > 0:
+            self._store(key, data if data is not None else _encode(value), ttl)
+
+    def _store(self, key: CacheKey, data: bytes, ttl: float) -> None:
+        size = len(data)
+        if size > self.max_bytes or ttl <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and self.total_bytes + size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        resource, record_id = split_endpoint(key[0])
+        self._entries[key] = _Entry(data, time.monotonic() + ttl, resource, record_id)
+        self._by_resource.setdefault(resource, set()).add(key)
+        self.total_bytes += size
+        CACHE_BYTES.set(self.total_bytes)
+
+    async def invalidate(self, resource: str, record_id: int | None = None, reason: str = "write") -> int:
+        """Invalide les listes d'une ressource et, si `record_id` est fourni, ses entrées de détail.
+
+        Sans `record_id`, toutes les entrées de la ressource sont invalidées.
+        """
+        removed = 0
+        for tier in self.tiers:
+            removed += await tier.invalidate(resource, record_id)
+        for key in list(self._by_resource.get(resource, ())):
+            entry = self._entries[key]
+            if record_id is None or entry.record_id is None or entry.record_id == record_id:
+                self._remove(key)
+                removed += 1
+        if removed:
+            CACHE_INVALIDATIONS.inc(removed, resource=resource, reason=reason)
+            CACHE_BYTES.set(self.total_bytes)
+        return removed
+
+    async def update_record(self, resource: str, record_id: int, data: dict[str, Any]) -> bool:
+        """Met à jour en place le détail en cache d'un enregistrement (listes et sous-ressources invalidées)."""
+        key = self.key(f"{resource}/{record_id}", None)
+        await self.invalidate_lists(resource, reason="webhook")
+        stale = [k for k in self._by_resource.get(resource, ()) if k != key and self._entries[k].record_id == record_id]
+        for k in stale:
+            self._remove(k)
+        updated = False
+        detail_key = self._tier_key(key)
+        for tier in self.tiers:
+            await tier.invalidate(resource, record_id, keep=detail_key)
+            updated = await tier.merge(detail_key, data) or updated
+        entry = self._entries.get(key)
+        value = entry.value if entry is not None else None
+        if not isinstance(value, dict):
+            return updated
+        self._store(key, _encode({**value, **data}), self.ttl_for(resource))
+        return True
+
+    async def invalidate_lists(self, resource: str, reason: str = "write") -> int:
+        """Invalide uniquement les listes d'une ressource (les détails restent en cache)."""
+        removed = 0
+        for tier in self.tiers:
+            removed += await tier.invalidate_lists(resource)
+        for key in list(self._by_resource.get(resource, ())):
+            if self._entries[key].record_id is None:
+                self._remove(key)
+                removed += 1
+        if removed:
+            CACHE_INVALIDATIONS.inc(removed, resource=resource, reason=reason)
+            CACHE_BYTES.set(self.total_bytes)
+        return removed
+
+    async def apply_event(self, resource: str, action: str, record_id: int | None, data: dict[str, Any]) -> int:
+        """Applique un événement de modification : mise à jour en place ou invalidation ciblée."""
+        if record_id is None:
+            return await self.invalidate(resource, reason="webhook")
+        if action == "created":
+            return await self.invalidate_lists(resource, reason="webhook")
+        if action == "updated" and set(data) - {"id"}:
+            return int(await self.update_record(resource, record_id, data))
+        return await self.invalidate(resource, record_id, reason="webhook")
+
+    async def clear(self) -> None:
+        for tier in self.tiers:
+            await tier.clear()
+        self._entries.clear()
+        self._by_resource.clear()
+        self.total_bytes = 0
+        CACHE_BYTES.set(0)
+
@@ -1,82 +1,205 @@
 """Client HTTP pour l'API Pennylane."""
+import os
+import time
+import asyncio
 import httpx
 from typing import Any, Optional
 import logging
 
+from . import deadlines, logs, metrics, tracing
+from .backends import RateLimiter
+from .breaker import CircuitBreaker, CircuitOpenError
+from .cache import MISSING, ResponseCache, split_endpoint
+from .hedging import HEDGED_REQUESTS, Hedger
+
 logger = logging.getLogger(__name__)
 
+# Délai d'expiration par défaut d'une requête (borné par l'échéance de l'outil)
+HTTP_TIMEOUT = float(os.getenv("PENNYLANE_HTTP_TIMEOUT", "30"))
+
+# Taille maximale d'un corps d'erreur conservé (message d'erreur de l'outil) ; les logs en gardent moins
+_ERROR_BODY_BYTES = 4096
+
+
+class PennylaneAPIError(Exception):
+    """Réponse d'erreur de l'API Pennylane (statut HTTP conservé)."""
+
+    def __init__(self, status_code: int, text: str, retry_after: float | None = None):
+        super().__init__(f"API error: {status_code} - {text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
 class PennylaneClient:
     """Client pour interagir avec l'API Pennylane."""
-    
-    def __init__(self, api_key: str, base_url: str = "https://app.pennylane.com/api/external/v2"):
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://app.pennylane.com/api/external/v2",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ResponseCache] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedger: Optional[Hedger] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
+        self.cache = cache if cache is not None else ResponseCache()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.hedger = hedger if hedger is not None else Hedger()
+        # Débit autorisé par l'API (local ou partagé entre réplicas), aucune limite par défaut
+        self.limiter = limiter
         self.client = httpx.AsyncClient(
             headers={
                 "Authorization": f"Bearer {api_key}",
                 "Accept": "application/json",
                 "Content-Type": "application/json",
             },
-            timeout=30.0,
+            timeout=HTTP_TIMEOUT,
+            transport=transport,
         )
-    
-    async def get(self, endpoint: str, params: Optional[dict[str, Any]] = None) -> dict[str, Any]:
-        """Effectue une requête GET."""
+
+    async def _request(self, method: str, endpoint: str, **kwargs: Any) -> dict[str, Any]:
+        """Effectue une requête et enregistre ses métriques."""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        family = split_endpoint(endpoint)[0]
+        timeout, bounded = deadlines.request_timeout(HTTP_TIMEOUT)
+        probe = self.breaker.before_request(family)
+        if self.limiter is not None:
+            try:
+                with tracing.span("rate_limit.acquire"):
+                    await self.limiter.acquire()
+            except BaseException:
+                if probe:
+                    self.breaker.release(family)
+                raise
+        start = time.perf_counter()
+        status: int | str = "error"
+        size = 0
+        with tracing.span("pennylane.request", method=method, endpoint=metrics.normalize_endpoint(endpoint)) as request_span:
+            try:
+                with tracing.span("http.send"):
+                    response = await self.client.request(method, url, timeout=timeout, **kwargs)
+                status = response.status_code
+                size = len(response.content)
+                request_span.set_attribute("http.status_code", status)
+                request_span.set_attribute("http.response_bytes", size)
+                if response.status_code >= 500:
+                    self.breaker.record_failure(family)
+                elif response.status_code != 429:
+                    self.breaker.record_success(family)
+                response.raise_for_status()
+                with tracing.span("http.decode"):
+                    result = response.json()
+                if method == "GET":
+                    await self.cache.put(endpoint, kwargs.get("params"), result, response.content)
+                    if self.hedger.enabled:
+                        self.hedger.observe(metrics.normalize_endpoint(endpoint), time.perf_counter() - start)
+                else:
+                    # Écriture : listes et détail de l'enregistrement concerné périmés
+                    await self.cache.invalidate(*split_endpoint(endpoint))
+                return result
+            except httpx.HTTPStatusError as e:
+                # Corps d'erreur tronqué (page HTML de plusieurs Mo pendant une panne), sans décoder le reste
+                body = logs.excerpt(e.response.content, _ERROR_BODY_BYTES)
+                logger.error("HTTP error %s on %s %s: %s", e.response.status_code, method, endpoint, logs.truncate(body, 500))
+                retry_after = e.response.headers.get("Retry-After")
+                if e.response.status_code == 429 and self.limiter is not None and retry_after and retry_after.isdigit():
+                    self.limiter.penalize(float(retry_after))
+                raise PennylaneAPIError(
+                    e.response.status_code,
+                    body,
+                    float(retry_after) if retry_after and retry_after.isdigit() else None,
+                )
+            except asyncio.CancelledError:
+                # Requête abandonnée (couverture perdante, outil annulé)
+                status = "cancelled"
+                raise
+            except httpx.TransportError as e:
+                if bounded and isinstance(e, httpx.TimeoutException):
+                    # Expiration due à l'échéance de l'outil, pas à l'API
+                    raise deadlines.DeadlineExceeded(f"Tool deadline exceeded during {method} {endpoint}") from e
+                # Expiration ou erreur réseau : compte pour le disjoncteur
+                self.breaker.record_failure(family)
+                logger.error("Request failed: %s %s: %s", method, endpoint, e)
+                raise
+            except Exception as e:
+                logger.error("Request failed: %s %s: %s", method, endpoint, e)
+                raise
+            finally:
+                if probe:
+                    # Test sans verdict (429, annulation, échéance) : la requête suivante servira de test
+                    self.breaker.release(family)
+                metrics.record_upstream(method, endpoint, status, time.perf_counter() - start, size)
+
+    async def get(self, endpoint: str, params: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """Effectue une requête GET (servie par le cache si possible, même périmé si le circuit est ouvert)."""
+        if self.cache.enabled:
+            cached = await self.cache.get(endpoint, params)
+            if cached is not MISSING:
+                return cached
         try:
-            response = await self.client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise
-    
-    async def post(self, endpoint: str, data: Optional[dict[str, Any]] = None) -> dict[str, Any]:
-        """Effectue une requête POST."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+            if self.hedger.enabled:
+                return await self._hedged_get(endpoint, params)
+            return await self._request("GET", endpoint, params=params)
+        except CircuitOpenError:
+            stale = await self.cache.get_stale(endpoint, params)
+            if stale is MISSING:
+                raise
+            logger.warning(f"Circuit open for {endpoint}: serving stale cached response")
+            return stale
+
+    async def _hedged_get(self, endpoint: str, params: Optional[dict[str, Any]]) -> dict[str, Any]:
+        """GET couvert : seconde requête si la première dépasse le seuil de latence de l'endpoint."""
+        name = metrics.normalize_endpoint(endpoint)
+        delay = self.hedger.delay(name)
+        self.hedger.credit()
+        if delay is None:
+            return await self._request("GET", endpoint, params=params)
+
+        primary = asyncio.ensure_future(self._request("GET", endpoint, params=params))
+        attempts = [primary]
         try:
-            response = await self.client.post(url, json=data)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise
-    
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done or not self.hedger.try_spend():
+                return await primary
+
+            attempts.append(asyncio.ensure_future(self._request("GET", endpoint, params=params)))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if not task.exception()), None)
+                if winner is not None:
+                    HEDGED_REQUESTS.inc(endpoint=name, result="primary" if winner is primary else "hedge")
+                    return winner.result()
+            # Les deux tentatives ont échoué : erreur de la première
+            return primary.result()
+        finally:
+            # Couverture perdante (ou appel annulé) : requêtes interrompues, connexions libérées
+            for task in attempts:
+                task.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def post(
+        self,
+        endpoint: str,
+        data: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> dict[str, Any]:
+        """Effectue une requête POST (en-têtes supplémentaires : `Idempotency-Key`, ...)."""
+        return await self._request("POST", endpoint, json=data, headers=headers)
+
     async def put(self, endpoint: str, data: Optional[dict[str, Any]] = None) -> dict[str, Any]:
         """Effectue une requête PUT."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            response = await self.client.put(url, json=data)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise
-    
+        return await self._request("PUT", endpoint, json=data)
+
     async def delete(self, endpoint: str) -> dict[str, Any]:
         """Effectue une requête DELETE."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        try:
-            response = await self.client.delete(url)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-            raise Exception(f"API error: {e.response.status_code} - {e.response.text}")
-        except Exception as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise
-    
+        return await self._request("DELETE", endpoint)
+
     async def close(self):
         """Ferme le client HTTP."""
-        await self.client.aclose()
\ No newline at end of file
+        await self.client.aclose()
+        if self.limiter is not None:
+            await self.limiter.close()
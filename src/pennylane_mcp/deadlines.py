@@ -0,0 +1,83 @@
+"""Échéances des appels d'outils.
+
+Chaque appel d'outil dispose d'un budget de temps (par défaut selon l'outil,
+modifiable par l'argument `timeout_seconds`). L'échéance absolue est portée par
+une variable de contexte : elle suit l'exécution dans la pagination et dans les
+tâches concurrentes (`asyncio` copie le contexte), et borne le délai
+d'expiration de chaque requête HTTP. À l'échéance, l'outil est annulé : les
+requêtes en vol sont interrompues et leurs connexions libérées.
+
+Variables d'environnement :
+    PENNYLANE_TOOL_TIMEOUT: budget par défaut d'un outil (secondes, défaut 60)
+    PENNYLANE_LONG_TOOL_TIMEOUT: budget des parcours complets et rapports (secondes, défaut 300)
+    PENNYLANE_MAX_TOOL_TIMEOUT: valeur maximale acceptée pour `timeout_seconds` (secondes, défaut 900)
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+TOOL_TIMEOUT = float(os.getenv("PENNYLANE_TOOL_TIMEOUT", "60"))
+LONG_TOOL_TIMEOUT = float(os.getenv("PENNYLANE_LONG_TOOL_TIMEOUT", "300"))
+MAX_TOOL_TIMEOUT = float(os.getenv("PENNYLANE_MAX_TOOL_TIMEOUT", "900"))
+
+# Outils parcourant de nombreuses pages ou enchaînant de nombreux appels
+LONG_TOOLS = frozenset({
+    "pennylane_list_all",
+    "pennylane_aged_receivables",
+    "pennylane_aged_payables",
+    "pennylane_cash_forecast",
+    "pennylane_convert_quotes_to_invoices",
+    "pennylane_find_duplicates",
+})
+
+_deadline: ContextVar[float | None] = ContextVar("pennylane_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Le budget de temps de l'appel d'outil est épuisé."""
+
+
+def for_tool(name: str, override: Any = None) -> float:
+    """Budget de temps d'un outil (secondes), `override` venant de l'argument `timeout_seconds`."""
+    if override is not None:
+        try:
+            seconds = float(override)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid timeout_seconds: {override!r}")
+        if seconds <= 0:
+            raise ValueError("timeout_seconds must be positive")
+        return min(seconds, MAX_TOOL_TIMEOUT)
+    return LONG_TOOL_TIMEOUT if name in LONG_TOOLS else TOOL_TIMEOUT
+
+
+@contextmanager
+def scope(seconds: float) -> Iterator[None]:
+    """Fixe l'échéance du contexte courant (jamais plus tardive qu'une échéance englobante)."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Temps restant avant l'échéance (None sans échéance)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def request_timeout(default: float) -> tuple[float, bool]:
+    """Délai d'expiration d'une requête HTTP et indicateur « borné par l'échéance ».
+
+    Lève `DeadlineExceeded` si l'échéance est déjà atteinte.
+    """
+    left = remaining()
+    if left is None or left >= default:
+        return default, False
+    if left <= 0:
+        raise DeadlineExceeded("Tool deadline exceeded before the request was sent")
+    return left, True
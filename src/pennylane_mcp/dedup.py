@@ -0,0 +1,271 @@
+"""Détection des doublons de clients et de fournisseurs.
+
+Comparer chaque enregistrement à tous les autres est quadratique (50 000 tiers :
+1,25 milliard de paires). L'index répartit les enregistrements dans des blocs
+par clé de regroupement (SIREN, numéro de TVA, IBAN, nom normalisé, préfixes du
+nom, domaine des emails) : seules les paires partageant au moins un bloc sont
+comparées et notées. Les blocs trop fournis (nom ou domaine très courant) sont
+ignorés, les identifiants forts suffisant alors à rapprocher les doublons.
+
+Les paires dont le score atteint le seuil sont regroupées en grappes
+(union-find). Le même index sert au contrôle avant création d'un tiers
+(`DuplicateIndex.match`).
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Any, Iterable
+
+# Au-delà, un bloc n'est pas comparé (clé trop peu discriminante)
+MAX_BLOCK_SIZE = 200
+
+# Formes juridiques et mots vides ignorés dans les noms
+_NAME_STOPWORDS = frozenset({
+    "sas", "sasu", "sarl", "eurl", "sa", "snc", "sci", "scop", "selarl", "sca", "scs", "gie", "ei", "eirl",
+    "ste", "societe", "ets", "etablissements", "cie", "et", "de", "du", "des", "la", "le", "les", "l", "d",
+    "the", "and", "ltd", "llc", "inc", "gmbh", "srl", "bv", "co",
+})
+# Domaines de messagerie grand public : ne désignent pas une entreprise
+GENERIC_EMAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "yahoo.fr", "yahoo.com", "hotmail.fr", "hotmail.com", "outlook.fr",
+    "outlook.com", "live.fr", "live.com", "msn.com", "icloud.com", "me.com", "orange.fr", "wanadoo.fr",
+    "free.fr", "sfr.fr", "neuf.fr", "laposte.net", "bbox.fr", "gmx.fr", "gmx.com", "protonmail.com", "proton.me",
+})
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_FR_VAT = re.compile(r"^FR[0-9A-Z]{2}(\d{9})$")
+
+
+def normalize_name(name: str | None) -> str:
+    """Nom sans accents, ponctuation, forme juridique ni mots vides ("S.A.S. L'Atelier Durand" -> "atelier durand")."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower().replace(".", "")
+    return " ".join(token for token in _NON_ALNUM.split(text) if token and token not in _NAME_STOPWORDS)
+
+
+def _compact(value: Any) -> str:
+    return re.sub(r"[\s.\-]", "", str(value)).upper() if value else ""
+
+
+def siren(record: dict[str, Any]) -> str:
+    """SIREN d'un tiers, depuis `reg_no` ou son numéro de TVA français."""
+    reg_no = _compact(record.get("reg_no"))
+    if len(reg_no) >= 9 and reg_no[:9].isdigit():
+        return reg_no[:9]
+    match = _FR_VAT.match(_compact(record.get("vat_number")))
+    return match.group(1) if match else ""
+
+
+def email_domains(record: dict[str, Any]) -> set[str]:
+    """Domaines des emails d'un tiers, hors messageries grand public."""
+    emails = record.get("emails") or []
+    if isinstance(emails, str):
+        emails = [emails]
+    domains = {email.rpartition("@")[2].strip().lower() for email in emails if isinstance(email, str) and "@" in email}
+    return domains - GENERIC_EMAIL_DOMAINS
+
+
+def display_name(record: dict[str, Any]) -> str:
+    name = record.get("name")
+    if name:
+        return str(name)
+    return " ".join(str(part) for part in (record.get("first_name"), record.get("last_name")) if part)
+
+
+class Entry:
+    """Forme comparable d'un tiers (seuls les champs utiles sont conservés)."""
+
+    __slots__ = ("id", "name", "normalized", "siren", "vat", "iban", "domains", "keys")
+
+    def __init__(self, record: dict[str, Any]):
+        self.id = record.get("id")
+        self.name = display_name(record)
+        self.normalized = normalize_name(self.name)
+        self.siren = siren(record)
+        self.vat = _compact(record.get("vat_number"))
+        self.iban = _compact(record.get("iban") or record.get("billing_iban"))
+        self.domains = email_domains(record)
+        self.keys = self._blocking_keys()
+
+    def _blocking_keys(self) -> set[tuple[str, str]]:
+        keys: set[tuple[str, str]] = set()
+        if self.siren:
+            keys.add(("siren", self.siren))
+        elif self.vat:
+            keys.add(("vat", self.vat))
+        if self.iban:
+            keys.add(("iban", self.iban))
+        keys.update(("domain", domain) for domain in self.domains)
+        tokens = self.normalized.split()
+        if tokens:
+            keys.add(("name", " ".join(sorted(tokens))))
+            # Préfixes des mots : rapproche les fautes de frappe en fin de mot
+            prefixes = sorted({token[:4] for token in tokens if len(token) > 2})
+            if prefixes:
+                keys.add(("prefix", " ".join(prefixes[:3])))
+        return keys
+
+    def summary(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"id": self.id, "name": self.name}
+        if self.siren:
+            result["siren"] = self.siren
+        if self.vat:
+            result["vat_number"] = self.vat
+        if self.iban:
+            result["iban"] = self.iban
+        return result
+
+
+def name_similarity(a: str, b: str) -> float:
+    """Similarité de deux noms normalisés (0 à 1), insensible à l'ordre des mots."""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    sorted_a, sorted_b = " ".join(sorted(a.split())), " ".join(sorted(b.split()))
+    if sorted_a != a or sorted_b != b:
+        ratio = max(ratio, SequenceMatcher(None, sorted_a, sorted_b).ratio())
+    return ratio
+
+
+def score(a: Entry, b: Entry) -> tuple[float, list[str]]:
+    """Score de doublon d'une paire (0 à 1) et critères concordants."""
+    if a.siren and b.siren and a.siren != b.siren:
+        # Deux entités juridiques distinctes
+        return 0.0, []
+    similarity = name_similarity(a.normalized, b.normalized)
+    reasons = []
+    if a.siren and a.siren == b.siren:
+        reasons.append("siren")
+    elif a.vat and a.vat == b.vat:
+        reasons.append("vat_number")
+    if a.iban and a.iban == b.iban:
+        reasons.append("iban")
+    if a.domains & b.domains:
+        reasons.append("email_domain")
+    if similarity >= 0.9:
+        reasons.append("name")
+    if "siren" in reasons or "vat_number" in reasons:
+        value = 0.9 + 0.1 * similarity
+    elif "iban" in reasons:
+        value = 0.85 + 0.15 * similarity
+    else:
+        value = 0.85 * similarity + (0.15 if "email_domain" in reasons else 0.0)
+    return round(value, 3), reasons
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: dict[Any, Any] = {}
+
+    def find(self, item: Any) -> Any:
+        parent = self.parent.setdefault(item, item)
+        while parent != self.parent[parent]:
+            self.parent[parent] = self.parent[self.parent[parent]]
+            parent = self.parent[parent]
+        self.parent[item] = parent
+        return parent
+
+    def union(self, a: Any, b: Any) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+class DuplicateIndex:
+    """Index de blocs des tiers d'une ressource, mis à jour enregistrement par enregistrement."""
+
+    def __init__(self, max_block_size: int = MAX_BLOCK_SIZE):
+        self.max_block_size = max_block_size
+        self.entries: dict[Any, Entry] = {}
+        self.blocks: dict[tuple[str, str], set[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, record: dict[str, Any]) -> Entry:
+        """Ajoute ou remplace un enregistrement (par son `id`)."""
+        entry = Entry(record)
+        self.remove(entry.id)
+        self.entries[entry.id] = entry
+        for key in entry.keys:
+            self.blocks.setdefault(key, set()).add(entry.id)
+        return entry
+
+    def extend(self, records: Iterable[dict[str, Any]]) -> None:
+        for record in records:
+            self.add(record)
+
+    def remove(self, record_id: Any) -> None:
+        entry = self.entries.pop(record_id, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            block = self.blocks.get(key)
+            if block is not None:
+                block.discard(record_id)
+                if not block:
+                    del self.blocks[key]
+
+    def _candidate_ids(self, keys: Iterable[tuple[str, str]]) -> set[Any]:
+        ids: set[Any] = set()
+        for key in keys:
+            block = self.blocks.get(key, ())
+            if len(block) <= self.max_block_size:
+                ids.update(block)
+        return ids
+
+    def match(self, record: dict[str, Any], threshold: float) -> list[dict[str, Any]]:
+        """Tiers existants ressemblant à `record` (score décroissant), ex. avant une création."""
+        probe = Entry(record)
+        matches = []
+        for candidate_id in self._candidate_ids(probe.keys) - {probe.id}:
+            candidate = self.entries[candidate_id]
+            value, reasons = score(probe, candidate)
+            if value >= threshold:
+                matches.append({**candidate.summary(), "score": value, "reasons": reasons})
+        return sorted(matches, key=lambda match: match["score"], reverse=True)
+
+    def clusters(self, threshold: float) -> dict[str, Any]:
+        """Grappes de doublons : paires notées dans chaque bloc puis regroupées (union-find)."""
+        compared: set[tuple[Any, Any]] = set()
+        pairs: list[tuple[Any, Any, float, list[str]]] = []
+        oversized = 0
+        groups = _UnionFind()
+        for members in self.blocks.values():
+            if len(members) < 2:
+                continue
+            if len(members) > self.max_block_size:
+                oversized += 1
+                continue
+            for a, b in combinations(sorted(members), 2):
+                if (a, b) in compared:
+                    continue
+                compared.add((a, b))
+                value, reasons = score(self.entries[a], self.entries[b])
+                if value >= threshold:
+                    pairs.append((a, b, value, reasons))
+                    groups.union(a, b)
+
+        members_by_root: dict[Any, set[Any]] = {}
+        pairs_by_root: dict[Any, list[dict[str, Any]]] = {}
+        for a, b, value, reasons in pairs:
+            root = groups.find(a)
+            members_by_root.setdefault(root, set()).update((a, b))
+            pairs_by_root.setdefault(root, []).append({"ids": [a, b], "score": value, "reasons": reasons})
+        clusters = [
+            {
+                "records": [self.entries[member].summary() for member in sorted(members)],
+                "max_score": max(pair["score"] for pair in pairs_by_root[root]),
+                "pairs": pairs_by_root[root],
+            }
+            for root, members in members_by_root.items()
+        ]
+        clusters.sort(key=lambda cluster: (-cluster["max_score"], -len(cluster["records"])))
+        return {
+            "clusters": clusters,
+            "pairs_compared": len(compared),
+            "oversized_blocks": oversized,
+        }
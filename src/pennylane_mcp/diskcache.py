@@ -0,0 +1,215 @@
+"""Cache persistant des réponses GET sur disque local (SQLite).
+
+Second niveau du cache des réponses (`cache.py`) : les données de référence
+(catégories, comptes comptables, comptes bancaires) et les détails
+d'enregistrements sont aussi écrits dans une base SQLite locale. Un processus
+qui démarre (redémarrage du conteneur, nouveau processus stdio) les sert sans
+appeler l'API ; la base en mode WAL peut être partagée par plusieurs processus
+(workers HTTP, `workers.py`) : la taille totale est tenue dans la base par des
+déclencheurs, l'éviction tient donc compte des écritures de tous les processus.
+
+Les réponses sont stockées en JSON compressé (zlib) avec leur date
+d'expiration (horloge murale, valable d'un processus à l'autre). Au-delà de
+`PENNYLANE_DISK_CACHE_MAX_BYTES` (taille compressée), les entrées les moins
+récemment lues sont évincées. Les invalidations (écritures, webhooks)
+s'appliquent aux deux niveaux.
+
+Variables d'environnement :
+    PENNYLANE_DISK_CACHE: chemin de la base SQLite (cache disque désactivé si absent)
+    PENNYLANE_DISK_CACHE_MAX_BYTES: taille maximale des réponses compressées (octets, défaut 256 Mo)
+    PENNYLANE_DISK_CACHE_TTL: durée de vie des détails d'enregistrements (secondes, défaut 300)
+    PENNYLANE_DISK_CACHE_REFERENCE_TTL: durée de vie des données de référence (secondes, défaut 86400)
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from typing import Any
+
+from . import metrics
+from .backends import REFERENCE_RESOURCES, CacheBackend
+
+logger = logging.getLogger(__name__)
+
+DISK_CACHE_PATH = os.getenv("PENNYLANE_DISK_CACHE")
+DISK_CACHE_MAX_BYTES = int(os.getenv("PENNYLANE_DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DISK_CACHE_TTL = float(os.getenv("PENNYLANE_DISK_CACHE_TTL", "300"))
+DISK_CACHE_REFERENCE_TTL = float(os.getenv("PENNYLANE_DISK_CACHE_REFERENCE_TTL", "86400"))
+
+# Éviction jusqu'à cette fraction de la taille maximale (évite d'évincer à chaque écriture)
+_EVICT_TO = 0.9
+
+DISK_CACHE_BYTES = metrics.register(metrics.Gauge(
+    "pennylane_disk_cache_bytes", "Octets (compressés) conservés dans le cache disque"
+))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    resource TEXT NOT NULL,
+    record_id INTEGER,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_resource ON responses (resource, record_id);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses
+    BEGIN UPDATE totals SET bytes = bytes + NEW.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses
+    BEGIN UPDATE totals SET bytes = bytes - OLD.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS responses_resized AFTER UPDATE OF size ON responses
+    BEGIN UPDATE totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 0; END;
+"""
+
+
+def _encode(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+def _decode(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
+
+
+class DiskCache(CacheBackend):
+    """Réponses compressées avec expiration, dans une base SQLite, évincées par taille (LRU).
+
+    Les méthodes asynchrones de `CacheBackend` accèdent à la base locale de
+    façon synchrone (WAL, quelques dizaines de µs), sans changer de thread.
+    """
+
+    name = "disk"
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DISK_CACHE_MAX_BYTES,
+        ttl: float = DISK_CACHE_TTL,
+        reference_ttl: float = DISK_CACHE_REFERENCE_TTL,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.reference_ttl = reference_ttl
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.executescript(_SCHEMA)
+        DISK_CACHE_BYTES.set(self.total_bytes)
+
+    @property
+    def total_bytes(self) -> int:
+        """Taille totale des réponses compressées (tous processus confondus)."""
+        return self.db.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def ttl_for(self, resource: str, record_id: int | None) -> float | None:
+        """Durée de vie sur disque d'une réponse (None : non conservée, ex. listes de factures)."""
+        if resource in REFERENCE_RESOURCES:
+            return self.reference_ttl
+        if record_id is not None:
+            return self.ttl
+        return None
+
+    async def get(self, key: str, stale_ttl: float = 0.0) -> tuple[Any, float] | None:
+        """Réponse et date d'expiration (horloge murale), ou None ; `stale_ttl` accepte les réponses expirées depuis moins longtemps."""
+        now = time.time()
+        row = self.db.execute(
+            "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at + ? > ?", (key, stale_ttl, now)
+        ).fetchone()
+        if row is None:
+            return None
+        self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return _decode(row[0]), row[1]
+
+    async def put(self, key: str, resource: str, record_id: int | None, value: Any) -> bool:
+        ttl = self.ttl_for(resource, record_id)
+        if not ttl or ttl <= 0:
+            return False
+        blob = _encode(value)
+        if len(blob) > self.max_bytes:
+            return False
+        now = time.time()
+        # Upsert (et non INSERT OR REPLACE, dont la suppression implicite ne déclenche pas `responses_deleted`)
+        self.db.execute(
+            "INSERT INTO responses (key, resource, record_id, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET resource = excluded.resource, record_id = excluded.record_id,"
+            " value = excluded.value, size = excluded.size, expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+            (key, resource, record_id, blob, len(blob), now + ttl, now),
+        )
+        total = self.total_bytes
+        if total > self.max_bytes:
+            self._evict()
+            total = self.total_bytes
+        DISK_CACHE_BYTES.set(total)
+        return True
+
+    def _evict(self) -> None:
+        """Supprime les entrées expirées puis les moins récemment lues jusqu'à `_EVICT_TO` de la taille maximale."""
+        self.db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        excess = self.total_bytes - int(self.max_bytes * _EVICT_TO)
+        if excess <= 0:
+            return
+        freed = 0
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        logger.info(f"Disk cache: evicted {len(victims)} entries ({freed} bytes)")
+
+    async def merge(self, key: str, data: dict[str, Any]) -> bool:
+        """Met à jour en place une réponse de détail (champs de `data`), en conservant son expiration."""
+        row = self.db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        value = _decode(row[0])
+        if not isinstance(value, dict):
+            return False
+        blob = _encode({**value, **data})
+        self.db.execute("UPDATE responses SET value = ?, size = ? WHERE key = ?", (blob, len(blob), key))
+        DISK_CACHE_BYTES.set(self.total_bytes)
+        return True
+
+    def _delete(self, where: str, params: tuple[Any, ...]) -> int:
+        count = self.db.execute(f"DELETE FROM responses WHERE {where}", params).rowcount
+        if count:
+            DISK_CACHE_BYTES.set(self.total_bytes)
+        return count
+
+    async def invalidate(self, resource: str, record_id: int | None = None, keep: str | None = None) -> int:
+        """Supprime les listes d'une ressource et les entrées de `record_id` (toutes sans `record_id`), sauf la clé `keep`."""
+        if record_id is None:
+            return self._delete("resource = ?", (resource,))
+        return self._delete(
+            "resource = ? AND (record_id IS NULL OR record_id = ?) AND key != ?", (resource, record_id, keep or "")
+        )
+
+    async def invalidate_lists(self, resource: str) -> int:
+        return self._delete("resource = ? AND record_id IS NULL", (resource,))
+
+    async def clear(self) -> None:
+        self._delete("1", ())
+
+    async def close(self) -> None:
+        self.db.close()
+
+
+disk_cache: DiskCache | None = None
+
+
+def configure_from_env(default_path: str | None = None) -> DiskCache | None:
+    """Ouvre le cache disque si `PENNYLANE_DISK_CACHE` est défini (ou à `default_path`, ex. base partagée des workers)."""
+    global disk_cache
+    path = DISK_CACHE_PATH or default_path
+    if path and disk_cache is None:
+        disk_cache = DiskCache(path)
+        logger.info(f"Disk cache: {path} ({disk_cache.total_bytes} bytes)")
+    return disk_cache
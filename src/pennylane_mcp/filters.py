@@ -0,0 +1,50 @@
+"""Construction des filtres de l'API Pennylane v2.
+
+L'API attend un tableau JSON de conditions
+(`[{"field": "paid", "operator": "eq", "value": "false"}]`) ; les outils
+acceptent aussi la forme abrégée `champ:opérateur:valeur` séparée par des
+virgules (`"paid:eq:false,draft:eq:false"`). Les outils qui filtrent côté
+serveur combinent le filtre de l'utilisateur avec leurs propres conditions via
+`merge`, pour que le filtrage soit fait par l'API plutôt qu'après coup.
+"""
+import json
+from typing import Any
+
+OPERATORS = frozenset({"eq", "not_eq", "lt", "lteq", "gt", "gteq", "in", "not_in", "start_with"})
+
+
+def condition(field: str, operator: str, value: Any) -> dict[str, Any]:
+    """Construit une condition de filtre."""
+    if operator not in OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {operator}")
+    if isinstance(value, bool):
+        value = str(value).lower()
+    elif isinstance(value, (list, tuple)):
+        value = [str(v) for v in value]
+    else:
+        value = str(value)
+    return {"field": field, "operator": operator, "value": value}
+
+
+def parse(raw: str | None) -> list[dict[str, Any]]:
+    """Analyse un filtre (tableau JSON ou forme `champ:opérateur:valeur`)."""
+    if not raw:
+        return []
+    raw = raw.strip()
+    if raw.startswith("["):
+        return json.loads(raw)
+    conditions = []
+    for part in raw.split(","):
+        field, operator, value = part.split(":", 2)
+        conditions.append(condition(field.strip(), operator.strip(), value.strip()))
+    return conditions
+
+
+def build(conditions: list[dict[str, Any]]) -> str | None:
+    """Sérialise des conditions au format attendu par l'API (None si aucune)."""
+    return json.dumps(conditions, separators=(",", ":")) if conditions else None
+
+
+def merge(raw: str | None, *conditions: dict[str, Any]) -> str | None:
+    """Combine le filtre fourni par l'utilisateur et des conditions supplémentaires."""
+    return build(parse(raw) + list(conditions))
@@ -0,0 +1,90 @@
+"""Requêtes GET couvertes (« hedged requests ») contre la latence de queue.
+
+Si une lecture n'a pas répondu après le quantile `PENNYLANE_HEDGE_QUANTILE` des
+latences récentes de son endpoint, une seconde requête identique est envoyée ;
+la première réponse reçue est retenue et l'autre requête annulée.
+
+Les requêtes couvertes sont limitées par un budget : chaque requête normale
+crédite `PENNYLANE_HEDGE_BUDGET` jeton (plafonné), chaque couverture en consomme
+un. Les couvertures ne dépassent donc jamais cette fraction du trafic (et du
+quota de l'API).
+
+Variables d'environnement :
+    PENNYLANE_HEDGE_QUANTILE: quantile déclenchant la couverture (ex: 0.95 ; défaut 0, désactivé)
+    PENNYLANE_HEDGE_BUDGET: fraction maximale de requêtes couvertes (défaut 0.05)
+    PENNYLANE_HEDGE_MIN_DELAY: délai minimal avant couverture (secondes, défaut 0.05)
+"""
+import os
+from collections import deque
+
+from . import metrics
+
+HEDGE_QUANTILE = float(os.getenv("PENNYLANE_HEDGE_QUANTILE", "0"))
+HEDGE_BUDGET = float(os.getenv("PENNYLANE_HEDGE_BUDGET", "0.05"))
+HEDGE_MIN_DELAY = float(os.getenv("PENNYLANE_HEDGE_MIN_DELAY", "0.05"))
+
+# Latences conservées par endpoint et nombre minimal avant de couvrir
+_WINDOW = 256
+_MIN_SAMPLES = 20
+# Le seuil est recalculé toutes les `_REFRESH` observations
+_REFRESH = 16
+# Couvertures accumulables d'avance
+_MAX_TOKENS = 10.0
+
+HEDGED_REQUESTS = metrics.register(metrics.Counter(
+    "pennylane_hedged_requests_total", "Requêtes GET couvertes, par tentative ayant répondu la première (primary, hedge)", ("endpoint", "result")
+))
+
+
+class _Latencies:
+    __slots__ = ("samples", "threshold", "pending")
+
+    def __init__(self):
+        self.samples: deque[float] = deque(maxlen=_WINDOW)
+        self.threshold: float | None = None
+        self.pending = 0
+
+
+class Hedger:
+    """Seuils de couverture adaptatifs par endpoint et budget de couvertures."""
+
+    def __init__(self, quantile: float = HEDGE_QUANTILE, budget: float = HEDGE_BUDGET, min_delay: float = HEDGE_MIN_DELAY):
+        self.quantile = quantile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.tokens = 0.0
+        self._latencies: dict[str, _Latencies] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return 0 < self.quantile < 1 and self.budget > 0
+
+    def observe(self, endpoint: str, duration: float) -> None:
+        """Enregistre la latence d'une lecture réussie."""
+        latencies = self._latencies.get(endpoint)
+        if latencies is None:
+            latencies = self._latencies[endpoint] = _Latencies()
+        latencies.samples.append(duration)
+        latencies.pending += 1
+        if latencies.pending >= _REFRESH and len(latencies.samples) >= _MIN_SAMPLES:
+            ordered = sorted(latencies.samples)
+            latencies.threshold = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+            latencies.pending = 0
+
+    def delay(self, endpoint: str) -> float | None:
+        """Délai avant couverture pour cet endpoint (None : pas encore assez de mesures)."""
+        latencies = self._latencies.get(endpoint)
+        if latencies is None or latencies.threshold is None:
+            return None
+        return max(self.min_delay, latencies.threshold)
+
+    def credit(self) -> None:
+        """Crédite le budget pour une requête normale."""
+        self.tokens = min(_MAX_TOKENS, self.tokens + self.budget)
+
+    def try_spend(self) -> bool:
+        """Consomme une couverture du budget si possible."""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
@@ -0,0 +1,328 @@
+"""Contrôle local et calcul des totaux des lignes de factures et de devis.
+
+Avant l'envoi d'une facture ou d'un devis, les `invoice_lines` sont vérifiées
+localement (libellé, quantité, prix unitaire, unité, code de TVA) et les totaux
+HT, TVA et TTC sont calculés en virgule fixe, remises comprises. Une ligne
+invalide est signalée précisément (avec une suggestion de code de TVA) sans
+requête vers l'API, et l'aperçu des totaux est joint au résultat de l'outil.
+
+Calculs (entiers uniquement, arrondi au centime le plus proche, demi-centime
+arrondi en s'éloignant de zéro) :
+- HT de la ligne = prix unitaire × quantité, moins la remise de ligne ;
+- remise globale (`discount` de la facture) répartie sur les lignes au prorata
+  de leur HT (plus forts restes), avant le calcul de la TVA ;
+- TVA calculée ligne par ligne puis totalisée par taux.
+"""
+import re
+from typing import Any
+
+from .amounts import format_cents, to_cents
+
+# Échelles de la virgule fixe : prix unitaires et quantités au millionième,
+# pourcentages (remises, taux de TVA) au millième de point
+_PRICE_SCALE = 10 ** 6
+_QUANTITY_SCALE = 10 ** 6
+_PERCENT_SCALE = 10 ** 3
+
+_DECIMAL = re.compile(r"^-?\d+(?:\.(\d+))?$")
+_VAT_CODE = re.compile(r"^([A-Z]{2})_(\d+)(?:_(\d+))?$")
+
+# Codes de TVA français de l'API Pennylane (taux en millièmes de point)
+FR_VAT_RATES: dict[str, int] = {
+    "FR_09": 900, "FR_1_05": 1050, "FR_1_75": 1750, "FR_21": 2100, "FR_22": 2200,
+    "FR_25": 2500, "FR_30": 3000, "FR_40": 4000, "FR_50": 5000, "FR_55": 5500,
+    "FR_60": 6000, "FR_65": 6500, "FR_85": 8500, "FR_92": 9200, "FR_100": 10000,
+    "FR_130": 13000, "FR_140": 14000, "FR_160": 16000, "FR_196": 19600, "FR_200": 20000,
+}
+# Opérations sans TVA facturée (exonération, export, autoliquidation intracommunautaire)
+ZERO_VAT_CODES = frozenset({
+    "exempt", "extracom", "crossborder",
+    "intracom_21", "intracom_55", "intracom_85", "intracom_100", "intracom_200",
+})
+# `percentage` : synonyme de `relative` accepté par le manifeste des devis
+DISCOUNT_TYPES = frozenset({"relative", "percentage", "absolute"})
+
+
+class LineError(ValueError):
+    """Lignes de facture ou de devis invalides (aucune requête envoyée)."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("Invalid invoice_lines: " + "; ".join(errors))
+        self.errors = errors
+
+
+def _round_div(numerator: int, denominator: int) -> int:
+    """Division entière arrondie au plus proche (demi arrondi en s'éloignant de zéro)."""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return -quotient if numerator < 0 else quotient
+
+
+def _parse_fixed(value: Any, scale: int) -> int | None:
+    """Convertit "12.5" / 12.5 / 12 en entier à l'échelle `scale` (None si invalide ou trop précis)."""
+    if isinstance(value, bool) or value is None:
+        return None
+    text = value.strip() if isinstance(value, str) else repr(value) if isinstance(value, float) else str(value)
+    match = _DECIMAL.match(text)
+    if not match:
+        return None
+    decimals = len(match.group(1) or "")
+    if 10 ** decimals > scale:
+        return None
+    whole, _, fraction = text.partition(".")
+    units = abs(int(whole)) * scale + int(fraction or "0") * (scale // 10 ** decimals)
+    return -units if text.startswith("-") else units
+
+
+def _format_fixed(units: int, scale: int) -> str:
+    """Inverse de `_parse_fixed`, sans zéros superflus (1500000 -> "1.5")."""
+    sign = "-" if units < 0 else ""
+    whole, fraction = divmod(abs(units), scale)
+    digits = str(fraction).rjust(len(str(scale)) - 1, "0").rstrip("0")
+    return f"{sign}{whole}.{digits}" if digits else f"{sign}{whole}"
+
+
+def vat_rate(code: Any) -> int | None:
+    """Taux d'un code de TVA Pennylane en millièmes de point (`FR_200` -> 20000), None si inconnu."""
+    if not isinstance(code, str):
+        return None
+    if code in ZERO_VAT_CODES:
+        return 0
+    if code.startswith("FR_"):
+        return FR_VAT_RATES.get(code)
+    match = _VAT_CODE.match(code)
+    if not match:
+        return None
+    # Autres pays : `DE_190` (19,0 %), `LU_1_70` (1,70 %)
+    whole, fraction = match.group(2), match.group(3)
+    if fraction is None:
+        return int(whole) * 100
+    return int(whole) * 1000 + int((fraction + "00")[:2]) * 10
+
+
+def suggest_vat_code(value: Any) -> str | None:
+    """Code de TVA probable pour une saisie approximative ("20", "20%", 0.2, "FR_20")."""
+    text = str(value).strip().upper().rstrip("%").replace(",", ".")
+    if text.startswith("FR_") and text[3:].isdigit():
+        text = text[3:]
+    try:
+        rate = float(text)
+    except ValueError:
+        return None
+    if 0 < rate < 1:
+        rate *= 100
+    tenths = round(rate * 10)
+    for code, per_mille in FR_VAT_RATES.items():
+        if per_mille == tenths * 100:
+            return code
+    return "exempt" if rate == 0 else None
+
+
+def _format_rate(per_mille: int) -> str:
+    return f"{per_mille / 1000:g} %"
+
+
+def _parse_discount(discount: Any, where: str, errors: list[str]) -> tuple[str, int] | None:
+    """Remise `{"type": "relative"|"absolute", "value": "10"}` -> (type, valeur en unités internes)."""
+    if discount in (None, {}):
+        return None
+    if not isinstance(discount, dict) or discount.get("type") not in DISCOUNT_TYPES:
+        errors.append(f"{where}.discount: expected {{\"type\": \"relative\" | \"absolute\", \"value\": \"10.00\"}}")
+        return None
+    if discount["type"] != "absolute":
+        value = _parse_fixed(discount.get("value"), _PERCENT_SCALE)
+        if value is None or not 0 <= value <= 100 * _PERCENT_SCALE:
+            errors.append(f"{where}.discount.value: expected a percentage between 0 and 100, got {discount.get('value')!r}")
+            return None
+    else:
+        value = _parse_fixed(discount.get("value"), 100)
+        if value is None or value < 0:
+            errors.append(f"{where}.discount.value: expected an amount like \"10.00\", got {discount.get('value')!r}")
+            return None
+    return ("absolute" if discount["type"] == "absolute" else "relative"), value
+
+
+def _apply_discount(amount: int, discount: tuple[str, int] | None) -> int:
+    if discount is None:
+        return 0
+    kind, value = discount
+    if kind == "relative":
+        return _round_div(amount * value, 100 * _PERCENT_SCALE)
+    return min(value, abs(amount)) if amount >= 0 else -min(value, abs(amount))
+
+
+def _allocate(total: int, weights: list[int]) -> list[int]:
+    """Répartit `total` centimes au prorata de `weights` (méthode des plus forts restes)."""
+    base = sum(weights)
+    if not base or not total:
+        return [0] * len(weights)
+    sign, total = (-1, -total) if total < 0 else (1, total)
+    shares = [total * weight // base for weight in weights]
+    remainders = sorted(range(len(weights)), key=lambda i: (total * weights[i]) % base, reverse=True)
+    for index in remainders[:total - sum(shares)]:
+        shares[index] += 1
+    return [sign * share for share in shares]
+
+
+def preflight(
+    invoice_lines: Any,
+    currency: str = "EUR",
+    discount: Any = None,
+) -> dict[str, Any]:
+    """Vérifie des `invoice_lines` et calcule l'aperçu des totaux (lève `LineError`).
+
+    Returns:
+        Aperçu : détail par ligne, ventilation de la TVA par taux, totaux HT,
+        remises, TVA et TTC, et avertissements (valeurs normalisées, codes de
+        TVA non vérifiés localement).
+    """
+    errors: list[str] = []
+    warnings: list[str] = []
+    if not isinstance(invoice_lines, list) or not invoice_lines:
+        raise LineError(["invoice_lines: expected a non-empty list of lines"])
+
+    parsed: list[dict[str, Any]] = []
+    for index, line in enumerate(invoice_lines):
+        where = f"invoice_lines[{index}]"
+        if not isinstance(line, dict):
+            errors.append(f"{where}: expected an object")
+            continue
+        count = len(errors)
+        if not str(line.get("label") or "").strip() and not line.get("product_id"):
+            errors.append(f"{where}.label: required (or product_id)")
+        quantity = _parse_fixed(line.get("quantity"), _QUANTITY_SCALE)
+        if quantity is None or quantity == 0:
+            errors.append(f"{where}.quantity: expected a non-zero number (up to 6 decimals), got {line.get('quantity')!r}")
+        raw_price = line.get("raw_currency_unit_price")
+        price = _parse_fixed(raw_price, _PRICE_SCALE)
+        if price is None:
+            hint = f" (did you mean {raw_price.replace(',', '.')!r}?)" if isinstance(raw_price, str) and "," in raw_price else ""
+            errors.append(
+                f"{where}.raw_currency_unit_price: expected a decimal string like \"750.00\" (up to 6 decimals), got {raw_price!r}{hint}"
+            )
+        elif not isinstance(raw_price, str):
+            warnings.append(f"{where}.raw_currency_unit_price: number {raw_price!r} sent as a string")
+            line["raw_currency_unit_price"] = format_cents(price // 10 ** 4) if price % 10 ** 4 == 0 else _format_fixed(price, _PRICE_SCALE)
+        if not str(line.get("unit") or "").strip() and not line.get("product_id"):
+            errors.append(f"{where}.unit: required (ex: \"jour\", \"unité\", \"lot\")")
+        code = line.get("vat_rate")
+        rate = vat_rate(code)
+        if rate is None:
+            hint = suggest_vat_code(code) if code is not None else None
+            errors.append(
+                f"{where}.vat_rate: unknown code {code!r}"
+                + (f" (did you mean {hint!r}?)" if hint else " (ex: \"FR_200\" for 20 %, \"FR_100\" for 10 %, \"FR_55\" for 5.5 %)")
+            )
+        elif not code.startswith("FR_") and code not in ZERO_VAT_CODES:
+            warnings.append(f"{where}.vat_rate: {code} not checked locally (non-French rate)")
+        line_discount = _parse_discount(line.get("discount"), where, errors)
+        if len(errors) > count:
+            continue
+
+        gross = _round_div(price * quantity, _PRICE_SCALE * _QUANTITY_SCALE // 100)
+        line_off = _apply_discount(gross, line_discount)
+        parsed.append({
+            "index": index,
+            "label": line.get("label"),
+            "quantity": quantity,
+            "unit_price": raw_price,
+            "price": price,
+            "vat_rate": code,
+            "rate": rate,
+            "gross": gross,
+            "discount": line_off,
+        })
+
+    global_discount = _parse_discount(discount, "invoice", errors)
+    if errors:
+        raise LineError(errors)
+
+    # Remise globale répartie sur les HT après remises de ligne
+    net_amounts = [line["gross"] - line["discount"] for line in parsed]
+    subtotal = sum(net_amounts)
+    total_off = _apply_discount(subtotal, global_discount)
+    allocated = _allocate(total_off, [max(amount, 0) for amount in net_amounts])
+
+    lines: list[dict[str, Any]] = []
+    breakdown: dict[str, list[int]] = {}
+    totals = {"gross": 0, "discount": 0, "before_tax": 0, "vat": 0}
+    for line, net, share in zip(parsed, net_amounts, allocated):
+        before_tax = net - share
+        vat = _round_div(before_tax * line["rate"], 100 * _PERCENT_SCALE)
+        lines.append({
+            "index": line["index"],
+            "label": line["label"],
+            "quantity": _format_fixed(line["quantity"], _QUANTITY_SCALE),
+            "unit_price": line["unit_price"] if isinstance(line["unit_price"], str) else _format_fixed(line["price"], _PRICE_SCALE),
+            "discount": format_cents(line["discount"] + share),
+            "total_before_tax": format_cents(before_tax),
+            "vat_rate": line["vat_rate"],
+            "vat": format_cents(vat),
+            "total": format_cents(before_tax + vat),
+        })
+        rate_totals = breakdown.setdefault(line["vat_rate"], [line["rate"], 0, 0])
+        rate_totals[1] += before_tax
+        rate_totals[2] += vat
+        totals["gross"] += line["gross"]
+        totals["discount"] += line["discount"] + share
+        totals["before_tax"] += before_tax
+        totals["vat"] += vat
+
+    return {
+        "currency": currency,
+        "lines": lines,
+        "vat_breakdown": [
+            {"vat_rate": code, "rate": _format_rate(rate), "base": format_cents(base), "vat": format_cents(vat)}
+            for code, (rate, base, vat) in breakdown.items()
+        ],
+        "total_gross": format_cents(totals["gross"]),
+        "total_discount": format_cents(totals["discount"]),
+        "total_before_tax": format_cents(totals["before_tax"]),
+        "total_vat": format_cents(totals["vat"]),
+        "total": format_cents(totals["before_tax"] + totals["vat"]),
+        "warnings": warnings,
+    }
+
+
+def check_updates(updates: Any) -> None:
+    """Vérifie les champs présents de lignes modifiées (`invoice_lines.update` d'un devis)."""
+    if updates is None:
+        return
+    if not isinstance(updates, list):
+        raise LineError(["invoice_lines.update: expected a list of lines"])
+    errors: list[str] = []
+    for index, line in enumerate(updates):
+        where = f"invoice_lines.update[{index}]"
+        if not isinstance(line, dict):
+            errors.append(f"{where}: expected an object")
+            continue
+        if "quantity" in line and not _parse_fixed(line["quantity"], _QUANTITY_SCALE):
+            errors.append(f"{where}.quantity: expected a non-zero number (up to 6 decimals), got {line['quantity']!r}")
+        if "raw_currency_unit_price" in line and _parse_fixed(line["raw_currency_unit_price"], _PRICE_SCALE) is None:
+            errors.append(f"{where}.raw_currency_unit_price: expected a decimal string like \"750.00\", got {line['raw_currency_unit_price']!r}")
+        if "vat_rate" in line and vat_rate(line["vat_rate"]) is None:
+            hint = suggest_vat_code(line["vat_rate"])
+            errors.append(f"{where}.vat_rate: unknown code {line['vat_rate']!r}" + (f" (did you mean {hint!r}?)" if hint else ""))
+        _parse_discount(line.get("discount"), where, errors)
+    if errors:
+        raise LineError(errors)
+
+
+# Totaux de l'aperçu -> champs de la réponse de l'API
+_API_TOTALS = (
+    ("total_before_tax", "currency_amount_before_tax"),
+    ("total_vat", "currency_tax"),
+    ("total", "currency_amount"),
+)
+
+
+def attach_preview(result: Any, preview: dict[str, Any]) -> Any:
+    """Joint l'aperçu au résultat de l'outil, en signalant un écart avec les totaux calculés par l'API."""
+    if not isinstance(result, dict):
+        return result
+    for key, field in _API_TOTALS:
+        upstream = result.get(field)
+        if upstream is not None and format_cents(to_cents(upstream)) != preview[key]:
+            preview["warnings"].append(f"{key}: preview {preview[key]} differs from Pennylane {field} {upstream}")
+    return {**result, "preview": preview}
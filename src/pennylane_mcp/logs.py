@@ -0,0 +1,196 @@
+"""Configuration des logs : écriture hors de la boucle asyncio, taille bornée, débit limité.
+
+Pendant une panne de l'API, chaque appel d'outil journalise une erreur (corps
+de réponse, trace d'exception) : écrites de façon synchrone depuis la boucle,
+ces lignes ajoutent leur latence aux appels en cours. Ici :
+
+- le logger racine ne fait que mettre les enregistrements dans une file bornée
+  (`QueueHandler`) ; un thread (`QueueListener`) les formate et les écrit. La
+  mise en forme des traces d'exception se fait donc hors de la boucle ; file
+  pleine, l'enregistrement est abandonné et compté ;
+- les messages et traces d'exception sont tronqués à `PENNYLANE_LOG_MAX_CHARS` ;
+- les avertissements et erreurs sont limités par point d'appel (et par
+  `extra={"log_key": ...}`, ex. nom de l'outil) : au-delà de
+  `PENNYLANE_LOG_RATE` par intervalle, ils sont comptés et le nombre de
+  messages supprimés est joint au suivant ;
+- format texte (défaut) ou JSON (une ligne par enregistrement, avec `trace_id`).
+
+Variables d'environnement :
+    PENNYLANE_LOG_LEVEL: niveau minimal (défaut INFO)
+    PENNYLANE_LOG_FORMAT: text ou json (défaut text)
+    PENNYLANE_LOG_MAX_CHARS: longueur maximale d'un message ou d'une trace (défaut 2000)
+    PENNYLANE_LOG_QUEUE_SIZE: enregistrements en attente d'écriture (défaut 10000)
+    PENNYLANE_LOG_RATE: avertissements et erreurs par point d'appel et par intervalle (défaut 10 ; 0 sans limite)
+    PENNYLANE_LOG_RATE_INTERVAL: intervalle de la limite (secondes, défaut 60)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any
+
+from . import metrics
+
+LOG_LEVEL = os.getenv("PENNYLANE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("PENNYLANE_LOG_FORMAT", "text").lower()
+LOG_MAX_CHARS = int(os.getenv("PENNYLANE_LOG_MAX_CHARS", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("PENNYLANE_LOG_QUEUE_SIZE", "10000"))
+LOG_RATE = int(os.getenv("PENNYLANE_LOG_RATE", "10"))
+LOG_RATE_INTERVAL = float(os.getenv("PENNYLANE_LOG_RATE_INTERVAL", "60"))
+
+# Points d'appel suivis par la limite de débit (les moins récents sont oubliés au-delà)
+_RATE_MAX_KEYS = 1024
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:[trace=%(trace_id)s] %(message)s"
+
+LOG_RECORDS_DROPPED = metrics.register(metrics.Counter(
+    "pennylane_log_records_dropped_total", "Enregistrements de log abandonnés (queue_full, rate_limited)", ("reason",)
+))
+
+
+def truncate(text: str, limit: int = LOG_MAX_CHARS) -> str:
+    """Texte tronqué à `limit` caractères, avec le nombre de caractères omis."""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}… (+{len(text) - limit} chars)"
+
+
+def excerpt(content: bytes, limit: int = LOG_MAX_CHARS) -> str:
+    """Début d'un corps de réponse, sans décoder le reste (corps de plusieurs Mo)."""
+    text = content[:limit].decode("utf-8", errors="replace")
+    return f"{text}… (+{len(content) - limit} bytes)" if len(content) > limit else text
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite les avertissements et erreurs par point d'appel (fenêtres fixes de `interval` secondes)."""
+
+    def __init__(
+        self,
+        limit: int = LOG_RATE,
+        interval: float = LOG_RATE_INTERVAL,
+        level: int = logging.WARNING,
+        max_keys: int = _RATE_MAX_KEYS,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        # Clé -> [début de fenêtre, enregistrements émis, enregistrements supprimés] (LRU borné à max_keys)
+        self._windows: OrderedDict[tuple[Any, ...], list[Any]] = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno < self.level:
+            return True
+        key = (record.name, record.pathname, record.lineno, getattr(record, "log_key", None))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            if window is not None and window[2]:
+                record.suppressed = window[2]
+            self._windows[key] = [now, 1, 0]
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            return True
+        self._windows.move_to_end(key)
+        if window[1] < self.limit:
+            window[1] += 1
+            return True
+        window[2] += 1
+        LOG_RECORDS_DROPPED.inc(reason="rate_limited")
+        return False
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Met les enregistrements en file sans bloquer : message figé et tronqué, trace formatée par le thread d'écriture."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = truncate(record.getMessage())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" ({suppressed} similar message(s) suppressed)"
+        record.message = record.msg = message
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Format texte ; traces d'exception tronquées."""
+
+    def formatException(self, ei: Any) -> str:
+        return truncate(super().formatException(ei))
+
+
+class JsonFormatter(TruncatingFormatter):
+    """Une ligne JSON par enregistrement (horodatage UTC, niveau, logger, message, trace)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "trace_id": getattr(record, "trace_id", "-"),
+            "span_id": getattr(record, "span_id", "-"),
+        }
+        for name in ("log_key", "suppressed"):
+            value = getattr(record, name, None)
+            if value:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_handler: AsyncQueueHandler | None = None
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _start_listener(output: logging.Handler) -> None:
+    global _listener
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork() -> None:
+    """Le thread d'écriture ne survit pas au `fork` (workers HTTP) : nouvelle file et nouveau thread."""
+    if _listener is not None:
+        _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        _start_listener(_listener.handlers[0])
+
+
+def configure() -> None:
+    """Installe la file de logs sur le logger racine (sans effet si des handlers sont déjà configurés)."""
+    global _handler
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TruncatingFormatter(TEXT_FORMAT, defaults={"trace_id": "-"}))
+    _handler = AsyncQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(RateLimitFilter())
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+    _start_listener(output)
+    atexit.register(shutdown)
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown() -> None:
+    """Écrit les enregistrements en attente et arrête le thread d'écriture."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,1469 @@
+"""Manifeste des outils MCP (définitions statiques, sans dépendance à `mcp`).
+
+Les définitions sont de simples dictionnaires : elles sont chargées depuis le
+bytecode sans construire d'objets pydantic à l'import. Les objets `Tool` ne sont
+construits qu'au premier `list_tools`, puis mis en cache.
+"""
+from functools import cache
+from typing import Any
+
+# Options des outils de création passant par la file durable (PENNYLANE_WRITE_QUEUE)
+_WRITE_QUEUE_PROPERTIES: dict[str, Any] = {
+    "idempotency_key": {
+        "type": "string",
+        "description": "Clé d'idempotence - une même clé ne crée qu'un enregistrement (par défaut : clé unique par appel)"
+    },
+    "deduplicate": {
+        "type": "boolean",
+        "description": "Sans idempotency_key : dérive la clé du contenu, une soumission identique retourne alors le ticket existant",
+        "default": False
+    },
+    "queued": {
+        "type": "boolean",
+        "description": "Si la file durable est activée : retourne un ticket (pennylane_get_write_ticket) au lieu d'attendre l'API",
+        "default": True
+    },
+}
+
+# Contrôle local des lignes sans écriture (voir lines.py)
+_DRY_RUN_PROPERTY: dict[str, Any] = {
+    "type": "boolean",
+    "description": "Contrôle les lignes et retourne l'aperçu des totaux HT/TVA/TTC sans rien créer ni modifier",
+    "default": False
+}
+
+# Création malgré des doublons probables (voir tools/duplicates.py)
+_FORCE_PROPERTY: dict[str, Any] = {
+    "type": "boolean",
+    "description": "Crée le tiers même si des doublons probables existent (SIREN, TVA, IBAN, nom ou domaine email proches)",
+    "default": False
+}
+
+TOOL_DEFINITIONS: list[dict[str, Any]] = [
+    # ==================== FACTURES CLIENTS ====================
+    {
+        "name": "pennylane_list_customer_invoices",
+        "description": "Liste les factures clients avec pagination et filtres",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats (1-100)",
+                    "default": 20
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres (ex: 'draft:eq:true' ou 'paid:eq:false')"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri (ex: '-id' pour desc, 'date' pour asc)",
+                    "default": "-id"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_get_customer_invoice",
+        "description": "Récupère les détails d'une facture client par son ID",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture"
+                },
+            },
+            "required": ["invoice_id"],
+        },
+    },
+    {
+        "name": "pennylane_create_customer_invoice",
+        "description": "Crée une nouvelle facture client (brouillon ou finalisée)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client"
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Date de la facture (YYYY-MM-DD) - OBLIGATOIRE"
+                },
+                "deadline": {
+                    "type": "string",
+                    "description": "Date limite de paiement (YYYY-MM-DD) - OBLIGATOIRE"
+                },
+                "invoice_lines": {
+                    "type": "array",
+                    "description": "Lignes de facture avec label, raw_currency_unit_price, quantity, unit, vat_rate",
+                    "items": {"type": "object"},
+                },
+                "draft": {
+                    "type": "boolean",
+                    "description": "OBLIGATOIRE - True = brouillon modifiable, False = facture finalisée",
+                    "default": True
+                },
+                "currency": {
+                    "type": "string",
+                    "description": "Devise (EUR, USD, etc.)",
+                    "default": "EUR"
+                },
+                "language": {
+                    "type": "string",
+                    "description": "Langue (fr_FR, en_GB, de_DE)",
+                    "default": "fr_FR"
+                },
+                "dry_run": _DRY_RUN_PROPERTY,
+                **_WRITE_QUEUE_PROPERTIES,
+            },
+            "required": ["customer_id", "date", "deadline", "invoice_lines"],
+        },
+    },
+    {
+        "name": "pennylane_finalize_customer_invoice",
+        "description": "Finalise une facture client (la rend non modifiable et génère le PDF)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture"
+                },
+            },
+            "required": ["invoice_id"],
+        },
+    },
+    {
+        "name": "pennylane_send_customer_invoice_email",
+        "description": "Envoie une facture client par email",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture"
+                },
+                "recipients": {
+                    "type": "array",
+                    "description": "Liste d'emails destinataires (vide = utilise les emails du client)",
+                    "items": {"type": "string"},
+                    "default": []
+                },
+            },
+            "required": ["invoice_id"],
+        },
+    },
+    {
+        "name": "pennylane_categorize_customer_invoice",
+        "description": "Catégorise une facture client avec des catégories comptables",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture"
+                },
+                "categories": {
+                    "type": "array",
+                    "description": "Liste des catégories avec category_id et weight",
+                    "items": {"type": "object"},
+                },
+            },
+            "required": ["invoice_id", "categories"],
+        },
+    },
+    
+    # ==================== FACTURES FOURNISSEURS ====================
+    {
+        "name": "pennylane_list_supplier_invoices",
+        "description": "Liste les factures fournisseurs avec pagination et filtres",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats (1-100)",
+                    "default": 20
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri",
+                    "default": "-id"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_get_supplier_invoice",
+        "description": "Récupère les détails d'une facture fournisseur",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture fournisseur"
+                },
+            },
+            "required": ["invoice_id"],
+        },
+    },
+    {
+        "name": "pennylane_categorize_supplier_invoice",
+        "description": "Catégorise une facture fournisseur",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture"
+                },
+                "categories": {
+                    "type": "array",
+                    "description": "Liste des catégories avec category_id et weight",
+                    "items": {"type": "object"},
+                },
+            },
+            "required": ["invoice_id", "categories"],
+        },
+    },
+    
+    # ==================== CLIENTS ====================
+    {
+        "name": "pennylane_list_customers",
+        "description": "Liste tous les clients (entreprises et particuliers)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats",
+                    "default": 20
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri",
+                    "default": "-id"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_get_customer",
+        "description": "Récupère les détails d'un client (générique)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client"
+                },
+            },
+            "required": ["customer_id"],
+        },
+    },
+    {
+        "name": "pennylane_get_company_customer",
+        "description": "Récupère les détails d'un client entreprise",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client entreprise"
+                },
+            },
+            "required": ["customer_id"],
+        },
+    },
+    {
+        "name": "pennylane_get_individual_customer",
+        "description": "Récupère les détails d'un client particulier",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client particulier"
+                },
+            },
+            "required": ["customer_id"],
+        },
+    },
+    {
+        "name": "pennylane_create_company_customer",
+        "description": "Crée un nouveau client entreprise (refusé si des doublons probables existent, sauf force: true)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Nom de l'entreprise"
+                },
+                "billing_address": {
+                    "type": "object",
+                    "description": "Adresse de facturation",
+                    "properties": {
+                        "address": {"type": "string"},
+                        "postal_code": {"type": "string"},
+                        "city": {"type": "string"},
+                        "country_alpha2": {"type": "string"}
+                    },
+                    "required": ["address", "postal_code", "city", "country_alpha2"]
+                },
+                "delivery_address": {
+                    "type": "object",
+                    "description": "Adresse de livraison",
+                    "properties": {
+                        "address": {"type": "string"},
+                        "postal_code": {"type": "string"},
+                        "city": {"type": "string"},
+                        "country_alpha2": {"type": "string"}
+                    }
+                },
+                "ledger_account": {
+                    "type": "object",
+                    "description": "Compte comptable",
+                    "properties": {
+                        "number": {"type": "string"}
+                    }
+                },
+                "emails": {
+                    "type": "array",
+                    "description": "Liste d'emails",
+                    "items": {"type": "string"}
+                },
+                "phone": {
+                    "type": "string",
+                    "description": "Téléphone"
+                },
+                "vat_number": {
+                    "type": "string",
+                    "description": "Numéro de TVA"
+                },
+                "reg_no": {
+                    "type": "string",
+                    "description": "Numéro SIREN/SIRET"
+                },
+                "billing_iban": {
+                    "type": "string",
+                    "description": "IBAN de facturation"
+                },
+                "recipient": {
+                    "type": "string",
+                    "description": "Destinataire"
+                },
+                "reference": {
+                    "type": "string",
+                    "description": "Référence client"
+                },
+                "notes": {
+                    "type": "string",
+                    "description": "Notes"
+                },
+                "external_reference": {
+                    "type": "string",
+                    "description": "Référence externe"
+                },
+                "payment_conditions": {
+                    "type": "string",
+                    "description": "Conditions de paiement",
+                    "enum": ["upon_receipt", "custom", "15_days", "30_days", "45_days", "60_days"],
+                    "default": "30_days"
+                },
+                "billing_language": {
+                    "type": "string",
+                    "description": "Langue de facturation",
+                    "enum": ["fr_FR", "en_GB", "de_DE"],
+                    "default": "fr_FR"
+                },
+                "force": _FORCE_PROPERTY,
+            },
+            "required": ["name", "billing_address"],
+        },
+    },
+    {
+        "name": "pennylane_create_individual_customer",
+        "description": "Crée un nouveau client particulier",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "first_name": {
+                    "type": "string",
+                    "description": "Prénom"
+                },
+                "last_name": {
+                    "type": "string",
+                    "description": "Nom de famille"
+                },
+                "billing_address": {
+                    "type": "object",
+                    "description": "Adresse de facturation",
+                    "properties": {
+                        "address": {"type": "string"},
+                        "postal_code": {"type": "string"},
+                        "city": {"type": "string"},
+                        "country_alpha2": {"type": "string"}
+                    },
+                    "required": ["address", "postal_code", "city", "country_alpha2"]
+                },
+                "delivery_address": {
+                    "type": "object",
+                    "description": "Adresse de livraison",
+                    "properties": {
+                        "address": {"type": "string"},
+                        "postal_code": {"type": "string"},
+                        "city": {"type": "string"},
+                        "country_alpha2": {"type": "string"}
+                    }
+                },
+                "ledger_account": {
+                    "type": "object",
+                    "description": "Compte comptable",
+                    "properties": {
+                        "number": {"type": "string"}
+                    }
+                },
+                "emails": {
+                    "type": "array",
+                    "description": "Liste d'emails",
+                    "items": {"type": "string"}
+                },
+                "phone": {
+                    "type": "string",
+                    "description": "Téléphone"
+                },
+                "billing_iban": {
+                    "type": "string",
+                    "description": "IBAN de facturation"
+                },
+                "recipient": {
+                    "type": "string",
+                    "description": "Destinataire"
+                },
+                "reference": {
+                    "type": "string",
+                    "description": "Référence client"
+                },
+                "notes": {
+                    "type": "string",
+                    "description": "Notes"
+                },
+                "external_reference": {
+                    "type": "string",
+                    "description": "Référence externe"
+                },
+                "payment_conditions": {
+                    "type": "string",
+                    "description": "Conditions de paiement",
+                    "enum": ["upon_receipt", "custom", "15_days", "30_days", "45_days", "60_days"],
+                    "default": "30_days"
+                },
+                "billing_language": {
+                    "type": "string",
+                    "description": "Langue de facturation",
+                    "enum": ["fr_FR", "en_GB", "de_DE"],
+                    "default": "fr_FR"
+                },
+            },
+            "required": ["first_name", "last_name", "billing_address"],
+        },
+    },
+    
+    # ==================== DEVIS ====================
+    {
+        "name": "pennylane_list_quotes",
+        "description": "Liste tous les devis",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats",
+                    "default": 30
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres (ex: 'status:eq:pending', 'customer_id:eq:123')"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri",
+                    "default": "-id"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_get_quote",
+        "description": "Récupère les détails d'un devis",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "quote_id": {
+                    "type": "integer",
+                    "description": "ID du devis"
+                },
+            },
+            "required": ["quote_id"],
+        },
+    },
+    {
+        "name": "pennylane_list_quote_invoice_line_sections",
+        "description": "Liste les sections de lignes d'un devis",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "quote_id": {
+                    "type": "integer",
+                    "description": "ID du devis"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats",
+                    "default": 100
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri",
+                    "default": "-id"
+                },
+            },
+            "required": ["quote_id"],
+        },
+    },
+    {
+        "name": "pennylane_list_quote_appendices",
+        "description": "Liste les annexes (fichiers joints) d'un devis",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "quote_id": {
+                    "type": "integer",
+                    "description": "ID du devis"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats",
+                    "default": 20
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+            },
+            "required": ["quote_id"],
+        },
+    },
+    {
+        "name": "pennylane_create_quote",
+        "description": "Crée un nouveau devis",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client"
+                },
+                "invoice_lines": {
+                    "type": "array",
+                    "description": "Lignes du devis",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "label": {"type": "string", "description": "Libellé de la ligne"},
+                            "quantity": {"type": "number", "description": "Quantité"},
+                            "raw_currency_unit_price": {"type": "string", "description": "Prix unitaire HT (jusqu'à 6 décimales)"},
+                            "vat_rate": {
+                                "type": "string",
+                                "description": "Taux de TVA au format Pennylane (ex: FR_200 pour 20% en France, FR_100 pour 10%, FR_55 pour 5.5%, FR_21 pour 2.1%)"
+                            },
+                            "unit": {"type": "string", "description": "Unité (ex: 'unité', 'jour', 'heure')"},
+                            "description": {"type": "string", "description": "Description de la ligne"},
+                            "section_rank": {"type": "integer", "description": "Rang de la section"},
+                            "ledger_account_id": {"type": "integer", "description": "ID du compte comptable"},
+                            "product_id": {"type": "integer", "description": "ID du produit"},
+                            "discount": {"type": "object", "description": "Remise sur la ligne"}
+                        },
+                        "required": ["label", "quantity", "raw_currency_unit_price", "vat_rate", "unit"]
+                    }
+                },
+                "date": {
+                    "type": "string", 
+                    "description": "Date du devis (YYYY-MM-DD)"
+                },
+                "deadline": {
+                    "type": "string",
+                    "description": "Date limite (YYYY-MM-DD)"
+                },
+                "currency": {
+                    "type": "string",
+                    "description": "Devise",
+                    "default": "EUR"
+                },
+                "language": {
+                    "type": "string",
+                    "description": "Langue",
+                    "enum": ["fr_FR", "en_GB", "de_DE"],
+                    "default": "fr_FR"
+                },
+                "discount": {
+                    "type": "object",
+                    "description": "Remise globale",
+                    "properties": {
+                        "type": {"type": "string", "enum": ["absolute", "percentage"]},
+                        "value": {"type": "string"}
+                    }
+                },
+                "invoice_line_sections": {
+                    "type": "array",
+                    "description": "Sections de lignes",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "rank": {"type": "integer"},
+                            "title": {"type": "string"},
+                            "description": {"type": "string"}
+                        }
+                    }
+                },
+                "quote_template_id": {
+                    "type": "integer",
+                    "description": "ID du modèle de devis"
+                },
+                "pdf_invoice_free_text": {
+                    "type": "string",
+                    "description": "Texte libre sur le PDF"
+                },
+                "pdf_invoice_subject": {
+                    "type": "string",
+                    "description": "Sujet du PDF"
+                },
+                "pdf_description": {
+                    "type": "string",
+                    "description": "Description du PDF"
+                },
+                "special_mention": {
+                    "type": "string",
+                    "description": "Mention spéciale"
+                },
+                "external_reference": {
+                    "type": "string",
+                    "description": "Référence externe"
+                },
+                "dry_run": _DRY_RUN_PROPERTY,
+            },
+            "required": ["customer_id", "invoice_lines", "date", "deadline"]
+        }
+    },
+    {
+        "name": "pennylane_update_quote",
+        "description": "Met à jour un devis existant",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "quote_id": {
+                    "type": "integer",
+                    "description": "ID du devis"
+                },
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client"
+                },
+                "invoice_lines": {
+                    "type": "object",
+                    "description": "Lignes du devis (avec create pour ajouter)",
+                    "properties": {
+                        "create": {
+                            "type": "array",
+                            "items": {"type": "object"}
+                        }
+                    }
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Date du devis (YYYY-MM-DD)"
+                },
+                "deadline": {
+                    "type": "string",
+                    "description": "Date limite (YYYY-MM-DD)"
+                },
+                "language": {
+                    "type": "string",
+                    "description": "Langue",
+                    "enum": ["fr_FR", "en_GB", "de_DE"]
+                },
+                "discount": {
+                    "type": "object",
+                    "description": "Remise globale"
+                },
+                "quote_template_id": {
+                    "type": "integer",
+                    "description": "ID du modèle de devis"
+                },
+                "pdf_invoice_free_text": {
+                    "type": "string",
+                    "description": "Texte libre sur le PDF"
+                },
+                "pdf_invoice_subject": {
+                    "type": "string",
+                    "description": "Sujet du PDF"
+                },
+                "pdf_description": {
+                    "type": "string",
+                    "description": "Description du PDF"
+                },
+                "special_mention": {
+                    "type": "string",
+                    "description": "Mention spéciale"
+                },
+                "external_reference": {
+                    "type": "string",
+                    "description": "Référence externe"
+                },
+                "dry_run": _DRY_RUN_PROPERTY,
+            },
+            "required": ["quote_id"]
+        }
+    },
+    {
+        "name": "pennylane_update_quote_status",
+        "description": "Met à jour le statut d'un devis",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "quote_id": {
+                    "type": "integer",
+                    "description": "ID du devis"
+                },
+                "status": {
+                    "type": "string",
+                    "description": "Nouveau statut du devis",
+                    "enum": ["pending", "accepted", "denied", "invoiced", "expired"]
+                }
+            },
+            "required": ["quote_id", "status"]
+        }
+    },
+    
+    # ==================== FOURNISSEURS ====================
+    {
+        "name": "pennylane_list_suppliers",
+        "description": "Liste tous les fournisseurs",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats (1-100)",
+                    "default": 20
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres (ex: 'name:start_with:Acme')"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri",
+                    "default": "-id"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_get_supplier",
+        "description": "Récupère les détails d'un fournisseur par son ID",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "supplier_id": {
+                    "type": "integer",
+                    "description": "ID du fournisseur"
+                },
+            },
+            "required": ["supplier_id"],
+        },
+    },
+    {
+        "name": "pennylane_create_supplier",
+        "description": "Crée un nouveau fournisseur (refusé si des doublons probables existent, sauf force: true)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Nom du fournisseur"
+                },
+                "postal_address": {
+                    "type": "object",
+                    "description": "Adresse postale (address, postal_code, city, country_alpha2)"
+                },
+                "emails": {
+                    "type": "array",
+                    "description": "Liste d'emails",
+                    "items": {"type": "string"}
+                },
+                "iban": {
+                    "type": "string",
+                    "description": "IBAN du fournisseur"
+                },
+                "vat_number": {
+                    "type": "string",
+                    "description": "Numéro de TVA"
+                },
+                "force": _FORCE_PROPERTY,
+                **_WRITE_QUEUE_PROPERTIES,
+            },
+            "required": ["name"],
+        },
+    },
+    
+    # ==================== TRANSACTIONS ====================
+    {
+        "name": "pennylane_list_transactions",
+        "description": "Liste les transactions bancaires",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats",
+                    "default": 20
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres (ex: 'bank_account_id:eq:123')"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri",
+                    "default": "-date"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_get_transaction",
+        "description": "Récupère les détails d'une transaction",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+            },
+            "required": ["transaction_id"],
+        },
+    },
+    {
+        "name": "pennylane_create_transaction",
+        "description": "Crée une nouvelle transaction bancaire",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "date": {
+                    "type": "string",
+                    "description": "Date de la transaction (YYYY-MM-DD)"
+                },
+                "amount": {
+                    "type": "string",
+                    "description": "Montant (positif pour crédit, négatif pour débit)"
+                },
+                "label": {
+                    "type": "string",
+                    "description": "Libellé de la transaction"
+                },
+                "bank_account_id": {
+                    "type": "integer",
+                    "description": "ID du compte bancaire"
+                },
+                "fee": {
+                    "type": "string",
+                    "description": "Frais de transaction",
+                    "default": "0.00"
+                },
+                **_WRITE_QUEUE_PROPERTIES,
+            },
+            "required": ["date", "amount", "label", "bank_account_id"],
+        },
+    },
+    {
+        "name": "pennylane_update_transaction",
+        "description": "Met à jour une transaction existante",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Nouvelle date (YYYY-MM-DD)"
+                },
+                "amount": {
+                    "type": "string",
+                    "description": "Nouveau montant"
+                },
+                "label": {
+                    "type": "string",
+                    "description": "Nouveau libellé"
+                },
+            },
+            "required": ["transaction_id"],
+        },
+    },
+    {
+        "name": "pennylane_categorize_transaction",
+        "description": "Catégorise une transaction bancaire",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+                "categories": {
+                    "type": "array",
+                    "description": "Catégories avec category_id et weight",
+                    "items": {"type": "object"},
+                },
+            },
+            "required": ["transaction_id", "categories"],
+        },
+    },
+    {
+        "name": "pennylane_match_transaction_to_customer_invoice",
+        "description": "Associe une transaction à une facture client",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture client"
+                },
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+                "amount": {
+                    "type": "string",
+                    "description": "Montant à associer (optionnel)"
+                },
+            },
+            "required": ["invoice_id", "transaction_id"],
+        },
+    },
+    {
+        "name": "pennylane_unmatch_transaction_from_customer_invoice",
+        "description": "Dissocie une transaction d'une facture client",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture client"
+                },
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+            },
+            "required": ["invoice_id", "transaction_id"],
+        },
+    },
+    {
+        "name": "pennylane_match_transaction_to_supplier_invoice",
+        "description": "Associe une transaction à une facture fournisseur",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture fournisseur"
+                },
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+                "amount": {
+                    "type": "string",
+                    "description": "Montant à associer (optionnel)"
+                },
+            },
+            "required": ["invoice_id", "transaction_id"],
+        },
+    },
+    {
+        "name": "pennylane_unmatch_transaction_from_supplier_invoice",
+        "description": "Dissocie une transaction d'une facture fournisseur",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "invoice_id": {
+                    "type": "integer",
+                    "description": "ID de la facture fournisseur"
+                },
+                "transaction_id": {
+                    "type": "integer",
+                    "description": "ID de la transaction"
+                },
+            },
+            "required": ["invoice_id", "transaction_id"],
+        },
+    },
+    
+    # ==================== COMPTABILITÉ ====================
+    {
+        "name": "pennylane_get_trial_balance",
+        "description": "Récupère la balance générale pour une période donnée",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "period_start": {
+                    "type": "string",
+                    "description": "Date de début (YYYY-MM-DD)"
+                },
+                "period_end": {
+                    "type": "string",
+                    "description": "Date de fin (YYYY-MM-DD)"
+                },
+                "is_auxiliary": {
+                    "type": "boolean",
+                    "description": "Inclure les comptes auxiliaires",
+                    "default": False
+                },
+                "page": {
+                    "type": "integer",
+                    "description": "Numéro de page",
+                    "default": 1
+                },
+                "per_page": {
+                    "type": "integer",
+                    "description": "Items par page (1-1000)",
+                    "default": 100
+                },
+            },
+            "required": ["period_start", "period_end"],
+        },
+    },
+    {
+        "name": "pennylane_list_ledger_accounts",
+        "description": "Liste les comptes du plan comptable",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "page": {
+                    "type": "integer",
+                    "description": "Numéro de page",
+                    "default": 1
+                },
+                "per_page": {
+                    "type": "integer",
+                    "description": "Items par page (1-1000)",
+                    "default": 100
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres (ex: 'enabled:eq:true')"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_list_categories",
+        "description": "Liste les catégories comptables disponibles",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats (1-100)",
+                    "default": 100
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_list_bank_accounts",
+        "description": "Liste les comptes bancaires de l'entreprise",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Nombre de résultats (1-100)",
+                    "default": 100
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Curseur de pagination"
+                },
+            },
+        },
+    },
+    
+    # ==================== RAPPORTS ====================
+    {
+        "name": "pennylane_aged_receivables",
+        "description": "Balance âgée clients : montants restant dus des factures ouvertes par tranche de retard (non échu, 1-30, 31-60, 61-90, 90+ jours), par client et au total. Calculée côté serveur sur toutes les factures ouvertes.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "as_of": {
+                    "type": "string",
+                    "description": "Date de référence (YYYY-MM-DD, défaut: aujourd'hui)"
+                },
+                "customer_id": {
+                    "type": "integer",
+                    "description": "Limiter à un client"
+                },
+                "deadline_from": {
+                    "type": "string",
+                    "description": "Échéance minimale (YYYY-MM-DD ; exclut les factures sans échéance)"
+                },
+                "deadline_to": {
+                    "type": "string",
+                    "description": "Échéance maximale (YYYY-MM-DD ; exclut les factures sans échéance)"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres Pennylane supplémentaires"
+                },
+                "top": {
+                    "type": "integer",
+                    "description": "Nombre de clients détaillés, les plus gros encours d'abord (défaut: 100)",
+                    "default": 100
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_aged_payables",
+        "description": "Balance âgée fournisseurs : montants restant dus des factures ouvertes par tranche de retard (non échu, 1-30, 31-60, 61-90, 90+ jours), par fournisseur et au total. Calculée côté serveur sur toutes les factures ouvertes.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "as_of": {
+                    "type": "string",
+                    "description": "Date de référence (YYYY-MM-DD, défaut: aujourd'hui)"
+                },
+                "supplier_id": {
+                    "type": "integer",
+                    "description": "Limiter à un fournisseur"
+                },
+                "deadline_from": {
+                    "type": "string",
+                    "description": "Échéance minimale (YYYY-MM-DD ; exclut les factures sans échéance)"
+                },
+                "deadline_to": {
+                    "type": "string",
+                    "description": "Échéance maximale (YYYY-MM-DD ; exclut les factures sans échéance)"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres Pennylane supplémentaires"
+                },
+                "top": {
+                    "type": "integer",
+                    "description": "Nombre de fournisseurs détaillés, les plus gros encours d'abord (défaut: 100)",
+                    "default": 100
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_cash_forecast",
+        "description": "Prévision de trésorerie par compte bancaire : solde projeté (jour par jour ou par semaine) à partir des soldes actuels, des échéances des factures clients et fournisseurs ouvertes et des flux récurrents détectés dans l'historique des transactions (loyers, salaires, prélèvements...)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "horizon_days": {
+                    "type": "integer",
+                    "description": "Nombre de jours projetés (défaut: 90)",
+                    "default": 90
+                },
+                "granularity": {
+                    "type": "string",
+                    "enum": ["day", "week"],
+                    "description": "Série journalière ou hebdomadaire (défaut: day)",
+                    "default": "day"
+                },
+                "bank_account_id": {
+                    "type": "integer",
+                    "description": "Limiter la série à un compte bancaire"
+                },
+                "invoice_account_id": {
+                    "type": "integer",
+                    "description": "Compte bancaire recevant/payant les factures (défaut: premier compte)"
+                },
+                "history_days": {
+                    "type": "integer",
+                    "description": "Profondeur de l'historique de transactions analysé (défaut: 180)",
+                    "default": 180
+                },
+                "include_overdue": {
+                    "type": "boolean",
+                    "description": "Compter les factures échues comme encaissées/payées aujourd'hui (défaut: false)",
+                    "default": False
+                },
+                "as_of": {
+                    "type": "string",
+                    "description": "Date de départ (YYYY-MM-DD, défaut: aujourd'hui)"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_customer_overview",
+        "description": "Vue d'ensemble d'un client en un appel : fiche, encours (total et échu), délai moyen de paiement et derniers documents (factures, devis, paiements). Les lectures sont faites en parallèle.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "customer_id": {
+                    "type": "integer",
+                    "description": "ID du client"
+                },
+                "last": {
+                    "type": "integer",
+                    "description": "Nombre de documents récents retournés par type (défaut: 5)",
+                    "default": 5,
+                    "minimum": 0,
+                    "maximum": 50
+                },
+                "payment_sample": {
+                    "type": "integer",
+                    "description": "Factures payées récentes utilisées pour le délai de paiement (défaut: 10)",
+                    "default": 10,
+                    "minimum": 0,
+                    "maximum": 50
+                },
+            },
+            "required": ["customer_id"],
+        },
+    },
+    # ==================== PARCOURS COMPLET ====================
+    {
+        "name": "pennylane_list_all",
+        "description": "Récupère toutes les pages d'une liste Pennylane (jusqu'à max_items), avec notifications de progression et annulation possible. Retourne next_cursor pour reprendre un parcours incomplet.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "resource": {
+                    "type": "string",
+                    "enum": [
+                        "customer_invoices", "supplier_invoices", "quotes", "customers", "suppliers",
+                        "transactions", "categories", "bank_accounts", "ledger_accounts",
+                    ],
+                    "description": "Ressource à parcourir"
+                },
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres Pennylane (ex: 'date:gteq:2024-01-01')"
+                },
+                "sort": {
+                    "type": "string",
+                    "description": "Tri (ex: '-id'), ressources paginées par curseur uniquement"
+                },
+                "max_items": {
+                    "type": "integer",
+                    "description": "Nombre maximal d'éléments (défaut: 1000)",
+                    "default": 1000
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "Point de reprise (next_cursor d'un appel précédent)"
+                },
+            },
+            "required": ["resource"],
+        },
+    },
+    {
+        "name": "pennylane_convert_quotes_to_invoices",
+        "description": "Convertit en masse des devis acceptés en factures clients (lignes et sections reprises, devis passé au statut invoiced), avec conversions simultanées et rapport par devis. Retourne run_id pour reprendre une conversion incomplète ou réessayer les devis en échec sans recréer de facture.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "filter": {
+                    "type": "string",
+                    "description": "Filtres sur les devis (ex: 'customer_id:eq:123') ; status:eq:accepted est ajouté si le filtre ne porte pas sur le statut"
+                },
+                "max_quotes": {
+                    "type": "integer",
+                    "description": "Nombre maximal de devis traités par appel (défaut: 50)",
+                    "default": 50,
+                    "minimum": 1,
+                    "maximum": 500
+                },
+                "concurrency": {
+                    "type": "integer",
+                    "description": "Conversions simultanées (défaut: 4)",
+                    "default": 4,
+                    "minimum": 1,
+                    "maximum": 10
+                },
+                "date": {
+                    "type": "string",
+                    "description": "Date des factures (YYYY-MM-DD, défaut: aujourd'hui)"
+                },
+                "payment_days": {
+                    "type": "integer",
+                    "description": "Délai de paiement en jours, échéance = date + payment_days (défaut: 30)",
+                    "default": 30,
+                    "minimum": 0
+                },
+                "draft": {
+                    "type": "boolean",
+                    "description": "Crée les factures en brouillon (défaut: true)",
+                    "default": True
+                },
+                "dry_run": {
+                    **_DRY_RUN_PROPERTY,
+                    "description": "Contrôle les lignes des devis et retourne l'aperçu des factures sans rien créer ni modifier"
+                },
+                "run_id": {
+                    "type": "string",
+                    "description": "Reprend une conversion précédente (run_id d'un appel précédent, mêmes paramètres)"
+                },
+            },
+        },
+    },
+    {
+        "name": "pennylane_find_duplicates",
+        "description": "Recherche les doublons parmi tous les clients ou fournisseurs (SIREN, TVA, IBAN, nom normalisé, domaine email) et retourne les grappes de doublons probables avec leur score. L'index construit est réutilisé par les appels suivants et par le contrôle avant création.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "resource": {
+                    "type": "string",
+                    "enum": ["customers", "suppliers"],
+                    "description": "Tiers à analyser (défaut: customers)",
+                    "default": "customers"
+                },
+                "threshold": {
+                    "type": "number",
+                    "description": "Score minimal d'une paire de doublons (défaut: 0.85)",
+                    "minimum": 0,
+                    "maximum": 1
+                },
+                "max_clusters": {
+                    "type": "integer",
+                    "description": "Nombre maximal de grappes retournées (défaut: 100)",
+                    "default": 100,
+                    "minimum": 1
+                },
+                "refresh": {
+                    "type": "boolean",
+                    "description": "Reconstruit l'index au lieu de réutiliser celui en mémoire",
+                    "default": False
+                },
+            },
+        },
+    },
+    # ==================== SERVEUR ====================
+    {
+        "name": "pennylane_fetch_more",
+        "description": "Récupère la suite d'une réponse trop volumineuse découpée en morceaux (poignée 'continuation.handle'), sans rappeler l'API Pennylane",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "handle": {
+                    "type": "string",
+                    "description": "Poignée de continuation retournée dans le champ 'continuation'"
+                },
+                "chunk": {
+                    "type": "integer",
+                    "description": "Index du morceau à récupérer (par défaut : le morceau suivant)"
+                },
+            },
+            "required": ["handle"],
+        },
+    },
+    {
+        "name": "pennylane_get_write_ticket",
+        "description": "État d'une création mise en file durable (queued, processing, done avec le résultat de l'API, ou failed avec l'erreur)",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "ticket": {
+                    "type": "string",
+                    "description": "Ticket retourné par l'outil de création"
+                },
+            },
+            "required": ["ticket"],
+        },
+    },
+    {
+        "name": "pennylane_server_stats",
+        "description": "Statistiques du serveur MCP : appels et latences (p50/p95/p99) par outil et par endpoint Pennylane, tailles de réponse, nouvelles tentatives et taux de succès des caches",
+        "inputSchema": {
+            "type": "object",
+            "properties": {},
+        },
+    },
+]
+
+# Budget de temps par appel, accepté par tous les outils (voir deadlines.py)
+_TIMEOUT_PROPERTY: dict[str, Any] = {
+    "type": "number",
+    "description": "Délai maximal de l'appel en secondes (défaut : 60, 300 pour les parcours complets et rapports)"
+}
+for _definition in TOOL_DEFINITIONS:
+    _definition["inputSchema"]["properties"]["timeout_seconds"] = _TIMEOUT_PROPERTY
+
+TOOL_NAMES = frozenset(definition["name"] for definition in TOOL_DEFINITIONS)
+
+
+@cache
+def get_tools() -> list:
+    """Construit (une seule fois) la liste des objets `Tool` exposés par `list_tools`."""
+    from mcp.types import Tool
+
+    return [Tool(**definition) for definition in TOOL_DEFINITIONS]
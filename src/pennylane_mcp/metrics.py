@@ -0,0 +1,347 @@
+"""Métriques internes du serveur (compteurs, jauges, histogrammes).
+
+Les métriques sont exposées au format texte Prometheus (`render`) et sous forme
+de résumé JSON (`snapshot`) pour l'outil `pennylane_server_stats`.
+"""
+import asyncio
+import math
+import os
+import re
+from typing import Any, Iterable
+
+# Bornes des histogrammes de latence (secondes) et de taille (octets)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """Remplace les identifiants numériques d'un endpoint (ex: `quotes/{id}/update_status`)."""
+    return _ID_SEGMENT.sub("/{id}", "/" + endpoint.strip("/"))[1:]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur monotone, éventuellement étiqueté."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def get(self, **labels: Any) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def _render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Valeur instantanée, éventuellement étiquetée."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.values[self._key(labels)] = value
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    """Histogramme à bornes fixes ; les quantiles sont interpolés dans les buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.series: dict[tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _HistogramSeries(len(self.buckets))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series.counts[index] += 1
+                break
+        series.count += 1
+        series.sum += value
+
+    def quantile(self, q: float, **labels: Any) -> float | None:
+        """Estime le quantile `q` (0-1) comme `histogram_quantile` de Prometheus."""
+        series = self.series.get(self._key(labels))
+        if series is None or series.count == 0:
+            return None
+        return self._quantile(series, q)
+
+    def _quantile(self, series: _HistogramSeries, q: float) -> float:
+        rank = q * series.count
+        cumulative = 0
+        lower = 0.0
+        for index, bound in enumerate(self.buckets):
+            previous = cumulative
+            cumulative += series.counts[index]
+            if cumulative >= rank and series.counts[index]:
+                if math.isinf(bound):
+                    return self.buckets[-2]
+                return lower + (bound - lower) * (rank - previous) / series.counts[index]
+            lower = bound if not math.isinf(bound) else lower
+        return self.buckets[-2]
+
+    def summary(self, key: tuple[str, ...]) -> dict[str, Any]:
+        series = self.series[key]
+        return {
+            "count": series.count,
+            "sum": round(series.sum, 6),
+            "p50": round(self._quantile(series, 0.50), 6),
+            "p95": round(self._quantile(series, 0.95), 6),
+            "p99": round(self._quantile(series, 0.99), 6),
+        }
+
+    def _render_samples(self) -> list[str]:
+        lines = []
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+# ==================== OUTILS MCP ====================
+TOOL_CALLS = Counter(
+    "pennylane_tool_calls_total", "Appels d'outils MCP par statut", ("tool", "status")
+)
+TOOL_DURATION = Histogram(
+    "pennylane_tool_duration_seconds", "Durée d'exécution des outils MCP", ("tool",)
+)
+TOOL_RESPONSE_BYTES = Histogram(
+    "pennylane_tool_response_bytes", "Taille des réponses des outils MCP", ("tool",), SIZE_BUCKETS
+)
+
+# ==================== API PENNYLANE ====================
+UPSTREAM_REQUESTS = Counter(
+    "pennylane_upstream_requests_total",
+    "Requêtes vers l'API Pennylane par code de statut",
+    ("method", "endpoint", "status"),
+)
+UPSTREAM_DURATION = Histogram(
+    "pennylane_upstream_duration_seconds",
+    "Durée des requêtes vers l'API Pennylane",
+    ("method", "endpoint"),
+)
+UPSTREAM_RESPONSE_BYTES = Histogram(
+    "pennylane_upstream_response_bytes",
+    "Taille des réponses de l'API Pennylane",
+    ("method", "endpoint"),
+    SIZE_BUCKETS,
+)
+UPSTREAM_RETRIES = Counter(
+    "pennylane_upstream_retries_total", "Nouvelles tentatives vers l'API Pennylane", ("endpoint",)
+)
+
+# ==================== CACHES ====================
+CACHE_LOOKUPS = Counter(
+    "pennylane_cache_lookups_total", "Consultations des caches (hit/miss)", ("cache", "result")
+)
+
+# ==================== PROCESSUS ====================
+EVENT_LOOP_LAG = Histogram(
+    "pennylane_event_loop_lag_seconds",
+    "Retard de la boucle asyncio (réveil d'une tâche de surveillance)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+PROCESS_RSS = Gauge("pennylane_process_resident_memory_bytes", "Mémoire résidente du processus")
+
+ALL_METRICS: list[_Metric] = [
+    TOOL_CALLS,
+    TOOL_DURATION,
+    TOOL_RESPONSE_BYTES,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_DURATION,
+    UPSTREAM_RESPONSE_BYTES,
+    UPSTREAM_RETRIES,
+    CACHE_LOOKUPS,
+    EVENT_LOOP_LAG,
+    PROCESS_RSS,
+]
+
+
+def register(metric: _Metric) -> _Metric:
+    """Ajoute une métrique au registre exposé."""
+    ALL_METRICS.append(metric)
+    return metric
+
+
+def record_tool_call(tool: str, status: str, duration: float, response_bytes: int) -> None:
+    """Enregistre l'exécution d'un outil MCP."""
+    TOOL_CALLS.inc(tool=tool, status=status)
+    TOOL_DURATION.observe(duration, tool=tool)
+    TOOL_RESPONSE_BYTES.observe(response_bytes, tool=tool)
+
+
+def record_upstream(method: str, endpoint: str, status: int | str, duration: float, response_bytes: int) -> None:
+    """Enregistre une requête vers l'API Pennylane."""
+    endpoint = normalize_endpoint(endpoint)
+    UPSTREAM_REQUESTS.inc(method=method, endpoint=endpoint, status=status)
+    UPSTREAM_DURATION.observe(duration, method=method, endpoint=endpoint)
+    UPSTREAM_RESPONSE_BYTES.observe(response_bytes, method=method, endpoint=endpoint)
+
+
+def record_retry(endpoint: str) -> None:
+    """Enregistre une nouvelle tentative vers l'API Pennylane."""
+    UPSTREAM_RETRIES.inc(endpoint=normalize_endpoint(endpoint))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Enregistre une consultation de cache."""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def resident_memory_bytes() -> int:
+    """Mémoire résidente actuelle (Linux), ou pic de mémoire à défaut."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+async def monitor_process(interval: float = 0.5) -> None:
+    """Mesure en continu le retard de la boucle asyncio et la mémoire résidente."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+        PROCESS_RSS.set(resident_memory_bytes())
+
+
+def render() -> str:
+    """Rend toutes les métriques au format texte Prometheus."""
+    lines: list[str] = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _status_counts(counter: Counter, index: int, key_len: int) -> dict[tuple[str, ...], dict[str, float]]:
+    counts: dict[tuple[str, ...], dict[str, float]] = {}
+    for key, value in counter.values.items():
+        counts.setdefault(key[:key_len], {})[key[index]] = value
+    return counts
+
+
+def snapshot() -> dict[str, Any]:
+    """Résumé JSON des métriques, utilisé par l'outil `pennylane_server_stats`."""
+    tool_statuses = _status_counts(TOOL_CALLS, 1, 1)
+    tools = {}
+    for key in TOOL_DURATION.series:
+        statuses = tool_statuses.get(key, {})
+        tools[key[0]] = {
+            "calls": int(sum(statuses.values())),
+            "errors": int(statuses.get("error", 0)),
+            "latency_seconds": TOOL_DURATION.summary(key),
+            "response_bytes": TOOL_RESPONSE_BYTES.summary(key),
+        }
+
+    endpoint_statuses = _status_counts(UPSTREAM_REQUESTS, 2, 2)
+    endpoints = {}
+    for key in UPSTREAM_DURATION.series:
+        statuses = endpoint_statuses.get(key, {})
+        endpoints[f"{key[0]} {key[1]}"] = {
+            "requests": int(sum(statuses.values())),
+            "by_status": {status: int(count) for status, count in sorted(statuses.items())},
+            "retries": int(UPSTREAM_RETRIES.get(endpoint=key[1])),
+            "latency_seconds": UPSTREAM_DURATION.summary(key),
+            "response_bytes": UPSTREAM_RESPONSE_BYTES.summary(key),
+        }
+
+    caches: dict[str, dict[str, Any]] = {}
+    for (cache, result), value in CACHE_LOOKUPS.values.items():
+        caches.setdefault(cache, {"hit": 0, "miss": 0})[result] = int(value)
+    for stats in caches.values():
+        total = stats["hit"] + stats["miss"]
+        stats["hit_ratio"] = round(stats["hit"] / total, 4) if total else None
+
+    process: dict[str, Any] = {"resident_memory_bytes": resident_memory_bytes()}
+    if () in EVENT_LOOP_LAG.series:
+        process["event_loop_lag_seconds"] = EVENT_LOOP_LAG.summary(())
+
+    return {
+        "tools": tools,
+        "upstream": endpoints,
+        "retries_total": int(sum(UPSTREAM_RETRIES.values.values())),
+        "caches": caches,
+        "process": process,
+    }
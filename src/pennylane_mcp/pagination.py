@@ -0,0 +1,174 @@
+"""Parcours des listes paginées de l'API Pennylane, avec progression.
+
+Deux schémas de pagination coexistent dans l'API v2 :
+- par curseur (`has_more` / `next_cursor`, paramètre `limit`) ;
+- par numéro de page (`total_pages` / `current_page`, paramètre `per_page`),
+  pour `ledger_accounts` et `trial_balance`. Une page coupée par `max_items`
+  donne un point de reprise `page:position` (ex. `2:50`), dont les éléments
+  déjà retournés sont sautés à la reprise.
+
+`PageIterator` produit les éléments page par page et publie après chaque page
+une notification de progression (pages lues, enregistrements, fin estimée).
+L'annulation est coopérative : elle interrompt la requête HTTP en cours, dont
+la connexion est aussitôt libérée, et aucune page suivante n'est demandée.
+
+Avec `partial_on_deadline`, le parcours s'arrête avant l'échéance de l'outil
+(`deadlines.py`) s'il ne reste pas le temps de lire une page de plus : le
+résultat est alors partiel (`complete` faux) avec son point de reprise.
+"""
+import time
+from typing import Any, AsyncIterator
+
+from . import deadlines, progress
+from .client import PennylaneClient
+
+DEFAULT_PAGE_SIZE = 100
+PAGE_BASED_ENDPOINTS = frozenset({"ledger_accounts", "trial_balance"})
+# Temps réservé à la mise en forme de la réponse après la dernière page (secondes)
+DEADLINE_MARGIN = 0.5
+
+
+class PageIterator:
+    """Itère sur les pages d'un endpoint de liste, en s'arrêtant après `max_items` éléments."""
+
+    def __init__(
+        self,
+        client: PennylaneClient,
+        endpoint: str,
+        params: dict[str, Any] | None = None,
+        max_items: int | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        report_progress: bool = True,
+        partial_on_deadline: bool = False,
+    ):
+        self.client = client
+        self.endpoint = endpoint
+        self.params = dict(params or {})
+        self.max_items = max_items
+        self.page_size = page_size
+        self.page_based = endpoint in PAGE_BASED_ENDPOINTS
+        # Désactivé quand plusieurs parcours concurrents publient une progression agrégée
+        self.report_progress = report_progress
+        self.partial_on_deadline = partial_on_deadline
+        self.stopped_at_deadline = False
+        self.next_cursor = cursor
+        self.next_page = 1
+        # Éléments déjà retournés de la page `next_page` (reprise au milieu d'une page)
+        self.skip = 0
+        if self.page_based and cursor:
+            page, _, skip = cursor.partition(":")
+            self.next_page = int(page)
+            self.skip = int(skip or 0)
+        self.total_pages: int | None = None
+        self.pages = 0
+        self.records = 0
+        self.complete = False
+        self._start = 0.0
+
+    def _eta(self) -> float | None:
+        elapsed = time.perf_counter() - self._start
+        if self.page_based and self.total_pages:
+            remaining = self.total_pages - self.next_page + 1
+            return elapsed / self.pages * remaining if self.pages else None
+        if self.max_items and self.records:
+            return elapsed / self.records * (self.max_items - self.records)
+        return None
+
+    def _done(self) -> bool:
+        return self.complete or (self.max_items is not None and self.records >= self.max_items)
+
+    def _out_of_time(self) -> bool:
+        """Vrai s'il ne reste pas le temps de lire une page de plus avant l'échéance."""
+        left = deadlines.remaining()
+        if not self.partial_on_deadline or left is None or not self.pages:
+            return False
+        page_time = (time.perf_counter() - self._start) / self.pages
+        return left < page_time + DEADLINE_MARGIN
+
+    async def _report(self) -> None:
+        final = self._done()
+        message = f"{self.endpoint}: {self.pages} page(s), {self.records} enregistrement(s)"
+        eta = None if final else self._eta()
+        if eta is not None:
+            message += f", fin estimée dans {eta:.0f} s"
+        if self.page_based and self.total_pages:
+            await progress.report(self.next_page - 1, self.total_pages, message, force=final)
+        else:
+            await progress.report(self.records, self.max_items, message, force=final)
+
+    async def _fetch(self) -> dict[str, Any]:
+        params = dict(self.params)
+        remaining = self.page_size if self.max_items is None else min(self.page_size, self.max_items - self.records)
+        if self.page_based:
+            params.update(page=self.next_page, per_page=self.page_size)
+        else:
+            # Ne jamais dépasser max_items : next_cursor reste un point de reprise exact
+            params["limit"] = remaining
+            if self.next_cursor:
+                params["cursor"] = self.next_cursor
+        return await self.client.get(self.endpoint, params)
+
+    async def __aiter__(self) -> AsyncIterator[list[dict[str, Any]]]:
+        self._start = time.perf_counter()
+        while not self._done():
+            if self._out_of_time():
+                self.stopped_at_deadline = True
+                break
+            page = await self._fetch()
+            items = page.get("items", [])
+            self.pages += 1
+            if self.page_based:
+                self.total_pages = page.get("total_pages", 1)
+                current = page.get("current_page", self.next_page)
+                available = items[self.skip:]
+                items = available if self.max_items is None else available[:self.max_items - self.records]
+                if len(items) < len(available):
+                    # Page coupée par max_items : la reprise se fera dans cette même page
+                    self.next_page = current
+                    self.skip += len(items)
+                else:
+                    self.next_page = current + 1
+                    self.skip = 0
+                    self.complete = self.next_page > self.total_pages
+            else:
+                self.next_cursor = page.get("next_cursor")
+                self.complete = not page.get("has_more") or not self.next_cursor
+            self.records += len(items)
+            if self.report_progress:
+                await self._report()
+            yield items
+
+    @property
+    def resume_cursor(self) -> str | None:
+        """Point de reprise du parcours (None s'il est terminé)."""
+        if self.complete:
+            return None
+        if self.page_based:
+            return f"{self.next_page}:{self.skip}" if self.skip else str(self.next_page)
+        return self.next_cursor
+
+
+async def collect(
+    client: PennylaneClient,
+    endpoint: str,
+    params: dict[str, Any] | None = None,
+    max_items: int | None = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+) -> dict[str, Any]:
+    """Parcourt toutes les pages (dans la limite de `max_items` et de l'échéance) et retourne les éléments."""
+    pages = PageIterator(client, endpoint, params, max_items, page_size, cursor, partial_on_deadline=True)
+    items: list[dict[str, Any]] = []
+    async for page_items in pages:
+        items.extend(page_items)
+    result = {
+        "items": items,
+        "total_items": len(items),
+        "pages_fetched": pages.pages,
+        "complete": pages.complete,
+        "next_cursor": pages.resume_cursor,
+    }
+    if pages.stopped_at_deadline:
+        result["stopped_at_deadline"] = True
+    return result
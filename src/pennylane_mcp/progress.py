@@ -0,0 +1,77 @@
+"""Notifications de progression MCP pour les outils longs.
+
+Le reporter est lié au contexte de l'appel d'outil (`contextvars`) : les
+fonctions d'outils restent de simples coroutines prenant `client` et appellent
+`progress.report(...)`, qui ne fait rien si le client MCP n'a pas fourni de
+`progressToken` (ou hors d'une requête MCP, par exemple dans les benchmarks).
+
+Variables d'environnement :
+    PENNYLANE_PROGRESS_INTERVAL: délai minimal entre deux notifications (secondes, défaut 0.5)
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = float(os.getenv("PENNYLANE_PROGRESS_INTERVAL", "0.5"))
+
+_current: ContextVar["ProgressReporter | None"] = ContextVar("pennylane_progress", default=None)
+
+
+class ProgressReporter:
+    """Envoie les notifications `notifications/progress` d'une requête MCP, avec limitation de débit."""
+
+    def __init__(self, session: Any, token: str | int, request_id: Any = None, min_interval: float = PROGRESS_INTERVAL):
+        self.session = session
+        self.token = token
+        self.request_id = request_id
+        self.min_interval = min_interval
+        self.sent = 0
+        self._last_sent = 0.0
+
+    async def update(self, progress: float, total: float | None = None, message: str | None = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_sent < self.min_interval:
+            return
+        self._last_sent = now
+        try:
+            await self.session.send_progress_notification(
+                self.token, progress, total=total, message=message, related_request_id=self.request_id
+            )
+            self.sent += 1
+        except Exception as e:
+            # Une notification perdue ne doit pas faire échouer l'outil
+            logger.debug(f"Progress notification failed: {e}")
+
+
+def from_request(server: Any) -> ProgressReporter | None:
+    """Construit un reporter pour la requête MCP en cours, si le client a demandé la progression."""
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return None
+    return ProgressReporter(ctx.session, token, ctx.request_id)
+
+
+@contextmanager
+def bind(reporter: ProgressReporter | None) -> Iterator[None]:
+    """Active `reporter` pour l'appel d'outil courant."""
+    token = _current.set(reporter)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+async def report(progress: float, total: float | None = None, message: str | None = None, force: bool = False) -> None:
+    """Signale l'avancement de l'outil courant (sans effet si aucun reporter n'est actif)."""
+    reporter = _current.get()
+    if reporter is not None:
+        await reporter.update(progress, total, message, force)
@@ -0,0 +1,33 @@
+"""Limitation de débit des requêtes vers l'API Pennylane (seau à jetons)."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` jetons par seconde, rafales jusqu'à `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Attend qu'un jeton soit disponible puis le consomme (ordre d'arrivée respecté)."""
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def penalize(self, seconds: float) -> None:
+        """Suspend la distribution de jetons (réponse 429 avec `Retry-After`)."""
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+        self.updated_at = time.monotonic()
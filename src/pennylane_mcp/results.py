@@ -0,0 +1,184 @@
+"""Découpage des réponses volumineuses et poignées de continuation.
+
+Quand la réponse sérialisée d'un outil dépasse `PENNYLANE_MAX_RESPONSE_BYTES`,
+le résultat complet est conservé dans un `ResultStore` (borné en durée et en
+mémoire) et seul le premier morceau est renvoyé, avec une poignée que l'outil
+`pennylane_fetch_more` utilise pour obtenir les morceaux suivants sans rappeler
+l'API Pennylane.
+
+Les réponses de liste (`{"items": [...]}`) sont découpées par groupes
+d'éléments, chaque morceau restant un JSON valide ; les autres réponses sont
+découpées en tranches de texte (`partial_text`) à concaténer.
+"""
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any
+
+from . import metrics
+
+MAX_RESPONSE_BYTES = int(os.getenv("PENNYLANE_MAX_RESPONSE_BYTES", "200000"))
+STORE_TTL = float(os.getenv("PENNYLANE_RESULT_STORE_TTL", "600"))
+STORE_MAX_BYTES = int(os.getenv("PENNYLANE_RESULT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Place réservée à l'enveloppe `continuation` dans chaque morceau
+_ENVELOPE_BYTES = 1024
+
+RESPONSES_CHUNKED = metrics.register(metrics.Counter(
+    "pennylane_responses_chunked_total", "Réponses découpées en morceaux (taille dépassée)", ("tool",)
+))
+RESULT_STORE_BYTES = metrics.register(metrics.Gauge(
+    "pennylane_result_store_bytes", "Octets conservés dans le stockage des réponses découpées"
+))
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+
+class _StoredResult:
+    __slots__ = ("tool", "chunks", "size", "expires_at", "next_chunk")
+
+    def __init__(self, tool: str, chunks: list[dict[str, Any]], size: int, expires_at: float):
+        self.tool = tool
+        self.chunks = chunks
+        self.size = size
+        self.expires_at = expires_at
+        self.next_chunk = 1
+
+
+class ResultStore:
+    """Stockage LRU des résultats découpés, borné en durée de vie et en octets."""
+
+    def __init__(self, ttl: float = STORE_TTL, max_bytes: int = STORE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, _StoredResult] = OrderedDict()
+
+    def _remove(self, handle: str) -> None:
+        entry = self._entries.pop(handle)
+        self.total_bytes -= entry.size
+
+    def _evict(self, needed: int) -> None:
+        now = time.monotonic()
+        for handle in [h for h, e in self._entries.items() if e.expires_at <= now]:
+            self._remove(handle)
+        while self._entries and self.total_bytes + needed > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def put(self, tool: str, chunks: list[dict[str, Any]], size: int) -> str | None:
+        """Conserve les morceaux et retourne une poignée (None si le résultat ne tient pas)."""
+        if size > self.max_bytes:
+            return None
+        self._evict(size)
+        handle = secrets.token_urlsafe(12)
+        self._entries[handle] = _StoredResult(tool, chunks, size, time.monotonic() + self.ttl)
+        self.total_bytes += size
+        RESULT_STORE_BYTES.set(self.total_bytes)
+        return handle
+
+    def get(self, handle: str, chunk: int | None = None) -> tuple[_StoredResult, int]:
+        """Retourne l'entrée et l'index du morceau demandé (le suivant par défaut)."""
+        entry = self._entries.get(handle)
+        if entry is None or entry.expires_at <= time.monotonic():
+            metrics.record_cache("result_store", False)
+            if entry is not None:
+                self._remove(handle)
+                RESULT_STORE_BYTES.set(self.total_bytes)
+            raise KeyError(f"Unknown or expired continuation handle: {handle}")
+        metrics.record_cache("result_store", True)
+        index = entry.next_chunk if chunk is None else chunk
+        if not 0 <= index < len(entry.chunks):
+            raise IndexError(f"Chunk {index} out of range (0-{len(entry.chunks) - 1})")
+        entry.next_chunk = index + 1
+        self._entries.move_to_end(handle)
+        return entry, index
+
+
+store = ResultStore()
+
+
+def _item_size(item: Any) -> int:
+    text = _dumps(item)
+    # Indentation supplémentaire une fois imbriqué dans {"items": [...]}
+    return len(text.encode("utf-8")) + 4 * text.count("\n") + 6
+
+
+def _split_items(result: dict[str, Any], budget: int) -> list[dict[str, Any]]:
+    meta = {key: value for key, value in result.items() if key != "items"}
+    budget = max(1, budget - len(_dumps(meta).encode("utf-8")) - _ENVELOPE_BYTES)
+    chunks: list[dict[str, Any]] = []
+    current: list[Any] = []
+    current_size = 0
+    for item in result["items"]:
+        size = _item_size(item)
+        if current and current_size + size > budget:
+            chunks.append({"items": current})
+            current, current_size = [], 0
+        current.append(item)
+        current_size += size
+    chunks.append({"items": current})
+    chunks[0] = {**meta, **chunks[0]}
+    return chunks
+
+
+def _serialized_size(piece: str) -> int:
+    """Taille de la tranche une fois échappée dans l'enveloppe JSON (guillemets, `\\`, `\\n`...)."""
+    return len(json.dumps(piece, ensure_ascii=False).encode("utf-8"))
+
+
+def _split_text(text: str, budget: int) -> list[dict[str, Any]]:
+    budget = max(16, budget - _ENVELOPE_BYTES)
+    chunks = []
+    start = 0
+    while start < len(text):
+        # Au plus `budget` caractères, réduits tant que la tranche échappée dépasse le budget
+        end = min(len(text), start + budget)
+        while end - start > 1 and (size := _serialized_size(text[start:end])) > budget:
+            end = start + max(1, int((end - start) * budget / size * 0.95))
+        chunks.append({"partial_text": text[start:end]})
+        start = end
+    return chunks
+
+
+def _with_continuation(handle: str | None, entry_chunks: int, index: int, total_bytes: int, payload: dict[str, Any]) -> dict[str, Any]:
+    continuation: dict[str, Any] = {
+        "handle": handle,
+        "chunk": index,
+        "total_chunks": entry_chunks,
+        "next_chunk": index + 1 if index + 1 < entry_chunks else None,
+        "total_bytes": total_bytes,
+    }
+    if index == 0:
+        if handle:
+            continuation["message"] = (
+                f"Réponse de {total_bytes} octets découpée en {entry_chunks} morceaux. "
+                f"Appeler pennylane_fetch_more avec handle='{handle}' pour obtenir la suite."
+            )
+        else:
+            continuation["message"] = "Réponse trop volumineuse pour être conservée : seul le premier morceau est disponible."
+        if "partial_text" in payload:
+            continuation["format"] = "Concaténer les champs partial_text de tous les morceaux pour obtenir le JSON complet."
+    return {**payload, "continuation": continuation}
+
+
+def paginate_response(tool: str, result: Any, text: str, size: int, budget: int = MAX_RESPONSE_BYTES) -> str:
+    """Découpe une réponse trop volumineuse, conserve la suite et retourne le premier morceau."""
+    chunks: list[dict[str, Any]] = []
+    if isinstance(result, dict) and isinstance(result.get("items"), list) and result["items"]:
+        chunks = _split_items(result, budget)
+    if len(chunks) < 2:
+        # Pas de liste, ou un seul élément trop volumineux : découpage du texte
+        chunks = _split_text(text, budget)
+    RESPONSES_CHUNKED.inc(tool=tool)
+    handle = store.put(tool, chunks, size)
+    return _dumps(_with_continuation(handle, len(chunks), 0, size, chunks[0]))
+
+
+def fetch_more(handle: str, chunk: int | None = None) -> dict[str, Any]:
+    """Retourne un morceau d'une réponse découpée (le suivant par défaut)."""
+    entry, index = store.get(handle, chunk)
+    return _with_continuation(handle, len(entry.chunks), index, entry.size, entry.chunks[index])
@@ -1,18 +1,24 @@
 """Serveur MCP pour Pennylane."""
 import os
+import json
+import time
+import asyncio
 import logging
+import socket
 from typing import Any
 from dotenv import load_dotenv
 
 from mcp.server import Server
 from mcp.types import Tool, TextContent
-from mcp.server.stdio import stdio_server
 
+from . import backends, deadlines, diskcache, lines, logs, metrics, progress, results, tools, tracing, validation, warmup, webhooks, workers, writes
+from .cache import CACHE_STALE_TTL, ResponseCache
 from .client import PennylaneClient
-from .tools import invoices, customers, suppliers, transactions, accounting, quotes
+from .manifest import TOOL_DEFINITIONS, TOOL_NAMES, get_tools
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
+# Configuration du logging : file écrite par un thread (logs.py), trace_id ajouté par tracing.TraceIdFilter
+logs.configure()
+tracing.install_log_filter()
 logger = logging.getLogger(__name__)
 
 # Chargement des variables d'environnement
@@ -25,1367 +31,282 @@ app = Server("pennylane-mcp")
 pennylane_client: PennylaneClient | None = None
 
 
-# Définition des outils MCP
-TOOLS = [
+@webhooks.subscribe
+async def _apply_webhook_event(event: webhooks.Event) -> None:
+    """Tient le cache des réponses du client à jour à partir des webhooks."""
+    if pennylane_client:
+        await pennylane_client.cache.apply_event(event.resource, event.action, event.record_id, event.data)
+
+
+def _write_target(arguments: dict[str, Any]) -> Any:
+    """Cible d'un outil de création : la file durable si activée (ticket retourné), sinon le client."""
+    key = arguments.pop("idempotency_key", None)
+    deduplicate = arguments.pop("deduplicate", False)
+    queued = arguments.pop("queued", True)
+    if writes.queue is not None and queued:
+        return writes.queue.writer(key, deduplicate)
+    return pennylane_client
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """Liste tous les outils disponibles."""
+    return get_tools()
+
+
+async def _execute_tool(name: str, arguments: Any) -> Any:
+    """Exécute l'appel Pennylane correspondant à un outil et retourne le résultat brut."""
+    result = None
+
     # ==================== FACTURES CLIENTS ====================
-    Tool(
-        name="pennylane_list_customer_invoices",
-        description="Liste les factures clients avec pagination et filtres",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats (1-100)",
-                    "default": 20
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres (ex: 'draft:eq:true' ou 'paid:eq:false')"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri (ex: '-id' pour desc, 'date' pour asc)",
-                    "default": "-id"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_get_customer_invoice",
-        description="Récupère les détails d'une facture client par son ID",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture"
-                },
-            },
-            "required": ["invoice_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_create_customer_invoice",
-        description="Crée une nouvelle facture client (brouillon ou finalisée)",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "customer_id": {
-                    "type": "integer",
-                    "description": "ID du client"
-                },
-                "date": {
-                    "type": "string",
-                    "description": "Date de la facture (YYYY-MM-DD) - OBLIGATOIRE"
-                },
-                "deadline": {
-                    "type": "string",
-                    "description": "Date limite de paiement (YYYY-MM-DD) - OBLIGATOIRE"
-                },
-                "invoice_lines": {
-                    "type": "array",
-                    "description": "Lignes de facture avec label, raw_currency_unit_price, quantity, unit, vat_rate",
-                    "items": {"type": "object"},
-                },
-                "draft": {
-                    "type": "boolean",
-                    "description": "OBLIGATOIRE - True = brouillon modifiable, False = facture finalisée",
-                    "default": True
-                },
-                "currency": {
-                    "type": "string",
-                    "description": "Devise (EUR, USD, etc.)",
-                    "default": "EUR"
-                },
-                "language": {
-                    "type": "string",
-                    "description": "Langue (fr_FR, en_GB, de_DE)",
-                    "default": "fr_FR"
-                },
-            },
-            "required": ["customer_id", "date", "deadline", "invoice_lines"],
-        },
-    ),
-    Tool(
-        name="pennylane_finalize_customer_invoice",
-        description="Finalise une facture client (la rend non modifiable et génère le PDF)",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture"
-                },
-            },
-            "required": ["invoice_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_send_customer_invoice_email",
-        description="Envoie une facture client par email",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture"
-                },
-                "recipients": {
-                    "type": "array",
-                    "description": "Liste d'emails destinataires (vide = utilise les emails du client)",
-                    "items": {"type": "string"},
-                    "default": []
-                },
-            },
-            "required": ["invoice_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_categorize_customer_invoice",
-        description="Catégorise une facture client avec des catégories comptables",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture"
-                },
-                "categories": {
-                    "type": "array",
-                    "description": "Liste des catégories avec category_id et weight",
-                    "items": {"type": "object"},
-                },
-            },
-            "required": ["invoice_id", "categories"],
-        },
-    ),
+    if name == "pennylane_list_customer_invoices":
+        result = await tools.invoices.list_customer_invoices(
+            pennylane_client,
+            limit=arguments.get("limit", 20),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort", "-id"),
+        )
+    
+    elif name == "pennylane_get_customer_invoice":
+        result = await tools.invoices.get_customer_invoice(
+            pennylane_client,
+            arguments["invoice_id"]
+        )
+    
+    elif name == "pennylane_create_customer_invoice":
+        result = await tools.invoices.create_customer_invoice(
+            _write_target(arguments),
+            customer_id=arguments["customer_id"],
+            date=arguments["date"],
+            deadline=arguments["deadline"],
+            invoice_lines=arguments["invoice_lines"],
+            draft=arguments.get("draft", True),
+            currency=arguments.get("currency", "EUR"),
+            language=arguments.get("language", "fr_FR"),
+            **{k: v for k, v in arguments.items() 
+               if k not in ["customer_id", "date", "deadline", "invoice_lines", "draft", "currency", "language"]}
+        )
+    
+    elif name == "pennylane_finalize_customer_invoice":
+        result = await tools.invoices.finalize_customer_invoice(
+            pennylane_client,
+            arguments["invoice_id"]
+        )
+    
+    elif name == "pennylane_send_customer_invoice_email":
+        result = await tools.invoices.send_customer_invoice_by_email(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            recipients=arguments.get("recipients", [])
+        )
+    
+    elif name == "pennylane_categorize_customer_invoice":
+        result = await tools.invoices.categorize_invoice(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            invoice_type="customer",
+            categories=arguments["categories"]
+        )
     
     # ==================== FACTURES FOURNISSEURS ====================
-    Tool(
-        name="pennylane_list_supplier_invoices",
-        description="Liste les factures fournisseurs avec pagination et filtres",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats (1-100)",
-                    "default": 20
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri",
-                    "default": "-id"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_get_supplier_invoice",
-        description="Récupère les détails d'une facture fournisseur",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture fournisseur"
-                },
-            },
-            "required": ["invoice_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_categorize_supplier_invoice",
-        description="Catégorise une facture fournisseur",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture"
-                },
-                "categories": {
-                    "type": "array",
-                    "description": "Liste des catégories avec category_id et weight",
-                    "items": {"type": "object"},
-                },
-            },
-            "required": ["invoice_id", "categories"],
-        },
-    ),
+    elif name == "pennylane_list_supplier_invoices":
+        result = await tools.invoices.list_supplier_invoices(
+            pennylane_client,
+            limit=arguments.get("limit", 20),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort", "-id")
+        )
     
-    # ==================== CLIENTS ====================
-    Tool(
-        name="pennylane_list_customers",
-        description="Liste tous les clients (entreprises et particuliers)",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats",
-                    "default": 20
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri",
-                    "default": "-id"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_get_customer",
-        description="Récupère les détails d'un client (générique)",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "customer_id": {
-                    "type": "integer",
-                    "description": "ID du client"
-                },
-            },
-            "required": ["customer_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_get_company_customer",
-        description="Récupère les détails d'un client entreprise",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "customer_id": {
-                    "type": "integer",
-                    "description": "ID du client entreprise"
-                },
-            },
-            "required": ["customer_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_get_individual_customer",
-        description="Récupère les détails d'un client particulier",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "customer_id": {
-                    "type": "integer",
-                    "description": "ID du client particulier"
-                },
-            },
-            "required": ["customer_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_create_company_customer",
-        description="Crée un nouveau client entreprise",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "name": {
-                    "type": "string",
-                    "description": "Nom de l'entreprise"
-                },
-                "billing_address": {
-                    "type": "object",
-                    "description": "Adresse de facturation",
-                    "properties": {
-                        "address": {"type": "string"},
-                        "postal_code": {"type": "string"},
-                        "city": {"type": "string"},
-                        "country_alpha2": {"type": "string"}
-                    },
-                    "required": ["address", "postal_code", "city", "country_alpha2"]
-                },
-                "delivery_address": {
-                    "type": "object",
-                    "description": "Adresse de livraison",
-                    "properties": {
-                        "address": {"type": "string"},
-                        "postal_code": {"type": "string"},
-                        "city": {"type": "string"},
-                        "country_alpha2": {"type": "string"}
-                    }
-                },
-                "ledger_account": {
-                    "type": "object",
-                    "description": "Compte comptable",
-                    "properties": {
-                        "number": {"type": "string"}
-                    }
-                },
-                "emails": {
-                    "type": "array",
-                    "description": "Liste d'emails",
-                    "items": {"type": "string"}
-                },
-                "phone": {
-                    "type": "string",
-                    "description": "Téléphone"
-                },
-                "vat_number": {
-                    "type": "string",
-                    "description": "Numéro de TVA"
-                },
-                "reg_no": {
-                    "type": "string",
-                    "description": "Numéro SIREN/SIRET"
-                },
-                "billing_iban": {
-                    "type": "string",
-                    "description": "IBAN de facturation"
-                },
-                "recipient": {
-                    "type": "string",
-                    "description": "Destinataire"
-                },
-                "reference": {
-                    "type": "string",
-                    "description": "Référence client"
-                },
-                "notes": {
-                    "type": "string",
-                    "description": "Notes"
-                },
-                "external_reference": {
-                    "type": "string",
-                    "description": "Référence externe"
-                },
-                "payment_conditions": {
-                    "type": "string",
-                    "description": "Conditions de paiement",
-                    "enum": ["upon_receipt", "custom", "15_days", "30_days", "45_days", "60_days"],
-                    "default": "30_days"
-                },
-                "billing_language": {
-                    "type": "string",
-                    "description": "Langue de facturation",
-                    "enum": ["fr_FR", "en_GB", "de_DE"],
-                    "default": "fr_FR"
-                },
-            },
-            "required": ["name", "billing_address"],
-        },
-    ),
-    Tool(
-        name="pennylane_create_individual_customer",
-        description="Crée un nouveau client particulier",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "first_name": {
-                    "type": "string",
-                    "description": "Prénom"
-                },
-                "last_name": {
-                    "type": "string",
-                    "description": "Nom de famille"
-                },
-                "billing_address": {
-                    "type": "object",
-                    "description": "Adresse de facturation",
-                    "properties": {
-                        "address": {"type": "string"},
-                        "postal_code": {"type": "string"},
-                        "city": {"type": "string"},
-                        "country_alpha2": {"type": "string"}
-                    },
-                    "required": ["address", "postal_code", "city", "country_alpha2"]
-                },
-                "delivery_address": {
-                    "type": "object",
-                    "description": "Adresse de livraison",
-                    "properties": {
-                        "address": {"type": "string"},
-                        "postal_code": {"type": "string"},
-                        "city": {"type": "string"},
-                        "country_alpha2": {"type": "string"}
-                    }
-                },
-                "ledger_account": {
-                    "type": "object",
-                    "description": "Compte comptable",
-                    "properties": {
-                        "number": {"type": "string"}
-                    }
-                },
-                "emails": {
-                    "type": "array",
-                    "description": "Liste d'emails",
-                    "items": {"type": "string"}
-                },
-                "phone": {
-                    "type": "string",
-                    "description": "Téléphone"
-                },
-                "billing_iban": {
-                    "type": "string",
-                    "description": "IBAN de facturation"
-                },
-                "recipient": {
-                    "type": "string",
-                    "description": "Destinataire"
-                },
-                "reference": {
-                    "type": "string",
-                    "description": "Référence client"
-                },
-                "notes": {
-                    "type": "string",
-                    "description": "Notes"
-                },
-                "external_reference": {
-                    "type": "string",
-                    "description": "Référence externe"
-                },
-                "payment_conditions": {
-                    "type": "string",
-                    "description": "Conditions de paiement",
-                    "enum": ["upon_receipt", "custom", "15_days", "30_days", "45_days", "60_days"],
-                    "default": "30_days"
-                },
-                "billing_language": {
-                    "type": "string",
-                    "description": "Langue de facturation",
-                    "enum": ["fr_FR", "en_GB", "de_DE"],
-                    "default": "fr_FR"
-                },
-            },
-            "required": ["first_name", "last_name", "billing_address"],
-        },
-    ),
+    elif name == "pennylane_get_supplier_invoice":
+        result = await tools.invoices.get_supplier_invoice(
+            pennylane_client,
+            arguments["invoice_id"]
+        )
+    
+    elif name == "pennylane_categorize_supplier_invoice":
+        result = await tools.invoices.categorize_invoice(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            invoice_type="supplier",
+            categories=arguments["categories"]
+        )
     
     # ==================== DEVIS ====================
-    Tool(
-        name="pennylane_list_quotes",
-        description="Liste tous les devis",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats",
-                    "default": 30
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres (ex: 'status:eq:pending', 'customer_id:eq:123')"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri",
-                    "default": "-id"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_get_quote",
-        description="Récupère les détails d'un devis",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "quote_id": {
-                    "type": "integer",
-                    "description": "ID du devis"
-                },
-            },
-            "required": ["quote_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_list_quote_invoice_line_sections",
-        description="Liste les sections de lignes d'un devis",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "quote_id": {
-                    "type": "integer",
-                    "description": "ID du devis"
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats",
-                    "default": 100
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri",
-                    "default": "-id"
-                },
-            },
-            "required": ["quote_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_list_quote_appendices",
-        description="Liste les annexes (fichiers joints) d'un devis",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "quote_id": {
-                    "type": "integer",
-                    "description": "ID du devis"
-                },
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats",
-                    "default": 20
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-            },
-            "required": ["quote_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_create_quote",
-        description="Crée un nouveau devis",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "customer_id": {
-                    "type": "integer",
-                    "description": "ID du client"
-                },
-                "invoice_lines": {
-                    "type": "array",
-                    "description": "Lignes du devis",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "label": {"type": "string", "description": "Libellé de la ligne"},
-                            "quantity": {"type": "number", "description": "Quantité"},
-                            "raw_currency_unit_price": {"type": "string", "description": "Prix unitaire HT (jusqu'à 6 décimales)"},
-                            "vat_rate": {
-                                "type": "string",
-                                "description": "Taux de TVA au format Pennylane (ex: FR_200 pour 20% en France, FR_100 pour 10%, FR_55 pour 5.5%, FR_21 pour 2.1%)"
-                            },
-                            "unit": {"type": "string", "description": "Unité (ex: 'unité', 'jour', 'heure')"},
-                            "description": {"type": "string", "description": "Description de la ligne"},
-                            "section_rank": {"type": "integer", "description": "Rang de la section"},
-                            "ledger_account_id": {"type": "integer", "description": "ID du compte comptable"},
-                            "product_id": {"type": "integer", "description": "ID du produit"},
-                            "discount": {"type": "object", "description": "Remise sur la ligne"}
-                        },
-                        "required": ["label", "quantity", "raw_currency_unit_price", "vat_rate", "unit"]
-                    }
-                },
-                "date": {
-                    "type": "string", 
-                    "description": "Date du devis (YYYY-MM-DD)"
-                },
-                "deadline": {
-                    "type": "string",
-                    "description": "Date limite (YYYY-MM-DD)"
-                },
-                "currency": {
-                    "type": "string",
-                    "description": "Devise",
-                    "default": "EUR"
-                },
-                "language": {
-                    "type": "string",
-                    "description": "Langue",
-                    "enum": ["fr_FR", "en_GB", "de_DE"],
-                    "default": "fr_FR"
-                },
-                "discount": {
-                    "type": "object",
-                    "description": "Remise globale",
-                    "properties": {
-                        "type": {"type": "string", "enum": ["absolute", "percentage"]},
-                        "value": {"type": "string"}
-                    }
-                },
-                "invoice_line_sections": {
-                    "type": "array",
-                    "description": "Sections de lignes",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "rank": {"type": "integer"},
-                            "title": {"type": "string"},
-                            "description": {"type": "string"}
-                        }
-                    }
-                },
-                "quote_template_id": {
-                    "type": "integer",
-                    "description": "ID du modèle de devis"
-                },
-                "pdf_invoice_free_text": {
-                    "type": "string",
-                    "description": "Texte libre sur le PDF"
-                },
-                "pdf_invoice_subject": {
-                    "type": "string",
-                    "description": "Sujet du PDF"
-                },
-                "pdf_description": {
-                    "type": "string",
-                    "description": "Description du PDF"
-                },
-                "special_mention": {
-                    "type": "string",
-                    "description": "Mention spéciale"
-                },
-                "external_reference": {
-                    "type": "string",
-                    "description": "Référence externe"
-                }
-            },
-            "required": ["customer_id", "invoice_lines", "date", "deadline"]
-        }
-    ),
-    Tool(
-        name="pennylane_update_quote",
-        description="Met à jour un devis existant",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "quote_id": {
-                    "type": "integer",
-                    "description": "ID du devis"
-                },
-                "customer_id": {
-                    "type": "integer",
-                    "description": "ID du client"
-                },
-                "invoice_lines": {
-                    "type": "object",
-                    "description": "Lignes du devis (avec create pour ajouter)",
-                    "properties": {
-                        "create": {
-                            "type": "array",
-                            "items": {"type": "object"}
-                        }
-                    }
-                },
-                "date": {
-                    "type": "string",
-                    "description": "Date du devis (YYYY-MM-DD)"
-                },
-                "deadline": {
-                    "type": "string",
-                    "description": "Date limite (YYYY-MM-DD)"
-                },
-                "language": {
-                    "type": "string",
-                    "description": "Langue",
-                    "enum": ["fr_FR", "en_GB", "de_DE"]
-                },
-                "discount": {
-                    "type": "object",
-                    "description": "Remise globale"
-                },
-                "quote_template_id": {
-                    "type": "integer",
-                    "description": "ID du modèle de devis"
-                },
-                "pdf_invoice_free_text": {
-                    "type": "string",
-                    "description": "Texte libre sur le PDF"
-                },
-                "pdf_invoice_subject": {
-                    "type": "string",
-                    "description": "Sujet du PDF"
-                },
-                "pdf_description": {
-                    "type": "string",
-                    "description": "Description du PDF"
-                },
-                "special_mention": {
-                    "type": "string",
-                    "description": "Mention spéciale"
-                },
-                "external_reference": {
-                    "type": "string",
-                    "description": "Référence externe"
-                }
-            },
-            "required": ["quote_id"]
-        }
-    ),
-    Tool(
-        name="pennylane_update_quote_status",
-        description="Met à jour le statut d'un devis",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "quote_id": {
-                    "type": "integer",
-                    "description": "ID du devis"
-                },
-                "status": {
-                    "type": "string",
-                    "description": "Nouveau statut du devis",
-                    "enum": ["pending", "accepted", "denied", "invoiced", "expired"]
-                }
-            },
-            "required": ["quote_id", "status"]
-        }
-    ),
+    elif name == "pennylane_list_quotes":
+        result = await tools.quotes.list_quotes(
+            pennylane_client,
+            limit=arguments.get("limit", 30),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort", "-id")
+        )
     
-    # ==================== FOURNISSEURS ====================
-    Tool(
-        name="pennylane_list_suppliers",
-        description="Liste tous les fournisseurs",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats (1-100)",
-                    "default": 20
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres (ex: 'name:start_with:Acme')"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri",
-                    "default": "-id"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_get_supplier",
-        description="Récupère les détails d'un fournisseur par son ID",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "supplier_id": {
-                    "type": "integer",
-                    "description": "ID du fournisseur"
-                },
-            },
-            "required": ["supplier_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_create_supplier",
-        description="Crée un nouveau fournisseur",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "name": {
-                    "type": "string",
-                    "description": "Nom du fournisseur"
-                },
-                "postal_address": {
-                    "type": "object",
-                    "description": "Adresse postale (address, postal_code, city, country_alpha2)"
-                },
-                "emails": {
-                    "type": "array",
-                    "description": "Liste d'emails",
-                    "items": {"type": "string"}
-                },
-                "iban": {
-                    "type": "string",
-                    "description": "IBAN du fournisseur"
-                },
-                "vat_number": {
-                    "type": "string",
-                    "description": "Numéro de TVA"
-                },
-            },
-            "required": ["name"],
-        },
-    ),
+    elif name == "pennylane_get_quote":
+        result = await tools.quotes.get_quote(
+            pennylane_client,
+            arguments["quote_id"]
+        )
     
-    # ==================== TRANSACTIONS ====================
-    Tool(
-        name="pennylane_list_transactions",
-        description="Liste les transactions bancaires",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats",
-                    "default": 20
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres (ex: 'bank_account_id:eq:123')"
-                },
-                "sort": {
-                    "type": "string",
-                    "description": "Tri",
-                    "default": "-date"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_get_transaction",
-        description="Récupère les détails d'une transaction",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-            },
-            "required": ["transaction_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_create_transaction",
-        description="Crée une nouvelle transaction bancaire",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "date": {
-                    "type": "string",
-                    "description": "Date de la transaction (YYYY-MM-DD)"
-                },
-                "amount": {
-                    "type": "string",
-                    "description": "Montant (positif pour crédit, négatif pour débit)"
-                },
-                "label": {
-                    "type": "string",
-                    "description": "Libellé de la transaction"
-                },
-                "bank_account_id": {
-                    "type": "integer",
-                    "description": "ID du compte bancaire"
-                },
-                "fee": {
-                    "type": "string",
-                    "description": "Frais de transaction",
-                    "default": "0.00"
-                },
-            },
-            "required": ["date", "amount", "label", "bank_account_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_update_transaction",
-        description="Met à jour une transaction existante",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-                "date": {
-                    "type": "string",
-                    "description": "Nouvelle date (YYYY-MM-DD)"
-                },
-                "amount": {
-                    "type": "string",
-                    "description": "Nouveau montant"
-                },
-                "label": {
-                    "type": "string",
-                    "description": "Nouveau libellé"
-                },
-            },
-            "required": ["transaction_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_categorize_transaction",
-        description="Catégorise une transaction bancaire",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-                "categories": {
-                    "type": "array",
-                    "description": "Catégories avec category_id et weight",
-                    "items": {"type": "object"},
-                },
-            },
-            "required": ["transaction_id", "categories"],
-        },
-    ),
-    Tool(
-        name="pennylane_match_transaction_to_customer_invoice",
-        description="Associe une transaction à une facture client",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture client"
-                },
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-                "amount": {
-                    "type": "string",
-                    "description": "Montant à associer (optionnel)"
-                },
-            },
-            "required": ["invoice_id", "transaction_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_unmatch_transaction_from_customer_invoice",
-        description="Dissocie une transaction d'une facture client",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture client"
-                },
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-            },
-            "required": ["invoice_id", "transaction_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_match_transaction_to_supplier_invoice",
-        description="Associe une transaction à une facture fournisseur",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture fournisseur"
-                },
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-                "amount": {
-                    "type": "string",
-                    "description": "Montant à associer (optionnel)"
-                },
-            },
-            "required": ["invoice_id", "transaction_id"],
-        },
-    ),
-    Tool(
-        name="pennylane_unmatch_transaction_from_supplier_invoice",
-        description="Dissocie une transaction d'une facture fournisseur",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "invoice_id": {
-                    "type": "integer",
-                    "description": "ID de la facture fournisseur"
-                },
-                "transaction_id": {
-                    "type": "integer",
-                    "description": "ID de la transaction"
-                },
-            },
-            "required": ["invoice_id", "transaction_id"],
-        },
-    ),
+    elif name == "pennylane_list_quote_invoice_line_sections":
+        result = await tools.quotes.list_quote_invoice_line_sections(
+            pennylane_client,
+            quote_id=arguments["quote_id"],
+            limit=arguments.get("limit", 100),
+            cursor=arguments.get("cursor"),
+            sort=arguments.get("sort", "-id")
+        )
     
-    # ==================== COMPTABILITÉ ====================
-    Tool(
-        name="pennylane_get_trial_balance",
-        description="Récupère la balance générale pour une période donnée",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "period_start": {
-                    "type": "string",
-                    "description": "Date de début (YYYY-MM-DD)"
-                },
-                "period_end": {
-                    "type": "string",
-                    "description": "Date de fin (YYYY-MM-DD)"
-                },
-                "is_auxiliary": {
-                    "type": "boolean",
-                    "description": "Inclure les comptes auxiliaires",
-                    "default": False
-                },
-                "page": {
-                    "type": "integer",
-                    "description": "Numéro de page",
-                    "default": 1
-                },
-                "per_page": {
-                    "type": "integer",
-                    "description": "Items par page (1-1000)",
-                    "default": 100
-                },
-            },
-            "required": ["period_start", "period_end"],
-        },
-    ),
-    Tool(
-        name="pennylane_list_ledger_accounts",
-        description="Liste les comptes du plan comptable",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "page": {
-                    "type": "integer",
-                    "description": "Numéro de page",
-                    "default": 1
-                },
-                "per_page": {
-                    "type": "integer",
-                    "description": "Items par page (1-1000)",
-                    "default": 100
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres (ex: 'enabled:eq:true')"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_list_categories",
-        description="Liste les catégories comptables disponibles",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats (1-100)",
-                    "default": 100
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-                "filter": {
-                    "type": "string",
-                    "description": "Filtres"
-                },
-            },
-        },
-    ),
-    Tool(
-        name="pennylane_list_bank_accounts",
-        description="Liste les comptes bancaires de l'entreprise",
-        inputSchema={
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "Nombre de résultats (1-100)",
-                    "default": 100
-                },
-                "cursor": {
-                    "type": "string",
-                    "description": "Curseur de pagination"
-                },
-            },
-        },
-    ),
-]
-
-
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """Liste tous les outils disponibles."""
-    return TOOLS
-
-
-@app.call_tool()
-async def call_tool(name: str, arguments: Any) -> list[TextContent]:
-    """Exécute un outil."""
-    if not pennylane_client:
-        raise RuntimeError("Pennylane client not initialized")
+    elif name == "pennylane_list_quote_appendices":
+        result = await tools.quotes.list_quote_appendices(
+            pennylane_client,
+            quote_id=arguments["quote_id"],
+            limit=arguments.get("limit", 20),
+            cursor=arguments.get("cursor")
+        )
     
-    try:
-        result = None
-        
-        # ==================== FACTURES CLIENTS ====================
-        if name == "pennylane_list_customer_invoices":
-            result = await invoices.list_customer_invoices(
-                pennylane_client,
-                limit=arguments.get("limit", 20),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter"),
-                sort=arguments.get("sort", "-id"),
-            )
-        
-        elif name == "pennylane_get_customer_invoice":
-            result = await invoices.get_customer_invoice(
-                pennylane_client,
-                arguments["invoice_id"]
-            )
-        
-        elif name == "pennylane_create_customer_invoice":
-            result = await invoices.create_customer_invoice(
-                pennylane_client,
-                customer_id=arguments["customer_id"],
-                date=arguments["date"],
-                deadline=arguments["deadline"],
-                invoice_lines=arguments["invoice_lines"],
-                draft=arguments.get("draft", True),
-                currency=arguments.get("currency", "EUR"),
-                language=arguments.get("language", "fr_FR"),
-                **{k: v for k, v in arguments.items() 
-                   if k not in ["customer_id", "date", "deadline", "invoice_lines", "draft", "currency", "language"]}
-            )
-        
-        elif name == "pennylane_finalize_customer_invoice":
-            result = await invoices.finalize_customer_invoice(
-                pennylane_client,
-                arguments["invoice_id"]
-            )
-        
-        elif name == "pennylane_send_customer_invoice_email":
-            result = await invoices.send_customer_invoice_by_email(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                recipients=arguments.get("recipients", [])
-            )
-        
-        elif name == "pennylane_categorize_customer_invoice":
-            result = await invoices.categorize_invoice(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                invoice_type="customer",
-                categories=arguments["categories"]
-            )
-        
-        # ==================== FACTURES FOURNISSEURS ====================
-        elif name == "pennylane_list_supplier_invoices":
-            result = await invoices.list_supplier_invoices(
-                pennylane_client,
-                limit=arguments.get("limit", 20),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter"),
-                sort=arguments.get("sort", "-id")
-            )
-        
-        elif name == "pennylane_get_supplier_invoice":
-            result = await invoices.get_supplier_invoice(
-                pennylane_client,
-                arguments["invoice_id"]
-            )
-        
-        elif name == "pennylane_categorize_supplier_invoice":
-            result = await invoices.categorize_invoice(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                invoice_type="supplier",
-                categories=arguments["categories"]
-            )
-        
-        # ==================== DEVIS ====================
-        elif name == "pennylane_list_quotes":
-            result = await quotes.list_quotes(
-                pennylane_client,
-                limit=arguments.get("limit", 30),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter"),
-                sort=arguments.get("sort", "-id")
-            )
-        
-        elif name == "pennylane_get_quote":
-            result = await quotes.get_quote(
-                pennylane_client,
-                arguments["quote_id"]
-            )
-        
-        elif name == "pennylane_list_quote_invoice_line_sections":
-            result = await quotes.list_quote_invoice_line_sections(
-                pennylane_client,
-                quote_id=arguments["quote_id"],
-                limit=arguments.get("limit", 100),
-                cursor=arguments.get("cursor"),
-                sort=arguments.get("sort", "-id")
-            )
-        
-        elif name == "pennylane_list_quote_appendices":
-            result = await quotes.list_quote_appendices(
-                pennylane_client,
-                quote_id=arguments["quote_id"],
-                limit=arguments.get("limit", 20),
-                cursor=arguments.get("cursor")
-            )
-        
-        elif name == "pennylane_create_quote":
-            # Extraire les paramètres principaux
-            main_params = {
-                "customer_id": arguments["customer_id"],
-                "invoice_lines": arguments["invoice_lines"],
-                "date": arguments["date"],
-                "deadline": arguments["deadline"],
-                "currency": arguments.get("currency", "EUR"),
-                "language": arguments.get("language", "fr_FR"),
-            }
-            
-            # Ajouter les paramètres optionnels s'ils sont présents
-            optional_params = ["discount", "invoice_line_sections", "quote_template_id",
-                             "pdf_invoice_free_text", "pdf_invoice_subject", "pdf_description",
-                             "special_mention", "external_reference"]
-            
-            for param in optional_params:
-                if param in arguments:
-                    main_params[param] = arguments[param]
-            
-            result = await quotes.create_quote(
-                pennylane_client,
-                **main_params
-            )
-        
-        elif name == "pennylane_update_quote":
-            result = await quotes.update_quote(
-                pennylane_client,
-                quote_id=arguments["quote_id"],
-                **{k: v for k, v in arguments.items() if k != "quote_id"}
-            )
-        
-        elif name == "pennylane_update_quote_status":
-            result = await quotes.update_quote_status(
-                pennylane_client,
-                quote_id=arguments["quote_id"],
-                status=arguments["status"]
-            )
+    elif name == "pennylane_create_quote":
+        # Extraire les paramètres principaux
+        main_params = {
+            "customer_id": arguments["customer_id"],
+            "invoice_lines": arguments["invoice_lines"],
+            "date": arguments["date"],
+            "deadline": arguments["deadline"],
+            "currency": arguments.get("currency", "EUR"),
+            "language": arguments.get("language", "fr_FR"),
+        }
         
-        # ==================== CLIENTS ====================
-        elif name == "pennylane_list_customers":
-            result = await customers.list_customers(
-                pennylane_client,
-                limit=arguments.get("limit", 20),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter"),
-                sort=arguments.get("sort", "-id")
-            )
+        # Ajouter les paramètres optionnels s'ils sont présents
+        optional_params = ["discount", "invoice_line_sections", "quote_template_id",
+                         "pdf_invoice_free_text", "pdf_invoice_subject", "pdf_description",
+                         "special_mention", "external_reference", "dry_run"]
         
-        elif name == "pennylane_get_customer":
-            result = await customers.get_customer(
-                pennylane_client,
-                arguments["customer_id"]
-            )
+        for param in optional_params:
+            if param in arguments:
+                main_params[param] = arguments[param]
         
-        elif name == "pennylane_get_company_customer":
-            result = await customers.get_company_customer(
-                pennylane_client,
-                arguments["customer_id"]
-            )
+        result = await tools.quotes.create_quote(
+            pennylane_client,
+            **main_params
+        )
+    
+    elif name == "pennylane_update_quote":
+        result = await tools.quotes.update_quote(
+            pennylane_client,
+            quote_id=arguments["quote_id"],
+            **{k: v for k, v in arguments.items() if k != "quote_id"}
+        )
+    
+    elif name == "pennylane_update_quote_status":
+        result = await tools.quotes.update_quote_status(
+            pennylane_client,
+            quote_id=arguments["quote_id"],
+            status=arguments["status"]
+        )
+    
+    # ==================== CLIENTS ====================
+    elif name == "pennylane_list_customers":
+        result = await tools.customers.list_customers(
+            pennylane_client,
+            limit=arguments.get("limit", 20),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort", "-id")
+        )
+    
+    elif name == "pennylane_get_customer":
+        result = await tools.customers.get_customer(
+            pennylane_client,
+            arguments["customer_id"]
+        )
+    
+    elif name == "pennylane_get_company_customer":
+        result = await tools.customers.get_company_customer(
+            pennylane_client,
+            arguments["customer_id"]
+        )
+    
+    elif name == "pennylane_get_individual_customer":
+        result = await tools.customers.get_individual_customer(
+            pennylane_client,
+            arguments["customer_id"]
+        )
+    
+    elif name == "pennylane_create_company_customer":
+        # Extraire les paramètres principaux
+        main_params = {
+            "name": arguments["name"],
+            "billing_address": arguments["billing_address"],
+            "payment_conditions": arguments.get("payment_conditions", "30_days"),
+            "billing_language": arguments.get("billing_language", "fr_FR"),
+        }
         
-        elif name == "pennylane_get_individual_customer":
-            result = await customers.get_individual_customer(
-                pennylane_client,
-                arguments["customer_id"]
-            )
+        # Ajouter les paramètres optionnels s'ils sont présents
+        optional_params = ["emails", "phone", "vat_number", "reg_no", "billing_iban", 
+                         "recipient", "reference", "notes", "external_reference", 
+                         "delivery_address", "ledger_account"]
         
-        elif name == "pennylane_create_company_customer":
-            # Extraire les paramètres principaux
-            main_params = {
-                "name": arguments["name"],
-                "billing_address": arguments["billing_address"],
-                "payment_conditions": arguments.get("payment_conditions", "30_days"),
-                "billing_language": arguments.get("billing_language", "fr_FR"),
-            }
-            
-            # Ajouter les paramètres optionnels s'ils sont présents
-            optional_params = ["emails", "phone", "vat_number", "reg_no", "billing_iban", 
-                             "recipient", "reference", "notes", "external_reference", 
-                             "delivery_address", "ledger_account"]
-            
-            for param in optional_params:
-                if param in arguments:
-                    main_params[param] = arguments[param]
-            
-            result = await customers.create_company_customer(
-                pennylane_client,
-                **main_params
-            )
+        for param in optional_params:
+            if param in arguments:
+                main_params[param] = arguments[param]
         
-        elif name == "pennylane_create_individual_customer":
-            # Extraire les paramètres principaux
-            main_params = {
-                "first_name": arguments["first_name"],
-                "last_name": arguments["last_name"],
-                "billing_address": arguments["billing_address"],
-                "payment_conditions": arguments.get("payment_conditions", "30_days"),
-                "billing_language": arguments.get("billing_language", "fr_FR"),
-            }
-            
-            # Ajouter les paramètres optionnels s'ils sont présents
-            optional_params = ["emails", "phone", "billing_iban", "recipient", "reference", 
-                             "notes", "external_reference", "delivery_address", "ledger_account"]
-            
-            for param in optional_params:
-                if param in arguments:
-                    main_params[param] = arguments[param]
-            
-            result = await customers.create_individual_customer(
+        result = await tools.duplicates.check_before_create(
+            pennylane_client, "customers", main_params, force=arguments.get("force", False)
+        )
+        if result is None:
+            result = await tools.customers.create_company_customer(
                 pennylane_client,
                 **main_params
             )
+            tools.duplicates.record_created("customers", result)
+    
+    elif name == "pennylane_create_individual_customer":
+        # Extraire les paramètres principaux
+        main_params = {
+            "first_name": arguments["first_name"],
+            "last_name": arguments["last_name"],
+            "billing_address": arguments["billing_address"],
+            "payment_conditions": arguments.get("payment_conditions", "30_days"),
+            "billing_language": arguments.get("billing_language", "fr_FR"),
+        }
         
-        # ==================== FOURNISSEURS ====================
-        elif name == "pennylane_list_suppliers":
-            result = await suppliers.list_suppliers(
-                pennylane_client,
-                limit=arguments.get("limit", 20),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter"),
-                sort=arguments.get("sort", "-id")
-            )
+        # Ajouter les paramètres optionnels s'ils sont présents
+        optional_params = ["emails", "phone", "billing_iban", "recipient", "reference", 
+                         "notes", "external_reference", "delivery_address", "ledger_account"]
         
-        elif name == "pennylane_get_supplier":
-            result = await suppliers.get_supplier(
-                pennylane_client,
-                arguments["supplier_id"]
-            )
+        for param in optional_params:
+            if param in arguments:
+                main_params[param] = arguments[param]
         
-        elif name == "pennylane_create_supplier":
-            result = await suppliers.create_supplier(
-                pennylane_client,
+        result = await tools.customers.create_individual_customer(
+            pennylane_client,
+            **main_params
+        )
+    
+    # ==================== FOURNISSEURS ====================
+    elif name == "pennylane_list_suppliers":
+        result = await tools.suppliers.list_suppliers(
+            pennylane_client,
+            limit=arguments.get("limit", 20),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort", "-id")
+        )
+    
+    elif name == "pennylane_get_supplier":
+        result = await tools.suppliers.get_supplier(
+            pennylane_client,
+            arguments["supplier_id"]
+        )
+    
+    elif name == "pennylane_create_supplier":
+        result = await tools.duplicates.check_before_create(
+            pennylane_client, "suppliers", arguments, force=arguments.pop("force", False)
+        )
+        if result is None:
+            result = await tools.suppliers.create_supplier(
+                _write_target(arguments),
                 name=arguments["name"],
                 postal_address=arguments.get("postal_address"),
                 emails=arguments.get("emails"),
@@ -1394,127 +315,317 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
                 **{k: v for k, v in arguments.items() 
                    if k not in ["name", "postal_address", "emails", "iban", "vat_number"]}
             )
-        
-        # ==================== TRANSACTIONS ====================
-        elif name == "pennylane_list_transactions":
-            result = await transactions.list_transactions(
-                pennylane_client,
-                limit=arguments.get("limit", 20),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter"),
-                sort=arguments.get("sort", "-date")
-            )
-        
-        elif name == "pennylane_get_transaction":
-            result = await transactions.get_transaction(
-                pennylane_client,
-                arguments["transaction_id"]
-            )
-        
-        elif name == "pennylane_create_transaction":
-            result = await transactions.create_transaction(
-                pennylane_client,
-                date=arguments["date"],
-                amount=arguments["amount"],
-                label=arguments["label"],
-                bank_account_id=arguments["bank_account_id"],
-                fee=arguments.get("fee", "0.00"),
-                **{k: v for k, v in arguments.items() 
-                   if k not in ["date", "amount", "label", "bank_account_id", "fee"]}
-            )
-        
-        elif name == "pennylane_update_transaction":
-            result = await transactions.update_transaction(
-                pennylane_client,
-                transaction_id=arguments["transaction_id"],
-                **{k: v for k, v in arguments.items() if k != "transaction_id"}
-            )
-        
-        elif name == "pennylane_categorize_transaction":
-            result = await transactions.categorize_transaction(
-                pennylane_client,
-                transaction_id=arguments["transaction_id"],
-                categories=arguments["categories"]
-            )
-        
-        elif name == "pennylane_match_transaction_to_customer_invoice":
-            result = await transactions.match_transaction_to_customer_invoice(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                transaction_id=arguments["transaction_id"],
-                amount=arguments.get("amount")
-            )
-        
-        elif name == "pennylane_unmatch_transaction_from_customer_invoice":
-            result = await transactions.unmatch_transaction_from_customer_invoice(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                transaction_id=arguments["transaction_id"]
-            )
-        
-        elif name == "pennylane_match_transaction_to_supplier_invoice":
-            result = await transactions.match_transaction_to_supplier_invoice(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                transaction_id=arguments["transaction_id"],
-                amount=arguments.get("amount")
-            )
-        
-        elif name == "pennylane_unmatch_transaction_from_supplier_invoice":
-            result = await transactions.unmatch_transaction_from_supplier_invoice(
-                pennylane_client,
-                invoice_id=arguments["invoice_id"],
-                transaction_id=arguments["transaction_id"]
-            )
-        
-        # ==================== COMPTABILITÉ ====================
-        elif name == "pennylane_get_trial_balance":
-            result = await accounting.get_trial_balance(
-                pennylane_client,
-                period_start=arguments["period_start"],
-                period_end=arguments["period_end"],
-                is_auxiliary=arguments.get("is_auxiliary", False),
-                page=arguments.get("page", 1),
-                per_page=arguments.get("per_page", 100)
-            )
-        
-        elif name == "pennylane_list_ledger_accounts":
-            result = await accounting.list_ledger_accounts(
-                pennylane_client,
-                page=arguments.get("page", 1),
-                per_page=arguments.get("per_page", 100),
-                filter_query=arguments.get("filter")
-            )
-        
-        elif name == "pennylane_list_categories":
-            result = await accounting.list_categories(
-                pennylane_client,
-                limit=arguments.get("limit", 100),
-                cursor=arguments.get("cursor"),
-                filter_query=arguments.get("filter")
-            )
-        
-        elif name == "pennylane_list_bank_accounts":
-            result = await accounting.list_bank_accounts(
-                pennylane_client,
-                limit=arguments.get("limit", 100),
-                cursor=arguments.get("cursor")
-            )
-        
-        else:
-            raise ValueError(f"Unknown tool: {name}")
-        
-        # Formatage de la réponse
-        import json
-        return [TextContent(type="text", text=json.dumps(result, indent=2, ensure_ascii=False))]
+            tools.duplicates.record_created("suppliers", result)
+    
+    # ==================== TRANSACTIONS ====================
+    elif name == "pennylane_list_transactions":
+        result = await tools.transactions.list_transactions(
+            pennylane_client,
+            limit=arguments.get("limit", 20),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort", "-date")
+        )
+    
+    elif name == "pennylane_get_transaction":
+        result = await tools.transactions.get_transaction(
+            pennylane_client,
+            arguments["transaction_id"]
+        )
     
-    except Exception as e:
-        logger.error(f"Error executing tool {name}: {str(e)}", exc_info=True)
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+    elif name == "pennylane_create_transaction":
+        result = await tools.transactions.create_transaction(
+            _write_target(arguments),
+            date=arguments["date"],
+            amount=arguments["amount"],
+            label=arguments["label"],
+            bank_account_id=arguments["bank_account_id"],
+            fee=arguments.get("fee", "0.00"),
+            **{k: v for k, v in arguments.items() 
+               if k not in ["date", "amount", "label", "bank_account_id", "fee"]}
+        )
+    
+    elif name == "pennylane_update_transaction":
+        result = await tools.transactions.update_transaction(
+            pennylane_client,
+            transaction_id=arguments["transaction_id"],
+            **{k: v for k, v in arguments.items() if k != "transaction_id"}
+        )
+    
+    elif name == "pennylane_categorize_transaction":
+        result = await tools.transactions.categorize_transaction(
+            pennylane_client,
+            transaction_id=arguments["transaction_id"],
+            categories=arguments["categories"]
+        )
+    
+    elif name == "pennylane_match_transaction_to_customer_invoice":
+        result = await tools.transactions.match_transaction_to_customer_invoice(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            transaction_id=arguments["transaction_id"],
+            amount=arguments.get("amount")
+        )
+    
+    elif name == "pennylane_unmatch_transaction_from_customer_invoice":
+        result = await tools.transactions.unmatch_transaction_from_customer_invoice(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            transaction_id=arguments["transaction_id"]
+        )
+    
+    elif name == "pennylane_match_transaction_to_supplier_invoice":
+        result = await tools.transactions.match_transaction_to_supplier_invoice(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            transaction_id=arguments["transaction_id"],
+            amount=arguments.get("amount")
+        )
+    
+    elif name == "pennylane_unmatch_transaction_from_supplier_invoice":
+        result = await tools.transactions.unmatch_transaction_from_supplier_invoice(
+            pennylane_client,
+            invoice_id=arguments["invoice_id"],
+            transaction_id=arguments["transaction_id"]
+        )
+    
+    # ==================== COMPTABILITÉ ====================
+    elif name == "pennylane_get_trial_balance":
+        result = await tools.accounting.get_trial_balance(
+            pennylane_client,
+            period_start=arguments["period_start"],
+            period_end=arguments["period_end"],
+            is_auxiliary=arguments.get("is_auxiliary", False),
+            page=arguments.get("page", 1),
+            per_page=arguments.get("per_page", 100)
+        )
+    
+    elif name == "pennylane_list_ledger_accounts":
+        result = await tools.accounting.list_ledger_accounts(
+            pennylane_client,
+            page=arguments.get("page", 1),
+            per_page=arguments.get("per_page", 100),
+            filter_query=arguments.get("filter")
+        )
+    
+    elif name == "pennylane_list_categories":
+        result = await tools.accounting.list_categories(
+            pennylane_client,
+            limit=arguments.get("limit", 100),
+            cursor=arguments.get("cursor"),
+            filter_query=arguments.get("filter")
+        )
+    
+    elif name == "pennylane_list_bank_accounts":
+        result = await tools.accounting.list_bank_accounts(
+            pennylane_client,
+            limit=arguments.get("limit", 100),
+            cursor=arguments.get("cursor")
+        )
+    
+    # ==================== RAPPORTS ====================
+    elif name == "pennylane_aged_receivables":
+        result = await tools.reports.aged_receivables(
+            pennylane_client,
+            as_of=arguments.get("as_of"),
+            customer_id=arguments.get("customer_id"),
+            deadline_from=arguments.get("deadline_from"),
+            deadline_to=arguments.get("deadline_to"),
+            filter_query=arguments.get("filter"),
+            top=arguments.get("top", 100)
+        )
+    
+    elif name == "pennylane_aged_payables":
+        result = await tools.reports.aged_payables(
+            pennylane_client,
+            as_of=arguments.get("as_of"),
+            supplier_id=arguments.get("supplier_id"),
+            deadline_from=arguments.get("deadline_from"),
+            deadline_to=arguments.get("deadline_to"),
+            filter_query=arguments.get("filter"),
+            top=arguments.get("top", 100)
+        )
+    
+    elif name == "pennylane_cash_forecast":
+        result = await tools.forecast.cash_forecast(
+            pennylane_client,
+            horizon_days=arguments.get("horizon_days", 90),
+            granularity=arguments.get("granularity", "day"),
+            bank_account_id=arguments.get("bank_account_id"),
+            invoice_account_id=arguments.get("invoice_account_id"),
+            history_days=arguments.get("history_days", 180),
+            include_overdue=arguments.get("include_overdue", False),
+            as_of=arguments.get("as_of")
+        )
+    
+    elif name == "pennylane_customer_overview":
+        result = await tools.overview.customer_overview(
+            pennylane_client,
+            customer_id=arguments["customer_id"],
+            last=arguments.get("last", 5),
+            payment_sample=arguments.get("payment_sample", 10)
+        )
+    
+    # ==================== PARCOURS COMPLET ====================
+    elif name == "pennylane_list_all":
+        result = await tools.bulk.list_all(
+            pennylane_client,
+            resource=arguments["resource"],
+            filter_query=arguments.get("filter"),
+            sort=arguments.get("sort"),
+            max_items=arguments.get("max_items", 1000),
+            cursor=arguments.get("cursor")
+        )
+    
+    elif name == "pennylane_convert_quotes_to_invoices":
+        result = await tools.conversion.convert_quotes_to_invoices(
+            pennylane_client,
+            filter_query=arguments.get("filter"),
+            max_quotes=arguments.get("max_quotes", 50),
+            concurrency=arguments.get("concurrency", 4),
+            date=arguments.get("date"),
+            payment_days=arguments.get("payment_days", 30),
+            draft=arguments.get("draft", True),
+            dry_run=arguments.get("dry_run", False),
+            run_id=arguments.get("run_id")
+        )
+    
+    elif name == "pennylane_find_duplicates":
+        result = await tools.duplicates.find_duplicates(
+            pennylane_client,
+            resource=arguments.get("resource", "customers"),
+            threshold=arguments.get("threshold", tools.duplicates.DEDUP_THRESHOLD),
+            max_clusters=arguments.get("max_clusters", 100),
+            refresh=arguments.get("refresh", False)
+        )
+    
+    # ==================== SERVEUR ====================
+    elif name == "pennylane_server_stats":
+        result = {
+            **metrics.snapshot(),
+            "circuits": pennylane_client.breaker.snapshot(),
+            "warmup": warmup.snapshot(),
+            "process": workers.snapshot(),
+        }
+    
+    elif name == "pennylane_get_write_ticket":
+        result = writes.get_ticket(arguments["ticket"])
+    
+    elif name == "pennylane_fetch_more":
+        result = results.fetch_more(
+            handle=arguments["handle"],
+            chunk=arguments.get("chunk")
+        )
+    
+    else:
+        raise ValueError(f"Unknown tool: {name}")
+
+    return result
 
 
-async def main():
-    """Point d'entrée principal."""
+# Arguments validés par les validateurs précompilés de `validation` (pas par jsonschema à chaque appel)
+@app.call_tool(validate_input=False)
+async def call_tool(name: str, arguments: Any) -> list[TextContent]:
+    """Exécute un outil."""
+    if not pennylane_client:
+        raise RuntimeError("Pennylane client not initialized")
+    
+    start = time.perf_counter()
+    status = "ok"
+    size = 0
+    # Nom fourni par le client : les outils inconnus partagent une clé (métriques, limite des logs)
+    known_name = name if name in TOOL_NAMES else "unknown"
+    try:
+        # Le préchargement du cache cède la place aux appels d'outils en cours
+        with tracing.span("mcp.call_tool", tool=name) as call_span, progress.bind(progress.from_request(app)), warmup.foreground():
+            try:
+                validation.validate(name, arguments)
+                
+                # Budget de temps : l'outil et ses requêtes HTTP sont annulés à l'échéance
+                timeout = deadlines.for_tool(name, arguments.pop("timeout_seconds", None))
+                call_span.set_attribute("timeout_seconds", timeout)
+                with tracing.span("tool.execute"), deadlines.scope(timeout):
+                    result = await asyncio.wait_for(_execute_tool(name, arguments), timeout)
+                
+                # Formatage de la réponse
+                with tracing.span("tool.serialize"):
+                    text = json.dumps(result, indent=2, ensure_ascii=False)
+                    size = len(text.encode("utf-8"))
+                
+                # Réponse trop volumineuse : premier morceau + poignée de continuation
+                # (jamais pour pennylane_fetch_more, dont les morceaux tiennent déjà dans le budget)
+                if size > results.MAX_RESPONSE_BYTES and name != "pennylane_fetch_more":
+                    with tracing.span("tool.chunk", response_bytes=size):
+                        text = results.paginate_response(name, result, text, size)
+                        size = len(text.encode("utf-8"))
+            
+            except asyncio.CancelledError:
+                # Annulation par le client (notifications/cancelled) : propagée telle quelle
+                status = "cancelled"
+                logger.info("Tool %s cancelled", name)
+                raise
+            except (validation.ArgumentError, lines.LineError) as e:
+                status = "invalid"
+                logger.warning("%s", e, extra={"log_key": known_name})
+                text = f"Error: {str(e)}"
+                size = len(text.encode("utf-8"))
+            except (asyncio.TimeoutError, deadlines.DeadlineExceeded):
+                status = "timeout"
+                logger.warning("Tool %s exceeded its deadline of %gs", name, timeout, extra={"log_key": known_name})
+                text = f"Error: Tool {name} exceeded its deadline of {timeout:g}s (increase timeout_seconds or narrow the request)"
+                size = len(text.encode("utf-8"))
+            except Exception as e:
+                status = "error"
+                # Trace formatée par le thread des logs ; erreurs limitées par outil (logs.RateLimitFilter)
+                logger.error("Error executing tool %s: %s", name, e, exc_info=True, extra={"log_key": known_name})
+                text = f"Error: {str(e)}"
+                size = len(text.encode("utf-8"))
+            finally:
+                call_span.set_attribute("status", status)
+    finally:
+        metrics.record_tool_call(known_name, status, time.perf_counter() - start, size)
+    return [TextContent(type="text", text=text)]
+
+
+async def _serve_stdio():
+    """Sert le protocole MCP sur stdin/stdout (+ endpoints HTTP annexes si configurés)."""
+    from mcp.server.stdio import stdio_server
+    
+    http_server = None
+    http_task = None
+    http_port = os.getenv("PENNYLANE_HTTP_PORT")
+    if http_port:
+        from . import web
+        http_server = web.create_server(web.create_app(), os.getenv("PENNYLANE_HTTP_HOST", "0.0.0.0"), int(http_port))
+        http_task = asyncio.create_task(http_server.serve())
+    
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+    finally:
+        if http_task:
+            http_server.should_exit = True
+            await http_task
+
+
+def _http_address() -> tuple[str, int]:
+    return os.getenv("PENNYLANE_HTTP_HOST", "0.0.0.0"), int(os.getenv("PENNYLANE_HTTP_PORT") or os.getenv("PORT") or 8000)
+
+
+async def _serve_http(sock: socket.socket | None = None):
+    """Sert le protocole MCP en Streamable HTTP sur `/mcp`, avec les métriques sur `/metrics`.
+
+    `sock` : socket d'écoute hérité du processus parent (mode multi-processus).
+    """
+    from . import web
+    
+    host, port = _http_address()
+    http_server = web.create_server(web.create_app(mcp_server=app, stateless=workers.enabled()), host, port)
+    await http_server.serve(sockets=[sock] if sock else None)
+
+
+async def main(sock: socket.socket | None = None):
+    """Point d'entrée principal (`sock` : socket d'écoute d'un worker HTTP)."""
     global pennylane_client
     
     # Récupération de la clé API
@@ -1523,22 +634,68 @@ async def main():
         raise ValueError("PENNYLANE_API_KEY environment variable is required")
     
     base_url = os.getenv("PENNYLANE_BASE_URL", "https://app.pennylane.com/api/external/v2")
+    transport = os.getenv("PENNYLANE_TRANSPORT", "stdio")
+    if transport not in ("stdio", "http"):
+        raise ValueError(f"Unsupported PENNYLANE_TRANSPORT: {transport} (expected 'stdio' or 'http')")
     
-    # Initialisation du client
-    pennylane_client = PennylaneClient(api_key, base_url)
+    # Initialisation du client : cache disque (PENNYLANE_DISK_CACHE), cache partagé et débit global (PENNYLANE_REDIS_URL) ;
+    # en mode multi-processus, cache disque et débit sont partagés par les workers
+    disk_cache = diskcache.configure_from_env(default_path=workers.shared_path("cache.db"))
+    shared_cache = backends.configure_cache_from_env(stale_ttl=CACHE_STALE_TTL)
+    pennylane_client = PennylaneClient(
+        api_key,
+        base_url,
+        cache=ResponseCache(disk=disk_cache, shared=shared_cache),
+        limiter=backends.configure_rate_limiter_from_env(api_key, shared_file=workers.shared_path("ratelimit")),
+    )
     logger.info("Pennylane MCP server starting...")
     logger.info(f"Base URL: {base_url}")
-    logger.info(f"Available tools: {len(TOOLS)}")
+    logger.info(f"Transport: {transport}")
+    logger.info(f"Available tools: {len(TOOL_DEFINITIONS)}")
+    
+    # Export des traces (fichier JSONL ou collecteur OTLP)
+    tracing.configure_from_env()
+    
+    # Retard de la boucle asyncio et mémoire résidente
+    monitor_task = asyncio.create_task(metrics.monitor_process())
+    
+    # File durable des créations (reprise des écritures en attente, vidée par un seul worker)
+    write_queue = writes.configure_from_env()
+    if write_queue and workers.is_primary():
+        write_queue.start(pennylane_client)
+    
+    # Préchargement du cache en tâche de fond (état exposé sur /ready)
+    warmer = warmup.configure_from_env(persistent=bool(pennylane_client.cache.tiers), primary=workers.is_primary())
+    warmer.start(pennylane_client)
     
     try:
-        async with stdio_server() as (read_stream, write_stream):
-            await app.run(read_stream, write_stream, app.create_initialization_options())
+        if transport == "http":
+            await _serve_http(sock)
+        else:
+            await _serve_stdio()
     finally:
+        monitor_task.cancel()
+        await warmer.stop()
+        if write_queue:
+            await write_queue.stop()
         if pennylane_client:
             await pennylane_client.close()
             logger.info("Pennylane client closed")
+        if disk_cache:
+            await disk_cache.close()
+        if shared_cache:
+            await shared_cache.close()
+        await tracing.shutdown()
+
+
+def run():
+    """Lance le serveur : un processus, ou `PENNYLANE_WORKERS` workers HTTP pré-forkés."""
+    if workers.WORKERS > 1 and os.getenv("PENNYLANE_TRANSPORT", "stdio") == "http":
+        host, port = _http_address()
+        workers.prefork(lambda sock: asyncio.run(main(sock)), host, port)
+    else:
+        asyncio.run(main())
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    run()
\ No newline at end of file
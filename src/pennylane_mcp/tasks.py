@@ -0,0 +1,19 @@
+"""Exécution concurrente de coroutines avec annulation de groupe."""
+import asyncio
+from typing import Any, Awaitable
+
+
+async def gather_or_cancel(*awaitables: Awaitable[Any]) -> list[Any]:
+    """Comme `asyncio.gather`, mais annule les tâches restantes dès qu'une échoue ou que l'appelant est annulé.
+
+    Équivalent de `asyncio.TaskGroup` (Python 3.11+) pour Python 3.10 : aucune
+    requête HTTP ne reste en vol après l'échec ou l'annulation d'un outil.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
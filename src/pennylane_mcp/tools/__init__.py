@@ -1,9 +1,16 @@
-"""Outils MCP pour Pennylane."""
+"""Outils MCP pour Pennylane.
 
-from . import invoices
-from . import customers
-from . import suppliers
-from . import transactions
-from . import accounting
+Les sous-modules sont importés à la première utilisation (`tools.invoices`, ...)
+afin de ne pas allonger le démarrage à froid du serveur.
+"""
+import importlib
 
-__all__ = ["invoices", "customers", "suppliers", "transactions", "accounting"]
+__all__ = ["invoices", "customers", "suppliers", "transactions", "accounting", "quotes", "bulk", "reports", "forecast", "conversion", "overview", "duplicates"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
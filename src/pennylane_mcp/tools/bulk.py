@@ -0,0 +1,45 @@
+"""Outils de parcours complet des listes (toutes les pages)."""
+from typing import Any
+from ..client import PennylaneClient
+from ..pagination import collect
+
+LISTABLE_RESOURCES = (
+    "customer_invoices",
+    "supplier_invoices",
+    "quotes",
+    "customers",
+    "suppliers",
+    "transactions",
+    "categories",
+    "bank_accounts",
+    "ledger_accounts",
+)
+
+
+async def list_all(
+    client: PennylaneClient,
+    resource: str,
+    filter_query: str | None = None,
+    sort: str | None = None,
+    max_items: int = 1000,
+    cursor: str | None = None
+) -> dict[str, Any]:
+    """
+    Récupère toutes les pages d'une liste, avec notifications de progression.
+    
+    Args:
+        resource: Ressource à parcourir (voir LISTABLE_RESOURCES)
+        filter_query: Filtres Pennylane
+        sort: Tri (ex: "-id"), pour les ressources paginées par curseur
+        max_items: Nombre maximal d'éléments retournés
+        cursor: Point de reprise retourné par un appel précédent (next_cursor)
+    """
+    if resource not in LISTABLE_RESOURCES:
+        raise ValueError(f"Unsupported resource: {resource}")
+    params: dict[str, Any] = {}
+    if filter_query:
+        params["filter"] = filter_query
+    if sort:
+        params["sort"] = sort
+    result = await collect(client, resource, params, max_items=max_items, cursor=cursor)
+    return {"resource": resource, **result}
@@ -0,0 +1,254 @@
+"""Conversion en masse de devis acceptés en factures clients.
+
+Chaque devis suit les étapes `get_quote` (avec ses sections de lignes, lues en
+parallèle), `create_customer_invoice` puis `update_quote_status` (invoiced).
+Les devis sont traités en pipeline : la sélection paginée alimente une file que
+vident `concurrency` conversions simultanées, sans attendre la fin de la
+sélection.
+
+L'avancement de chaque conversion est conservé sous un `run_id` : un appel de
+reprise ne recrée jamais une facture déjà créée (seul le changement de statut
+restant est rejoué) et réessaie les devis en échec. Les devis convertis
+passent au statut `invoiced` et sortent donc de la sélection : une reprise
+poursuit avec les devis suivants.
+"""
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from datetime import date as date_type, timedelta
+from typing import Any
+
+from .. import deadlines, filters, progress
+from ..client import PennylaneClient
+from ..pagination import PageIterator
+from ..tasks import gather_or_cancel
+from . import invoices, quotes
+
+MAX_CONCURRENCY = 10
+
+# Champs recopiés des lignes et de l'en-tête du devis vers la facture
+LINE_FIELDS = (
+    "label", "quantity", "raw_currency_unit_price", "unit", "vat_rate", "description",
+    "discount", "section_rank", "product_id", "ledger_account_id",
+)
+QUOTE_FIELDS = ("currency", "language", "discount", "pdf_invoice_subject", "pdf_invoice_free_text", "special_mention")
+SECTION_FIELDS = ("title", "description", "rank")
+
+# Conversions conservées pour reprise (les plus anciennes sont oubliées)
+_MAX_RUNS = 64
+# Marge gardée avant l'échéance pour rendre le rapport
+_DEADLINE_MARGIN = 1.0
+
+
+class ConversionRun:
+    """Paramètres et avancement par devis d'une conversion (reprise possible)."""
+
+    def __init__(self, filter_query: str | None, options: dict[str, Any]):
+        self.run_id = secrets.token_urlsafe(8)
+        self.filter_query = filter_query
+        self.options = options
+        # quote_id -> résultat de la dernière tentative
+        self.quotes: dict[int, dict[str, Any]] = {}
+
+    def counts(self) -> dict[str, int]:
+        totals = {"converted": 0, "failed": 0, "skipped": 0}
+        for outcome in self.quotes.values():
+            totals[outcome["status"]] += 1
+        return totals
+
+
+_runs: "OrderedDict[str, ConversionRun]" = OrderedDict()
+
+
+def _remember(run: ConversionRun) -> None:
+    _runs[run.run_id] = run
+    _runs.move_to_end(run.run_id)
+    while len(_runs) > _MAX_RUNS:
+        _runs.popitem(last=False)
+
+
+def _selection_filter(filter_query: str | None) -> str | None:
+    """Filtre de sélection : devis acceptés, sauf si l'utilisateur filtre déjà sur le statut."""
+    if any(condition.get("field") == "status" for condition in filters.parse(filter_query)):
+        return filter_query
+    return filters.merge(filter_query, filters.condition("status", "eq", "accepted"))
+
+
+def _invoice_payload(quote: dict[str, Any], quote_lines: list[dict[str, Any]], sections: list[dict[str, Any]]) -> dict[str, Any]:
+    """Arguments de `create_customer_invoice` reprenant les lignes et sections du devis."""
+    customer_id = (quote.get("customer") or {}).get("id") or quote.get("customer_id")
+    if customer_id is None:
+        raise ValueError("Quote has no customer")
+    if not quote_lines:
+        raise ValueError("Quote has no invoice lines")
+    payload = {field: quote[field] for field in QUOTE_FIELDS if quote.get(field) is not None}
+    payload["customer_id"] = customer_id
+    payload["invoice_lines"] = [
+        {field: line[field] for field in LINE_FIELDS if line.get(field) is not None} for line in quote_lines
+    ]
+    if sections and any(line.get("section_rank") is not None for line in quote_lines):
+        payload["invoice_line_sections"] = [
+            {field: section[field] for field in SECTION_FIELDS if section.get(field) is not None}
+            for section in sorted(sections, key=lambda section: section.get("rank") or 0)
+        ]
+    return payload
+
+
+async def _quote_details(client: PennylaneClient, quote_id: int) -> tuple[dict[str, Any], list[dict[str, Any]], list[dict[str, Any]]]:
+    """Devis, lignes et sections (le détail et les sections sont lus en parallèle)."""
+    quote, sections = await gather_or_cancel(
+        quotes.get_quote(client, quote_id),
+        quotes.list_quote_invoice_line_sections(client, quote_id),
+    )
+    quote_lines = quote.get("invoice_lines")
+    if not isinstance(quote_lines, list):
+        # API v2 : le détail ne contient qu'un lien vers les lignes
+        quote_lines = []
+        async for items in PageIterator(client, f"quotes/{quote_id}/invoice_lines", report_progress=False):
+            quote_lines.extend(items)
+    return quote, quote_lines, sections.get("items", [])
+
+
+async def _convert(client: PennylaneClient, run: ConversionRun, summary: dict[str, Any], dry_run: bool) -> dict[str, Any]:
+    """Convertit un devis ; les erreurs sont consignées dans le résultat (étape en échec)."""
+    quote_id = summary["id"]
+    previous = run.quotes.get(quote_id, {})
+    outcome: dict[str, Any] = {"quote_id": quote_id, "quote_number": summary.get("quote_number"), "status": "converted"}
+    step = "get_quote"
+    try:
+        if summary.get("status") not in (None, "accepted"):
+            return {**outcome, "status": "skipped", "reason": f"quote status is {summary['status']}"}
+        invoice_id = previous.get("invoice_id")
+        if invoice_id is None:
+            quote, quote_lines, sections = await _quote_details(client, quote_id)
+            step = "create_customer_invoice"
+            options = run.options
+            issued = date_type.fromisoformat(options["date"]) if options.get("date") else date_type.today()
+            invoice = await invoices.create_customer_invoice(
+                client,
+                date=issued.isoformat(),
+                deadline=(issued + timedelta(days=options["payment_days"])).isoformat(),
+                draft=options["draft"],
+                dry_run=dry_run,
+                **_invoice_payload(quote, quote_lines, sections),
+            )
+            if dry_run:
+                return {**outcome, "status": "previewed", "preview": invoice["preview"]}
+            invoice_id = invoice.get("id")
+            outcome["invoice_number"] = invoice.get("invoice_number")
+            # Mémorisé avant le changement de statut : une reprise ne recrée pas la facture
+            run.quotes[quote_id] = {**outcome, "status": "failed", "step": "update_quote_status", "invoice_id": invoice_id}
+        outcome["invoice_id"] = invoice_id
+        step = "update_quote_status"
+        await quotes.update_quote_status(client, quote_id, "invoiced")
+        return outcome
+    except Exception as e:
+        return {**previous, **outcome, "status": "failed", "step": step, "error": str(e)}
+
+
+async def convert_quotes_to_invoices(
+    client: PennylaneClient,
+    filter_query: str | None = None,
+    max_quotes: int = 50,
+    concurrency: int = 4,
+    date: str | None = None,
+    payment_days: int = 30,
+    draft: bool = True,
+    dry_run: bool = False,
+    run_id: str | None = None,
+) -> dict[str, Any]:
+    """
+    Convertit des devis acceptés en factures clients.
+
+    Args:
+        filter_query: Filtres Pennylane sur les devis (par défaut : status:eq:accepted ajouté)
+        max_quotes: Nombre maximal de devis traités par appel
+        concurrency: Conversions simultanées (1-10)
+        date: Date des factures (YYYY-MM-DD, défaut : aujourd'hui)
+        payment_days: Délai de paiement en jours (échéance = date + payment_days)
+        draft: Factures créées en brouillon
+        dry_run: Contrôle les lignes et retourne l'aperçu des factures sans rien créer
+        run_id: Reprend une conversion précédente (mêmes paramètres, devis déjà convertis ignorés)
+    """
+    if run_id is not None:
+        run = _runs.get(run_id)
+        if run is None:
+            raise ValueError(f"Unknown or expired run_id: {run_id}")
+        dry_run = False
+    else:
+        run = ConversionRun(filter_query, {"date": date, "payment_days": payment_days, "draft": draft})
+    concurrency = max(1, min(concurrency, MAX_CONCURRENCY))
+
+    queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=concurrency * 2)
+    pages = PageIterator(client, "quotes", {"filter": _selection_filter(run.filter_query)}, report_progress=False)
+    outcomes: list[dict[str, Any]] = []
+    durations: list[float] = []
+    state = {"selected": 0, "exhausted": False, "stopped_at_deadline": False}
+
+    def out_of_time() -> bool:
+        left = deadlines.remaining()
+        if left is None:
+            return False
+        expected = sum(durations) / len(durations) if durations else 0.0
+        return left < expected + _DEADLINE_MARGIN
+
+    async def feed() -> None:
+        async for items in pages:
+            for summary in items:
+                if run.quotes.get(summary["id"], {}).get("status") in ("converted", "skipped"):
+                    continue
+                if state["selected"] >= max_quotes or state["stopped_at_deadline"]:
+                    return
+                state["selected"] += 1
+                await queue.put(summary)
+        state["exhausted"] = True
+
+    async def select() -> None:
+        await feed()
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (summary := await queue.get()) is not None:
+            if state["stopped_at_deadline"] or out_of_time():
+                state["stopped_at_deadline"] = True
+                continue
+            start = time.perf_counter()
+            outcome = await _convert(client, run, summary, dry_run)
+            durations.append(time.perf_counter() - start)
+            if not dry_run:
+                run.quotes[outcome["quote_id"]] = outcome
+            outcomes.append(outcome)
+            await progress.report(
+                len(outcomes), None if not state["exhausted"] else state["selected"],
+                f"{len(outcomes)} devis traité(s), {sum(o['status'] == 'failed' for o in outcomes)} en échec",
+            )
+
+    if not dry_run:
+        # Conservée dès le départ : reprise possible même si l'appel est interrompu
+        _remember(run)
+    await gather_or_cancel(select(), *(work() for _ in range(concurrency)))
+    await progress.report(len(outcomes), len(outcomes), f"{len(outcomes)} devis traité(s)", force=True)
+
+    statuses = [outcome["status"] for outcome in outcomes]
+    result: dict[str, Any] = {
+        "dry_run": dry_run,
+        "processed": len(outcomes),
+        "converted": statuses.count("converted"),
+        "failed": statuses.count("failed"),
+        "skipped": statuses.count("skipped"),
+        "outcomes": sorted(outcomes, key=lambda outcome: outcome["quote_id"]),
+        # Sélection épuisée, aucun devis en attente ni en échec
+        "complete": (
+            state["exhausted"] and not state["stopped_at_deadline"]
+            and len(outcomes) == state["selected"] and "failed" not in statuses
+        ),
+        "stopped_at_deadline": state["stopped_at_deadline"],
+    }
+    if dry_run:
+        result["previewed"] = statuses.count("previewed")
+    else:
+        result["run_id"] = run.run_id
+        result["run_totals"] = run.counts()
+    return result
@@ -0,0 +1,223 @@
+"""Outils de détection des doublons de clients et de fournisseurs.
+
+L'index de chaque ressource (voir `dedup.py`) est construit en parcourant la
+liste page par page, puis conservé pour `pennylane_find_duplicates`. Un parcours
+interrompu par l'échéance de l'outil reprend au point atteint lors de l'appel
+suivant. L'index est tenu à jour par les créations du serveur et par les
+webhooks, et reconstruit après `PENNYLANE_DEDUP_INDEX_TTL`.
+
+Le contrôle avant création de `pennylane_create_company_customer` et
+`pennylane_create_supplier` ne parcourt jamais la liste : il utilise l'index
+s'il est complet, sinon quelques recherches filtrées (SIREN, numéro de TVA,
+début du nom) lancées en parallèle. Il dispose de sa propre échéance, au plus
+un quart du temps restant de l'outil, pour que l'écriture garde son budget ;
+un contrôle inachevé laisse la création se faire (résultat `timeout`).
+
+Variables d'environnement :
+    PENNYLANE_DEDUP_CHECK: contrôle des doublons avant création (défaut 1 ; 0 désactive)
+    PENNYLANE_DEDUP_CHECK_TIMEOUT: durée maximale du contrôle avant création (secondes, défaut 5)
+    PENNYLANE_DEDUP_THRESHOLD: score à partir duquel deux tiers sont des doublons (défaut 0.85)
+    PENNYLANE_DEDUP_INDEX_TTL: durée de vie d'un index complet (secondes, défaut 3600)
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any
+
+from .. import deadlines, dedup, filters, metrics, progress, webhooks
+from ..client import PennylaneAPIError, PennylaneClient
+from ..pagination import PageIterator
+from ..tasks import gather_or_cancel
+
+logger = logging.getLogger(__name__)
+
+DEDUP_CHECK = os.getenv("PENNYLANE_DEDUP_CHECK", "1") not in ("0", "false", "no")
+DEDUP_THRESHOLD = float(os.getenv("PENNYLANE_DEDUP_THRESHOLD", "0.85"))
+DEDUP_INDEX_TTL = float(os.getenv("PENNYLANE_DEDUP_INDEX_TTL", "3600"))
+DEDUP_CHECK_TIMEOUT = float(os.getenv("PENNYLANE_DEDUP_CHECK_TIMEOUT", "5"))
+
+# Tiers lus par recherche filtrée du contrôle avant création
+_LOOKUP_LIMIT = 50
+
+RESOURCES = ("customers", "suppliers")
+
+DUPLICATE_CHECKS = metrics.register(metrics.Counter(
+    "pennylane_duplicate_checks_total", "Contrôles de doublons avant création, par résultat (clear, blocked, forced, timeout)", ("resource", "result")
+))
+
+
+class IndexState:
+    """Index d'une ressource et état de son parcours."""
+
+    def __init__(self, resource: str):
+        self.resource = resource
+        self.lock = asyncio.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.index = dedup.DuplicateIndex()
+        self.cursor: str | None = None
+        self.complete = False
+        self.built_at = 0.0
+
+    @property
+    def expired(self) -> bool:
+        return self.complete and time.monotonic() - self.built_at > DEDUP_INDEX_TTL
+
+
+_states: dict[str, IndexState] = {}
+
+
+def _state(resource: str) -> IndexState:
+    if resource not in RESOURCES:
+        raise ValueError(f"Unsupported resource: {resource}")
+    state = _states.get(resource)
+    if state is None:
+        state = _states[resource] = IndexState(resource)
+    return state
+
+
+async def load_index(client: PennylaneClient, resource: str, refresh: bool = False) -> IndexState:
+    """Construit (ou complète) l'index d'une ressource ; s'arrête avant l'échéance de l'outil."""
+    state = _state(resource)
+    async with state.lock:
+        if refresh or state.expired:
+            state.reset()
+        if state.complete:
+            return state
+        pages = PageIterator(client, resource, cursor=state.cursor, report_progress=False, partial_on_deadline=True)
+        async for items in pages:
+            state.index.extend(items)
+            state.cursor = pages.next_cursor
+            await progress.report(len(state.index), None, f"{resource}: {len(state.index)} tiers indexé(s)")
+        if pages.complete:
+            state.complete = True
+            state.built_at = time.monotonic()
+        return state
+
+
+@webhooks.subscribe
+def _apply_event(event: webhooks.Event) -> None:
+    """Répercute la création, la modification ou la suppression d'un tiers sur son index."""
+    state = _states.get(event.resource)
+    if state is None or event.record_id is None:
+        return
+    if event.action == "deleted":
+        state.index.remove(event.record_id)
+    elif event.data.get("name") or event.data.get("last_name"):
+        state.index.add({**event.data, "id": event.record_id})
+
+
+async def find_duplicates(
+    client: PennylaneClient,
+    resource: str = "customers",
+    threshold: float = DEDUP_THRESHOLD,
+    max_clusters: int = 100,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """
+    Recherche les grappes de doublons parmi les clients ou les fournisseurs.
+
+    Args:
+        resource: customers ou suppliers
+        threshold: Score minimal d'une paire de doublons (0 à 1)
+        max_clusters: Nombre maximal de grappes retournées (les plus probables d'abord)
+        refresh: Reconstruit l'index au lieu de réutiliser celui en mémoire
+    """
+    state = await load_index(client, resource, refresh)
+    found = state.index.clusters(threshold)
+    clusters = found["clusters"]
+    records = len(state.index)
+    await progress.report(records, records, f"{resource}: {len(clusters)} grappe(s) de doublons", force=True)
+    return {
+        "resource": resource,
+        "records_indexed": records,
+        # Index partiel : l'appel suivant reprend le parcours
+        "index_complete": state.complete,
+        "blocks": len(state.index.blocks),
+        "oversized_blocks": found["oversized_blocks"],
+        "pairs_compared": found["pairs_compared"],
+        "pairs_without_blocking": records * (records - 1) // 2,
+        "cluster_count": len(clusters),
+        "clusters": clusters[:max_clusters],
+    }
+
+
+def _lookup_conditions(candidate: dict[str, Any]) -> list[dict[str, Any]]:
+    """Conditions des recherches ciblées : identifiants forts et premier mot significatif du nom."""
+    conditions = []
+    for field in ("reg_no", "vat_number"):
+        if candidate.get(field):
+            conditions.append(filters.condition(field, "eq", candidate[field]))
+    # Sans forme juridique ni élision ("SAS L'Atelier Durand" -> "Atelier")
+    words = [word.rpartition("'")[2] for word in dedup.display_name(candidate).split()]
+    words = [word for word in words if dedup.normalize_name(word)]
+    if words:
+        conditions.append(filters.condition("name", "start_with", words[0]))
+    return conditions
+
+
+async def _lookup(client: PennylaneClient, resource: str, condition: dict[str, Any]) -> list[dict[str, Any]]:
+    try:
+        page = await client.get(resource, {"filter": filters.build([condition]), "limit": _LOOKUP_LIMIT})
+    except PennylaneAPIError as e:
+        # Champ non filtrable par l'API : la recherche est ignorée, les autres suffisent
+        logger.warning("Duplicate lookup on %s.%s failed: %s", resource, condition["field"], e)
+        return []
+    return page.get("items", [])
+
+
+async def _candidates(client: PennylaneClient, resource: str, candidate: dict[str, Any]) -> tuple[dedup.DuplicateIndex, str]:
+    """Index à consulter : l'index complet s'il existe, sinon celui des résultats des recherches ciblées."""
+    state = _states.get(resource)
+    if state is not None and state.complete and not state.expired:
+        return state.index, "index"
+    index = dedup.DuplicateIndex()
+    for items in await gather_or_cancel(*(_lookup(client, resource, c) for c in _lookup_conditions(candidate))):
+        index.extend(items)
+    return index, "lookups"
+
+
+async def check_before_create(
+    client: PennylaneClient,
+    resource: str,
+    candidate: dict[str, Any],
+    force: bool = False,
+) -> dict[str, Any] | None:
+    """Contrôle avant création : retourne le refus (doublons probables) ou None si la création peut avoir lieu."""
+    if not DEDUP_CHECK:
+        return None
+    if force:
+        DUPLICATE_CHECKS.inc(resource=resource, result="forced")
+        return None
+    # Échéance propre au contrôle : l'écriture qui suit garde l'essentiel du budget de l'outil
+    budget = DEDUP_CHECK_TIMEOUT
+    left = deadlines.remaining()
+    if left is not None:
+        budget = min(budget, left / 4)
+    try:
+        with deadlines.scope(budget):
+            index, source = await asyncio.wait_for(_candidates(client, resource, candidate), budget)
+    except (asyncio.TimeoutError, deadlines.DeadlineExceeded):
+        DUPLICATE_CHECKS.inc(resource=resource, result="timeout")
+        logger.warning("Duplicate check on %s skipped after %.1fs", resource, budget)
+        return None
+    matches = index.match(candidate, DEDUP_THRESHOLD)
+    if not matches:
+        DUPLICATE_CHECKS.inc(resource=resource, result="clear")
+        return None
+    DUPLICATE_CHECKS.inc(resource=resource, result="blocked")
+    return {
+        "created": False,
+        "error": "Possible duplicates found; pass force=true to create anyway",
+        "possible_duplicates": matches[:10],
+        "checked_against": source,
+    }
+
+
+def record_created(resource: str, record: Any) -> None:
+    """Ajoute un tiers créé par le serveur à l'index (si l'index existe et que l'API a retourné l'enregistrement)."""
+    state = _states.get(resource)
+    if state is not None and isinstance(record, dict) and record.get("id") is not None:
+        state.index.add(record)
@@ -0,0 +1,412 @@
+"""Outil de prévision de trésorerie.
+
+La prévision part du solde actuel de chaque compte bancaire et y ajoute, jour
+par jour, les échéances des factures ouvertes (clients en entrée, fournisseurs
+en sortie) et les flux récurrents détectés dans l'historique des transactions.
+
+Le calcul est incrémental d'un appel à l'autre :
+- les flux journaliers sont tenus comme des contributions par enregistrement
+  (`FlowLedger`) : seuls les jours dont une contribution a changé sont
+  modifiés, et les cumuls ne sont recalculés qu'à partir du premier jour touché ;
+- l'historique des transactions n'est relu que depuis la dernière
+  synchronisation (avec un recouvrement de quelques jours), et la détection des
+  flux récurrents n'est refaite que pour les libellés ayant reçu des données.
+  L'historique conservé couvre exactement la fenêtre du dernier appel
+  ([`synced_from`, `synced_until`]) : il est relu en entier si la fenêtre
+  demandée commence plus tôt, et les transactions postérieures à la date de
+  départ n'entrent jamais dans la détection.
+"""
+import re
+from datetime import date, timedelta
+from statistics import median
+from typing import Any, Hashable
+
+from .. import amounts, filters, progress, webhooks
+from ..client import PennylaneClient
+from ..pagination import PageIterator
+from ..tasks import gather_or_cancel
+
+# Transactions relues à chaque synchronisation (écritures tardives)
+TRANSACTION_OVERLAP_DAYS = 7
+# Nombre minimal de mois distincts pour qu'un libellé soit considéré récurrent
+RECURRING_MIN_MONTHS = 3
+# Écarts tolérés autour de la médiane (jour du mois, montant relatif)
+RECURRING_DAY_TOLERANCE = 5
+RECURRING_AMOUNT_TOLERANCE = 0.2
+
+_DIGITS = re.compile(r"[\d/.-]+")
+_SPACES = re.compile(r"\s+")
+
+
+def _label_key(label: str | None) -> str:
+    """Normalise un libellé bancaire (références et dates retirées)."""
+    return _SPACES.sub(" ", _DIGITS.sub(" ", (label or "").upper())).strip()
+
+
+class FlowLedger:
+    """Flux nets par (compte, jour), tenus comme des contributions par enregistrement."""
+
+    def __init__(self):
+        self.inflows: dict[tuple[Any, date], int] = {}
+        self.outflows: dict[tuple[Any, date], int] = {}
+        self._contributions: dict[str, dict[Hashable, tuple[Any, date, int]]] = {}
+        # Cumuls par compte : (premier jour, cumul des flux nets jusqu'à chaque jour inclus)
+        self._cumulative: dict[Any, tuple[date, list[int]]] = {}
+        self._dirty_from: dict[Any, date] = {}
+        self.recomputed_days = 0
+
+    def _apply(self, account: Any, day: date, cents: int, sign: int) -> None:
+        target = self.inflows if cents >= 0 else self.outflows
+        key = (account, day)
+        target[key] = target.get(key, 0) + sign * cents
+        if day < self._dirty_from.get(account, date.max):
+            self._dirty_from[account] = day
+
+    def sync(self, source: str, contributions: dict[Hashable, tuple[Any, date, int]]) -> int:
+        """Remplace l'instantané d'une source ; seuls les jours dont la contribution change sont touchés."""
+        previous = self._contributions.get(source, {})
+        changed = 0
+        for key, old in previous.items():
+            if contributions.get(key) != old:
+                self._apply(*old, sign=-1)
+                changed += 1
+        for key, new in contributions.items():
+            if previous.get(key) != new:
+                self._apply(*new, sign=1)
+                changed += 1
+        self._contributions[source] = contributions
+        return changed
+
+    def cumulative(self, account: Any, start: date, end: date) -> list[int]:
+        """Cumul des flux nets de `start` à chaque jour jusqu'à `end` (recalculé depuis le premier jour modifié)."""
+        days = (end - start).days + 1
+        cached = self._cumulative.get(account)
+        if cached and cached[0] == start and len(cached[1]) == days:
+            values = cached[1]
+            dirty = self._dirty_from.get(account)
+            first = days if dirty is None else min(days, max(0, (dirty - start).days))
+        else:
+            values = [0] * days
+            first = 0
+        running = values[first - 1] if first > 0 else 0
+        for offset in range(first, days):
+            key = (account, start + timedelta(days=offset))
+            running += self.inflows.get(key, 0) + self.outflows.get(key, 0)
+            values[offset] = running
+        self.recomputed_days += days - first
+        self._cumulative[account] = (start, values)
+        self._dirty_from.pop(account, None)
+        return values
+
+
+class RecurringDetector:
+    """Historique des transactions par (compte, libellé) et flux mensuels récurrents détectés."""
+
+    def __init__(self):
+        self.transactions: dict[Any, tuple[Any, str, date, int]] = {}
+        self.by_label: dict[tuple[Any, str], set[Any]] = {}
+        self.patterns: dict[tuple[Any, str], dict[str, Any]] = {}
+        # Fenêtre d'historique conservée (bornes incluses)
+        self.synced_from: date | None = None
+        self.synced_until: date | None = None
+
+    def add(self, transaction: dict[str, Any]) -> tuple[Any, str] | None:
+        """Enregistre une transaction (éventuellement partielle) ; retourne le libellé touché (None si inchangée)."""
+        previous = self.transactions.get(transaction["id"])
+        if previous is None and "date" not in transaction:
+            return None
+        account, label, day, cents = previous or (None, "", None, 0)
+        record = (
+            (transaction["bank_account"] or {}).get("id") if "bank_account" in transaction else account,
+            _label_key(transaction["label"]) if "label" in transaction else label,
+            date.fromisoformat(transaction["date"]) if "date" in transaction else day,
+            amounts.to_cents(transaction["amount"]) if "amount" in transaction else cents,
+        )
+        if previous == record:
+            return None
+        if previous:
+            self.by_label.get(previous[:2], set()).discard(transaction["id"])
+        self.transactions[transaction["id"]] = record
+        self.by_label.setdefault(record[:2], set()).add(transaction["id"])
+        return record[:2]
+
+    def remove(self, transaction_id: Any) -> tuple[Any, str] | None:
+        """Oublie une transaction supprimée ; retourne le libellé touché."""
+        record = self.transactions.pop(transaction_id, None)
+        if record is None:
+            return None
+        self.by_label.get(record[:2], set()).discard(transaction_id)
+        return record[:2]
+
+    def prune(self, oldest: date, newest: date) -> set[tuple[Any, str]]:
+        """Oublie les transactions hors de la fenêtre d'historique [oldest, newest]."""
+        touched = set()
+        for transaction_id, record in list(self.transactions.items()):
+            if not oldest <= record[2] <= newest:
+                del self.transactions[transaction_id]
+                self.by_label[record[:2]].discard(transaction_id)
+                touched.add(record[:2])
+        return touched
+
+    def detect(self, labels: set[tuple[Any, str]]) -> None:
+        """Recalcule les flux récurrents des seuls libellés touchés."""
+        for label in labels:
+            records = [self.transactions[i] for i in self.by_label.get(label, ())]
+            pattern = self._monthly_pattern(records)
+            if pattern:
+                self.patterns[label] = pattern
+            else:
+                self.patterns.pop(label, None)
+
+    @staticmethod
+    def _monthly_pattern(records: list[tuple[Any, str, date, int]]) -> dict[str, Any] | None:
+        months = {(r[2].year, r[2].month) for r in records}
+        if not records or not records[0][1] or len(months) < RECURRING_MIN_MONTHS:
+            return None
+        amount = int(median(r[3] for r in records))
+        day = int(median(r[2].day for r in records))
+        consistent = [
+            r for r in records
+            if abs(r[2].day - day) <= RECURRING_DAY_TOLERANCE
+            and abs(r[3] - amount) <= abs(amount) * RECURRING_AMOUNT_TOLERANCE
+        ]
+        if amount == 0 or len(consistent) < 0.75 * len(records):
+            return None
+        return {"amount": amount, "day_of_month": day, "months_observed": len(months), "last_seen": max(r[2] for r in records)}
+
+
+class ForecastState:
+    """État conservé entre deux prévisions pour un même compte Pennylane."""
+
+    def __init__(self):
+        self.ledger = FlowLedger()
+        self.recurring = RecurringDetector()
+
+
+_states: dict[str, ForecastState] = {}
+
+
+@webhooks.subscribe
+def _apply_event(event: webhooks.Event) -> None:
+    """Applique une transaction créée, modifiée ou supprimée à l'historique conservé."""
+    if event.resource != "transactions" or event.record_id is None:
+        return
+    for state in _states.values():
+        detector = state.recurring
+        if event.action == "deleted":
+            label = detector.remove(event.record_id)
+        else:
+            label = detector.add({**event.data, "id": event.record_id})
+        if label:
+            detector.detect({label})
+
+
+def _month_occurrences(pattern: dict[str, Any], start: date, end: date) -> list[date]:
+    """Dates des prochaines occurrences mensuelles dans ]start, end]."""
+    occurrences = []
+    year, month = start.year, start.month
+    while True:
+        first = date(year, month, 1)
+        if first > end:
+            return occurrences
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        day = first.replace(day=min(pattern["day_of_month"], (next_month - timedelta(days=1)).day))
+        # Occurrence du mois déjà passée sur le compte : pas de doublon
+        already_seen = (pattern["last_seen"].year, pattern["last_seen"].month) == (year, month)
+        if start < day <= end and not already_seen:
+            occurrences.append(day)
+        year, month = next_month.year, next_month.month
+
+
+async def _collect(client: PennylaneClient, endpoint: str, conditions: list[dict[str, Any]], **params: Any) -> list[dict[str, Any]]:
+    pages = PageIterator(client, endpoint, {"filter": filters.build(conditions), **params}, report_progress=False)
+    items: list[dict[str, Any]] = []
+    async for page_items in pages:
+        items.extend(page_items)
+        await progress.report(len(items), None, f"{endpoint}: {pages.pages} page(s)")
+    return items
+
+
+async def cash_forecast(
+    client: PennylaneClient,
+    horizon_days: int = 90,
+    granularity: str = "day",
+    bank_account_id: int | None = None,
+    invoice_account_id: int | None = None,
+    history_days: int = 180,
+    include_overdue: bool = False,
+    as_of: str | None = None
+) -> dict[str, Any]:
+    """
+    Prévision de trésorerie par compte bancaire.
+
+    Args:
+        horizon_days: Nombre de jours projetés
+        granularity: "day" ou "week" (solde en fin de semaine)
+        bank_account_id: Limiter la série à un compte bancaire
+        invoice_account_id: Compte crédité/débité par les factures (défaut: premier compte)
+        history_days: Profondeur de l'historique de transactions analysé
+        include_overdue: Compter les factures échues comme encaissées/payées aujourd'hui
+        as_of: Date de départ (YYYY-MM-DD, défaut: aujourd'hui)
+    """
+    if granularity not in ("day", "week"):
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    start = date.fromisoformat(as_of) if as_of else date.today()
+    end = start + timedelta(days=horizon_days)
+    state = _states.setdefault(client.base_url, ForecastState())
+    detector = state.recurring
+
+    history_start = start - timedelta(days=history_days)
+    since = history_start
+    if detector.synced_from is not None and detector.synced_from <= history_start:
+        # Historique déjà couvert jusqu'à synced_until : seules les transactions récentes sont relues
+        since = max(history_start, detector.synced_until - timedelta(days=TRANSACTION_OVERLAP_DAYS))
+    history = [filters.condition("date", "gteq", since.isoformat()), filters.condition("date", "lteq", start.isoformat())]
+
+    # Filtre sur la date d'émission (une facture est émise au plus tard à son échéance) :
+    # un filtre sur l'échéance écarterait les factures sans échéance, triées ci-dessous
+    open_invoice = [
+        filters.condition("paid", "eq", False),
+        filters.condition("draft", "eq", False),
+        filters.condition("date", "lteq", end.isoformat()),
+    ]
+    accounts, receivables, payables, transactions = await gather_or_cancel(
+        _collect(client, "bank_accounts", []),
+        _collect(client, "customer_invoices", open_invoice),
+        _collect(client, "supplier_invoices", open_invoice),
+        _collect(client, "transactions", history),
+    )
+    if not accounts:
+        raise ValueError("No bank account found")
+
+    # Historique : seules les transactions nouvelles ou modifiées touchent des libellés
+    touched = detector.prune(history_start, start)
+    for transaction in transactions:
+        label = detector.add(transaction)
+        if label:
+            touched.add(label)
+    detector.detect(touched)
+    detector.synced_from, detector.synced_until = history_start, start
+
+    accounts_by_id = {account["id"]: account for account in accounts}
+    invoice_account = invoice_account_id or min(accounts_by_id)
+    invoice_currency = accounts_by_id[invoice_account].get("currency") or amounts.DEFAULT_CURRENCY
+    skipped_currency = 0
+    undated = 0
+
+    def in_horizon(invoice: dict[str, Any]) -> bool:
+        deadline = invoice.get("deadline")
+        if not deadline:
+            return True
+        return deadline <= end.isoformat() and (include_overdue or deadline >= start.isoformat())
+
+    receivables = [invoice for invoice in receivables if in_horizon(invoice)]
+    payables = [invoice for invoice in payables if in_horizon(invoice)]
+
+    def invoice_flows(invoices: list[dict[str, Any]], sign: int) -> dict[Hashable, tuple[Any, date, int]]:
+        nonlocal skipped_currency, undated
+        flows = {}
+        remaining = amounts.parse_column(invoices, "remaining_amount")
+        for invoice, cents in zip(invoices, remaining):
+            if not cents:
+                continue
+            if (invoice.get("currency") or amounts.DEFAULT_CURRENCY) != invoice_currency:
+                skipped_currency += 1
+                continue
+            undated += not invoice.get("deadline")
+            due = max(start, date.fromisoformat(invoice.get("deadline") or start.isoformat()))
+            flows[invoice["id"]] = (invoice_account, due, sign * cents)
+        return flows
+
+    ledger = state.ledger
+    changed = ledger.sync("receivables", invoice_flows(receivables, 1))
+    changed += ledger.sync("payables", invoice_flows(payables, -1))
+    recurring_flows = {}
+    for (account, label), pattern in detector.patterns.items():
+        if account in accounts_by_id:
+            for day in _month_occurrences(pattern, start, end):
+                recurring_flows[(account, label, day)] = (account, day, pattern["amount"])
+    changed += ledger.sync("recurring", recurring_flows)
+
+    selected = [bank_account_id] if bank_account_id is not None else sorted(accounts_by_id)
+    if bank_account_id is not None and bank_account_id not in accounts_by_id:
+        raise ValueError(f"Unknown bank account: {bank_account_id}")
+    recomputed_before = ledger.recomputed_days
+    horizon = [start + timedelta(days=offset) for offset in range(horizon_days + 1)]
+    balances = [0] * len(horizon)
+    inflows = [0] * len(horizon)
+    outflows = [0] * len(horizon)
+    account_summaries = []
+    for account_id in selected:
+        opening = amounts.to_cents(accounts_by_id[account_id].get("balance"))
+        cumulative = ledger.cumulative(account_id, start, end)
+        series = [opening + value for value in cumulative]
+        lowest = min(range(len(series)), key=series.__getitem__)
+        account_summaries.append({
+            "bank_account_id": account_id,
+            "name": accounts_by_id[account_id].get("name"),
+            "opening_balance": amounts.format_cents(opening),
+            "closing_balance": amounts.format_cents(series[-1]),
+            "lowest_balance": amounts.format_cents(series[lowest]),
+            "lowest_balance_date": horizon[lowest].isoformat(),
+        })
+        for offset, day in enumerate(horizon):
+            balances[offset] += series[offset]
+            inflows[offset] += ledger.inflows.get((account_id, day), 0)
+            outflows[offset] += ledger.outflows.get((account_id, day), 0)
+
+    points = []
+    for offset, day in enumerate(horizon):
+        # Hebdomadaire : flux cumulés de la semaine, solde du dimanche (ou du dernier jour)
+        if granularity == "week" and points and day.weekday() != 0:
+            point = points[-1]
+            point["inflows"] += inflows[offset]
+            point["outflows"] += outflows[offset]
+            point["balance"] = balances[offset]
+            continue
+        points.append({"date": day.isoformat(), "inflows": inflows[offset], "outflows": outflows[offset], "balance": balances[offset]})
+
+    assumptions = [f"Factures affectées au compte bancaire {invoice_account}."]
+    if include_overdue:
+        assumptions.append("Factures échues comptées comme encaissées/payées à la date de départ.")
+    else:
+        assumptions.append("Factures échues non incluses.")
+    if undated:
+        assumptions.append(f"{undated} facture(s) sans échéance comptée(s) à la date de départ.")
+    if skipped_currency:
+        assumptions.append(f"{skipped_currency} facture(s) dans une autre devise que {invoice_currency} ignorée(s).")
+
+    return {
+        "as_of": start.isoformat(),
+        "horizon_days": horizon_days,
+        "granularity": granularity,
+        "currency": invoice_currency,
+        "accounts": account_summaries,
+        "series": [
+            {
+                "date": point["date"],
+                "inflows": amounts.format_cents(point["inflows"]),
+                "outflows": amounts.format_cents(point["outflows"]),
+                "balance": amounts.format_cents(point["balance"]),
+            }
+            for point in points
+        ],
+        "recurring": [
+            {
+                "bank_account_id": account,
+                "label": label,
+                "amount": amounts.format_cents(pattern["amount"]),
+                "day_of_month": pattern["day_of_month"],
+                "months_observed": pattern["months_observed"],
+            }
+            for (account, label), pattern in sorted(detector.patterns.items(), key=lambda entry: str(entry[0]))
+        ],
+        "open_invoices": {"receivables": len(receivables), "payables": len(payables)},
+        "assumptions": assumptions,
+        "incremental": {
+            "transactions_fetched": len(transactions),
+            "transactions_since": since.isoformat(),
+            "changed_contributions": changed,
+            "recomputed_days": ledger.recomputed_days - recomputed_before,
+        },
+    }
@@ -1,5 +1,6 @@
 """Outils pour la gestion des factures."""
 from typing import Any
+from .. import lines
 from ..client import PennylaneClient
 
 
@@ -34,6 +35,7 @@ async def create_customer_invoice(
     draft: bool = True,
     currency: str = "EUR",
     language: str = "fr_FR",
+    dry_run: bool = False,
     **kwargs
 ) -> dict[str, Any]:
     """
@@ -53,9 +55,16 @@ async def create_customer_invoice(
         draft: OBLIGATOIRE - True = brouillon modifiable, False = facture finalisée
         currency: Devise (EUR, USD, etc.)
         language: Langue (fr_FR, en_GB, de_DE)
+        dry_run: Contrôle les lignes et retourne l'aperçu des totaux sans créer la facture
         **kwargs: Paramètres optionnels (pdf_invoice_subject, pdf_description, 
                  special_mention, external_reference, discount, etc.)
+    
+    Les lignes sont contrôlées localement avant l'envoi (`lines.preflight`) ;
+    l'aperçu des totaux HT/TVA/TTC est joint au résultat (`preview`).
     """
+    preview = lines.preflight(invoice_lines, currency, kwargs.get("discount"))
+    if dry_run:
+        return {"dry_run": True, "preview": preview}
     data = {
         "customer_id": customer_id,
         "date": date,
@@ -66,7 +75,7 @@ async def create_customer_invoice(
         "language": language,
         **kwargs
     }
-    return await client.post("customer_invoices", data)
+    return lines.attach_preview(await client.post("customer_invoices", data), preview)
 
 
 async def finalize_customer_invoice(client: PennylaneClient, invoice_id: int) -> dict[str, Any]:
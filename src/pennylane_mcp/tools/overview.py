@@ -0,0 +1,133 @@
+"""Vue d'ensemble d'un client (« client 360 ») en un seul appel d'outil.
+
+Fiche client, factures ouvertes, derniers documents et comportement de
+paiement sont lus en parallèle : la durée de l'outil est celle de la lecture la
+plus longue, et non la somme des appels qu'il remplace. Le délai de paiement
+est mesuré sur les dernières factures payées à partir de leurs transactions
+rapprochées, lues dès que la liste des factures payées est connue.
+"""
+from datetime import date
+from typing import Any
+
+from .. import amounts, filters
+from ..client import PennylaneClient
+from ..pagination import PageIterator
+from ..tasks import gather_or_cancel
+from . import customers
+
+# Champs conservés dans la réponse compacte
+CUSTOMER_FIELDS = (
+    "id", "name", "customer_type", "emails", "phone", "vat_number", "reg_no",
+    "payment_conditions", "billing_language", "billing_address", "external_reference",
+)
+INVOICE_FIELDS = ("id", "invoice_number", "label", "date", "deadline", "currency", "amount", "remaining_amount", "status", "paid")
+QUOTE_FIELDS = ("id", "quote_number", "label", "date", "deadline", "currency", "amount", "status")
+TRANSACTION_FIELDS = ("id", "label", "date", "currency", "amount")
+
+
+def _compact(record: dict[str, Any], fields: tuple[str, ...]) -> dict[str, Any]:
+    return {field: record[field] for field in fields if record.get(field) is not None}
+
+
+def _days(start: str | None, end: str | None) -> int | None:
+    if not start or not end:
+        return None
+    return (date.fromisoformat(end[:10]) - date.fromisoformat(start[:10])).days
+
+
+async def _first_page(client: PennylaneClient, endpoint: str, filter_query: str, limit: int) -> list[dict[str, Any]]:
+    if limit <= 0:
+        return []
+    page = await client.get(endpoint, {"filter": filter_query, "limit": limit, "sort": "-id"})
+    return page.get("items", [])
+
+
+async def _outstanding(client: PennylaneClient, customer_filter: dict[str, Any], as_of: date) -> dict[str, Any]:
+    """Encours : factures finalisées non payées, total et part échue par devise."""
+    table = amounts.AmountTable(fields=("remaining_amount",))
+    deadlines: list[str] = []
+    query = filters.build([
+        customer_filter, filters.condition("paid", "eq", False), filters.condition("draft", "eq", False),
+    ])
+    async for items in PageIterator(client, "customer_invoices", {"filter": query}, report_progress=False):
+        table.extend(items)
+        deadlines.extend(item.get("deadline") or item.get("date") or "" for item in items)
+    overdue_mask = [bool(deadline) and deadline[:10] < as_of.isoformat() for deadline in deadlines]
+    overdue_totals = amounts.group_sum(
+        [currency for currency, keep in zip(table.currencies, overdue_mask) if keep],
+        table.select("remaining_amount", overdue_mask),
+    )
+    return {
+        "total": amounts.format_totals(table.total("remaining_amount")),
+        "overdue": amounts.format_totals(overdue_totals),
+        "open_invoices": table.size,
+        "overdue_invoices": sum(overdue_mask),
+        "oldest_deadline": min(filter(None, deadlines), default=None),
+    }
+
+
+async def _payments(client: PennylaneClient, customer_filter: dict[str, Any], sample: int) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """Délai de paiement moyen des dernières factures payées et derniers paiements rapprochés."""
+    paid = await _first_page(
+        client, "customer_invoices", filters.build([customer_filter, filters.condition("paid", "eq", True)]), sample
+    )
+    matched = await gather_or_cancel(*(
+        client.get(f"customer_invoices/{invoice['id']}/matched_transactions") for invoice in paid
+    ))
+    days_to_pay: list[int] = []
+    days_late: list[int] = []
+    payments: list[dict[str, Any]] = []
+    for invoice, page in zip(paid, matched):
+        transactions = page.get("items", [])
+        payments.extend(transactions)
+        # Paiement complet : date de la dernière transaction rapprochée
+        paid_on = max((t["date"] for t in transactions if t.get("date")), default=None)
+        delay = _days(invoice.get("date"), paid_on)
+        if delay is None:
+            continue
+        days_to_pay.append(delay)
+        late = _days(invoice.get("deadline"), paid_on)
+        days_late.append(max(0, late) if late is not None else 0)
+    behaviour = {
+        "sample_size": len(days_to_pay),
+        "average_days_to_pay": round(sum(days_to_pay) / len(days_to_pay), 1) if days_to_pay else None,
+        "average_days_late": round(sum(days_late) / len(days_late), 1) if days_late else None,
+        "on_time_ratio": round(days_late.count(0) / len(days_late), 2) if days_late else None,
+    }
+    payments.sort(key=lambda transaction: transaction.get("date") or "", reverse=True)
+    return behaviour, payments
+
+
+async def customer_overview(
+    client: PennylaneClient,
+    customer_id: int,
+    last: int = 5,
+    payment_sample: int = 10,
+) -> dict[str, Any]:
+    """
+    Vue d'ensemble d'un client : fiche, encours, délai de paiement et derniers documents.
+
+    Args:
+        customer_id: ID du client
+        last: Nombre de documents récents retournés (factures, devis, paiements)
+        payment_sample: Nombre de factures payées récentes utilisées pour le délai de paiement
+    """
+    as_of = date.today()
+    customer_filter = filters.condition("customer_id", "eq", customer_id)
+    scoped = filters.build([customer_filter])
+    customer, outstanding, (behaviour, payments), invoices, quotes = await gather_or_cancel(
+        customers.get_customer(client, customer_id),
+        _outstanding(client, customer_filter, as_of),
+        _payments(client, customer_filter, payment_sample),
+        _first_page(client, "customer_invoices", scoped, last),
+        _first_page(client, "quotes", scoped, last),
+    )
+    return {
+        "customer": _compact(customer, CUSTOMER_FIELDS),
+        "as_of": as_of.isoformat(),
+        "outstanding": outstanding,
+        "payment_behaviour": behaviour,
+        "recent_invoices": [_compact(invoice, INVOICE_FIELDS) for invoice in invoices],
+        "recent_quotes": [_compact(quote, QUOTE_FIELDS) for quote in quotes],
+        "recent_payments": [_compact(payment, TRANSACTION_FIELDS) for payment in payments[:last]],
+    }
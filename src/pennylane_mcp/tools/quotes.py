@@ -1,5 +1,6 @@
 """Outils pour la gestion des devis."""
 from typing import Any
+from .. import lines
 from ..client import PennylaneClient
 
 
@@ -62,6 +63,7 @@ async def create_quote(
     deadline: str,
     currency: str = "EUR",
     language: str = "fr_FR",
+    dry_run: bool = False,
     **kwargs
 ) -> dict[str, Any]:
     """
@@ -74,8 +76,12 @@ async def create_quote(
         deadline: Date limite (YYYY-MM-DD)
         currency: Devise (EUR, USD, etc.)
         language: Langue (fr_FR, en_GB, de_DE)
+        dry_run: Contrôle les lignes et retourne l'aperçu des totaux sans créer le devis
         **kwargs: Autres paramètres (discount, invoice_line_sections, quote_template_id, etc.)
     """
+    preview = lines.preflight(invoice_lines, currency, kwargs.get("discount"))
+    if dry_run:
+        return {"dry_run": True, "preview": preview}
     data = {
         "customer_id": customer_id,
         "invoice_lines": invoice_lines,
@@ -85,12 +91,13 @@ async def create_quote(
         "language": language,
         **kwargs
     }
-    return await client.post("quotes", data)
+    return lines.attach_preview(await client.post("quotes", data), preview)
 
 
 async def update_quote(
     client: PennylaneClient,
     quote_id: int,
+    dry_run: bool = False,
     **kwargs
 ) -> dict[str, Any]:
     """
@@ -98,9 +105,21 @@ async def update_quote(
     
     Args:
         quote_id: ID du devis
+        dry_run: Contrôle les lignes ajoutées/modifiées et retourne l'aperçu des totaux sans modifier le devis
         **kwargs: Champs à mettre à jour (customer_id, deadline, invoice_lines, etc.)
     """
-    return await client.put(f"quotes/{quote_id}", kwargs)
+    # Lignes : {"create": [...], "update": [...], ...} ; aperçu des totaux des lignes ajoutées
+    changes = kwargs.get("invoice_lines")
+    if not isinstance(changes, dict) or not (changes.get("create") or changes.get("update")):
+        if dry_run:
+            raise ValueError("dry_run requires invoice_lines.create or invoice_lines.update")
+        return await client.put(f"quotes/{quote_id}", kwargs)
+    lines.check_updates(changes.get("update"))
+    preview = lines.preflight(changes["create"], kwargs.get("currency", "EUR")) if changes.get("create") else None
+    result = {"dry_run": True} if dry_run else await client.put(f"quotes/{quote_id}", kwargs)
+    if preview is None:
+        return result
+    return {**result, "added_lines_preview": preview}
 
 
 async def update_quote_status(
@@ -0,0 +1,188 @@
+"""Outils de rapports financiers : balances âgées clients et fournisseurs."""
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, timedelta
+from itertools import compress, repeat
+from operator import sub
+from typing import Any
+
+from .. import amounts, filters, progress
+from ..client import PennylaneClient
+from ..pagination import PageIterator
+from ..tasks import gather_or_cancel
+
+AGING_BUCKETS = ("current", "1-30", "31-60", "61-90", "90+")
+# Jours de retard maximaux de chaque tranche (hors "90+")
+_BUCKET_BOUNDS = (0, 30, 60, 90)
+# Fenêtres de date d'émission parcourues en parallèle (jours avant la date de
+# référence) : une par tranche, la plus ancienne étant subdivisée car c'est
+# souvent la plus fournie (la durée du rapport est celle de la fenêtre la plus
+# longue à parcourir). Le découpage porte sur la date d'émission, toujours
+# renseignée, et non sur l'échéance, souvent vide (factures fournisseurs
+# importées) : une fenêtre d'échéance écarterait ces factures.
+_PARTITION_BOUNDS = (0, 30, 60, 90, 120, 150, 180, 270, 365)
+
+
+def _date_windows(as_of: date, deadline_to: date | None) -> list[tuple[date | None, date | None]]:
+    """Fenêtres de date d'émission disjointes [début, fin[ couvrant toutes les factures."""
+    edges: list[date | None] = [None] + [as_of - timedelta(days=bound) for bound in _PARTITION_BOUNDS] + [None]
+    # Une facture est émise au plus tard à son échéance : rien à lire après `deadline_to`
+    upper = deadline_to + timedelta(days=1) if deadline_to else None
+    windows = []
+    # edges décroissants : (None, as_of), (as_of, as_of - 30), ...
+    for high, low in zip(edges, edges[1:]):
+        if upper and (high is None or high > upper):
+            high = upper
+        if low and high and low >= high:
+            continue
+        windows.append((low, high))
+    return windows
+
+
+def _bucket_indexes(deadlines: list[str], as_of: date) -> list[int]:
+    """Index de tranche de chaque échéance, en une passe (jours de retard -> tranche)."""
+    ordinals = map(date.toordinal, map(date.fromisoformat, deadlines))
+    days_overdue = map(sub, repeat(as_of.toordinal()), ordinals)
+    return list(map(bisect_left, repeat(_BUCKET_BOUNDS), days_overdue))
+
+
+def _bucket_row(cents: list[int]) -> dict[str, str]:
+    row = {bucket: amounts.format_cents(value) for bucket, value in zip(AGING_BUCKETS, cents)}
+    row["total"] = amounts.format_cents(sum(cents))
+    return row
+
+
+async def _aged_balance(
+    client: PennylaneClient,
+    endpoint: str,
+    counterparty: str,
+    as_of: str | None,
+    counterparty_id: int | None,
+    deadline_from: str | None,
+    deadline_to: str | None,
+    filter_query: str | None,
+    top: int | None,
+) -> dict[str, Any]:
+    as_of_date = date.fromisoformat(as_of) if as_of else date.today()
+    base = [filters.condition("paid", "eq", False), filters.condition("draft", "eq", False)]
+    if counterparty_id is not None:
+        base.append(filters.condition(f"{counterparty}_id", "eq", counterparty_id))
+    if deadline_from:
+        base.append(filters.condition("deadline", "gteq", deadline_from))
+    if deadline_to:
+        base.append(filters.condition("deadline", "lteq", deadline_to))
+
+    # Colonnes compactes : seuls les champs utiles des factures ouvertes sont conservés
+    table = amounts.AmountTable(fields=("remaining_amount",))
+    deadlines: list[str] = []
+    undated: list[bool] = []
+    counterparty_ids: list[Any] = []
+    crawls: list[PageIterator] = []
+
+    async def crawl(low: date | None, high: date | None) -> None:
+        conditions = list(base)
+        if low:
+            conditions.append(filters.condition("date", "gteq", low.isoformat()))
+        if high:
+            conditions.append(filters.condition("date", "lt", high.isoformat()))
+        pages = PageIterator(
+            client, endpoint, {"filter": filters.merge(filter_query, *conditions)}, report_progress=False
+        )
+        crawls.append(pages)
+        async for items in pages:
+            table.extend(items)
+            # Sans échéance, la facture est classée selon sa date d'émission
+            undated.extend(not item.get("deadline") for item in items)
+            deadlines.extend(item.get("deadline") or item.get("date") or as_of_date.isoformat() for item in items)
+            counterparty_ids.extend((item.get(counterparty) or {}).get("id") for item in items)
+            await progress.report(
+                len(deadlines), None,
+                f"{endpoint}: {sum(c.pages for c in crawls)} page(s), {len(deadlines)} facture(s) ouverte(s)",
+            )
+
+    windows = _date_windows(as_of_date, date.fromisoformat(deadline_to) if deadline_to else None)
+    await gather_or_cancel(*(crawl(low, high) for low, high in windows))
+
+    # Tranches : une passe sur toutes les factures, factures soldées écartées
+    remaining = table.columns["remaining_amount"]
+    open_mask = list(map(bool, remaining))
+    values = list(compress(remaining, open_mask))
+    currencies = list(compress(table.currencies, open_mask))
+    buckets = _bucket_indexes(list(compress(deadlines, open_mask)), as_of_date)
+    ids = list(compress(counterparty_ids, open_mask))
+
+    totals: dict[str, list[int]] = {}
+    for (currency, bucket), cents in amounts.group_sum(list(zip(currencies, buckets)), values).items():
+        totals.setdefault(currency, [0] * len(AGING_BUCKETS))[bucket] = cents
+
+    per_counterparty: dict[tuple[str, Any], list[int]] = {}
+    for (currency, key, bucket), cents in amounts.group_sum(list(zip(currencies, ids, buckets)), values).items():
+        per_counterparty.setdefault((currency, key), [0] * len(AGING_BUCKETS))[bucket] = cents
+    invoice_counts = Counter(zip(currencies, ids))
+    ranked = sorted(per_counterparty.items(), key=lambda entry: sum(entry[1]), reverse=True)
+
+    await progress.report(len(deadlines), len(deadlines), f"{endpoint}: {len(values)} facture(s) ouverte(s)", force=True)
+    return {
+        "as_of": as_of_date.isoformat(),
+        "buckets": list(AGING_BUCKETS),
+        "totals": {currency: _bucket_row(cents) for currency, cents in totals.items()},
+        "counterparties": [
+            {f"{counterparty}_id": key, "currency": currency, "invoice_count": invoice_counts[(currency, key)], **_bucket_row(cents)}
+            for (currency, key), cents in (ranked[:top] if top else ranked)
+        ],
+        "counterparty_count": len(ranked),
+        "invoice_count": len(values),
+        # Factures ouvertes sans échéance, classées selon leur date d'émission
+        "undated_invoice_count": sum(compress(undated, open_mask)),
+        "pages_fetched": sum(c.pages for c in crawls),
+    }
+
+
+async def aged_receivables(
+    client: PennylaneClient,
+    as_of: str | None = None,
+    customer_id: int | None = None,
+    deadline_from: str | None = None,
+    deadline_to: str | None = None,
+    filter_query: str | None = None,
+    top: int | None = 100
+) -> dict[str, Any]:
+    """
+    Balance âgée clients : montants restant dus par tranche de retard.
+
+    Args:
+        as_of: Date de référence (YYYY-MM-DD, défaut: aujourd'hui)
+        customer_id: Limiter à un client
+        deadline_from: Échéance minimale (YYYY-MM-DD ; exclut les factures sans échéance)
+        deadline_to: Échéance maximale (YYYY-MM-DD ; exclut les factures sans échéance)
+        filter_query: Filtres Pennylane supplémentaires
+        top: Nombre de clients retournés (les plus gros encours d'abord)
+    """
+    return await _aged_balance(
+        client, "customer_invoices", "customer", as_of, customer_id, deadline_from, deadline_to, filter_query, top
+    )
+
+
+async def aged_payables(
+    client: PennylaneClient,
+    as_of: str | None = None,
+    supplier_id: int | None = None,
+    deadline_from: str | None = None,
+    deadline_to: str | None = None,
+    filter_query: str | None = None,
+    top: int | None = 100
+) -> dict[str, Any]:
+    """
+    Balance âgée fournisseurs : montants restant à payer par tranche de retard.
+
+    Args:
+        as_of: Date de référence (YYYY-MM-DD, défaut: aujourd'hui)
+        supplier_id: Limiter à un fournisseur
+        deadline_from: Échéance minimale (YYYY-MM-DD ; exclut les factures sans échéance)
+        deadline_to: Échéance maximale (YYYY-MM-DD ; exclut les factures sans échéance)
+        filter_query: Filtres Pennylane supplémentaires
+        top: Nombre de fournisseurs retournés (les plus gros encours d'abord)
+    """
+    return await _aged_balance(
+        client, "supplier_invoices", "supplier", as_of, supplier_id, deadline_from, deadline_to, filter_query, top
+    )
@@ -0,0 +1,270 @@
+"""Traçage des appels (spans), de l'appel d'outil MCP jusqu'à la requête HTTP.
+
+Chaque span porte un `trace_id` partagé par toute la chaîne d'un appel d'outil,
+propagé via `contextvars` (donc à travers les tâches asyncio filles). Les spans
+échantillonnés sont exportés par lots vers un fichier JSONL ou un collecteur
+OTLP/HTTP (encodage JSON).
+
+Variables d'environnement :
+    PENNYLANE_TRACE_FILE: chemin du fichier JSONL de sortie
+    PENNYLANE_OTLP_ENDPOINT: URL du collecteur OTLP (ex: http://localhost:4318)
+    PENNYLANE_TRACE_SAMPLE_RATE: proportion des traces exportées (0-1, défaut 1)
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar["Span | None"] = ContextVar("pennylane_current_span", default=None)
+
+_sample_rate = 1.0
+_exporter: "BatchExporter | None" = None
+
+
+class Span:
+    """Intervalle de temps nommé au sein d'une trace."""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "attributes",
+        "start_ns", "end_ns", "_start", "duration", "error", "sampled",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, sampled: bool, attributes: dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def current_span() -> Span | None:
+    """Retourne le span actif dans le contexte courant."""
+    return _current_span.get()
+
+
+def current_trace_id() -> str | None:
+    """Retourne l'identifiant de la trace active, s'il y en a une."""
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Ouvre un span enfant du span courant (ou une nouvelle trace)."""
+    parent = _current_span.get()
+    if parent is None:
+        trace_id = secrets.token_hex(16)
+        sampled = _exporter is not None and random.random() < _sample_rate
+    else:
+        trace_id = parent.trace_id
+        sampled = parent.sampled
+    current = Span(name, trace_id, parent.span_id if parent else None, sampled, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        if current.sampled and _exporter is not None:
+            _exporter.export(current)
+
+
+class TraceIdFilter(logging.Filter):
+    """Ajoute `trace_id` et `span_id` aux enregistrements de log."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        active = _current_span.get()
+        record.trace_id = active.trace_id if active else "-"
+        record.span_id = active.span_id if active else "-"
+        return True
+
+
+def install_log_filter(logger_: logging.Logger | None = None) -> None:
+    """Installe `TraceIdFilter` sur les handlers du logger (racine par défaut)."""
+    for handler in (logger_ or logging.getLogger()).handlers:
+        if not any(isinstance(f, TraceIdFilter) for f in handler.filters):
+            handler.addFilter(TraceIdFilter())
+
+
+# ==================== EXPORT ====================
+class BatchExporter:
+    """Accumule les spans terminés et les exporte périodiquement par lots."""
+
+    def __init__(self, interval: float = 2.0, max_batch: int = 512, max_queue: int = 10000):
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.pending: list[Span] = []
+        self.dropped = 0
+        self._task: asyncio.Task | None = None
+
+    def export(self, finished: Span) -> None:
+        if len(self.pending) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.pending.append(finished)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self.pending:
+            batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            try:
+                await self.send(batch)
+            except Exception as e:
+                logger.warning(f"Span export failed ({len(batch)} spans dropped): {e}")
+
+    async def send(self, batch: list[Span]) -> None:
+        raise NotImplementedError
+
+    async def shutdown(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+
+class JsonlExporter(BatchExporter):
+    """Écrit les spans dans un fichier JSONL (une ligne par span)."""
+
+    def __init__(self, path: str, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def _write(self, lines: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def send(self, batch: list[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in batch)
+        await asyncio.to_thread(self._write, lines)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpExporter(BatchExporter):
+    """Envoie les spans à un collecteur OTLP/HTTP (`/v1/traces`, encodage JSON)."""
+
+    def __init__(self, endpoint: str, service_name: str = "pennylane-mcp", **kwargs: Any):
+        super().__init__(**kwargs)
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith("/v1/traces") else f"{endpoint}/v1/traces"
+        self.service_name = service_name
+        self._client = None
+
+    def _encode(self, s: Span) -> dict[str, Any]:
+        encoded = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            encoded["parentSpanId"] = s.parent_id
+        return encoded
+
+    async def send(self, batch: list[Span]) -> None:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "pennylane_mcp"}, "spans": [self._encode(s) for s in batch]}],
+            }]
+        }
+        response = await self._client.post(self.url, json=payload)
+        response.raise_for_status()
+
+    async def shutdown(self) -> None:
+        await super().shutdown()
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def configure(exporter: BatchExporter | None, sample_rate: float = 1.0) -> None:
+    """Installe l'exportateur de spans et le taux d'échantillonnage."""
+    global _exporter, _sample_rate
+    _exporter = exporter
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+
+
+def configure_from_env() -> BatchExporter | None:
+    """Configure le traçage depuis les variables d'environnement et démarre l'export."""
+    exporter: BatchExporter | None = None
+    otlp_endpoint = os.getenv("PENNYLANE_OTLP_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    trace_file = os.getenv("PENNYLANE_TRACE_FILE")
+    if otlp_endpoint:
+        exporter = OtlpExporter(otlp_endpoint)
+    elif trace_file:
+        exporter = JsonlExporter(trace_file)
+    configure(exporter, float(os.getenv("PENNYLANE_TRACE_SAMPLE_RATE", "1.0")))
+    if exporter:
+        exporter.start()
+        logger.info(f"Tracing enabled ({type(exporter).__name__}, sample rate {_sample_rate})")
+    return exporter
+
+
+async def shutdown() -> None:
+    """Exporte les spans restants et arrête l'exportateur."""
+    if _exporter is not None:
+        await _exporter.shutdown()
@@ -0,0 +1,164 @@
+"""Validation des arguments des outils avant tout appel à l'API Pennylane.
+
+Chaque `inputSchema` du manifeste est compilé une seule fois, à l'import du
+module, en une fonction de validation (fermetures spécialisées par propriété),
+sans interprétation du schéma à chaque appel. Un nom d'outil inconnu n'a pas
+de validateur et ne laisse aucune trace. Les arguments invalides sont rejetés avec la liste
+précise des erreurs, sans consommer de requête ni de quota de l'API.
+
+Sous-ensemble de JSON Schema pris en charge (celui du manifeste) : `type`,
+`required`, `properties`, `items`, `enum`, `minimum` et `maximum`. Les
+propriétés non déclarées sont acceptées (transmises telles quelles à l'API) et
+`null` vaut absence pour une propriété facultative.
+"""
+from typing import Any, Callable
+
+from .manifest import TOOL_DEFINITIONS
+
+Check = Callable[[Any, str, list[str]], None]
+
+_JSON_TYPES = {
+    bool: "boolean",
+    int: "integer",
+    float: "number",
+    str: "string",
+    list: "array",
+    dict: "object",
+    type(None): "null",
+}
+
+
+class ArgumentError(ValueError):
+    """Arguments d'outil non conformes à son `inputSchema`."""
+
+    def __init__(self, tool: str, errors: list[str]):
+        super().__init__(f"Invalid arguments for {tool}: " + "; ".join(errors))
+        self.tool = tool
+        self.errors = errors
+
+
+class _Stop(Exception):
+    """Interrompt la validation d'une valeur dont le type est incorrect."""
+
+
+def _describe(value: Any) -> str:
+    if value is None:
+        return "null"
+    text = repr(value)
+    if len(text) > 40:
+        text = text[:37] + "..."
+    return f"{_JSON_TYPES.get(type(value), type(value).__name__)} {text}"
+
+
+def _type_check(expected: str) -> Callable[[Any], bool]:
+    if expected == "integer":
+        return lambda v: (type(v) is int) or (type(v) is float and v.is_integer())
+    if expected == "number":
+        return lambda v: type(v) is int or type(v) is float
+    if expected == "string":
+        return lambda v: type(v) is str
+    if expected == "boolean":
+        return lambda v: type(v) is bool
+    if expected == "array":
+        return lambda v: type(v) is list
+    if expected == "object":
+        return lambda v: type(v) is dict
+    raise ValueError(f"Unsupported schema type: {expected}")
+
+
+def _compile(schema: dict[str, Any]) -> Check:
+    """Compile un (sous-)schéma en fonction `check(valeur, chemin, erreurs)`."""
+    steps: list[Check] = []
+
+    expected = schema.get("type")
+    if expected:
+        is_valid = _type_check(expected)
+
+        def check_type(value: Any, path: str, errors: list[str]) -> None:
+            if not is_valid(value):
+                errors.append(f"{path or 'arguments'}: expected {expected}, got {_describe(value)}")
+                raise _Stop
+        steps.append(check_type)
+
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+        listed = ", ".join(map(str, schema["enum"]))
+
+        def check_enum(value: Any, path: str, errors: list[str]) -> None:
+            if value not in allowed:
+                errors.append(f"{path}: must be one of {listed}, got {value!r}")
+        steps.append(check_enum)
+
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value: Any, path: str, errors: list[str]) -> None:
+            if minimum is not None and value < minimum:
+                errors.append(f"{path}: must be >= {minimum}, got {value!r}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path}: must be <= {maximum}, got {value!r}")
+        steps.append(check_range)
+
+    if "items" in schema:
+        check_item = _compile(schema["items"])
+
+        def check_items(value: list[Any], path: str, errors: list[str]) -> None:
+            for index, item in enumerate(value):
+                check_item(item, f"{path}[{index}]", errors)
+        steps.append(check_items)
+
+    if "properties" in schema or "required" in schema:
+        required = tuple(schema.get("required", ()))
+        properties = tuple((name, _compile(sub)) for name, sub in schema.get("properties", {}).items())
+
+        def check_object(value: dict[str, Any], path: str, errors: list[str]) -> None:
+            prefix = f"{path}." if path else ""
+            for name in required:
+                if value.get(name) is None:
+                    errors.append(f"{prefix}{name}: required")
+            for name, check in properties:
+                item = value.get(name)
+                if item is not None:
+                    check(item, prefix + name, errors)
+        steps.append(check_object)
+
+    def check(value: Any, path: str, errors: list[str]) -> None:
+        try:
+            for step in steps:
+                step(value, path, errors)
+        except _Stop:
+            # Type incorrect : les contraintes suivantes n'ont pas de sens
+            pass
+
+    return check
+
+
+def compile_schema(schema: dict[str, Any]) -> Callable[[dict[str, Any]], list[str]]:
+    """Compile un `inputSchema` ; la fonction retournée liste les erreurs des arguments."""
+    check = _compile(schema)
+
+    def validate(arguments: dict[str, Any]) -> list[str]:
+        errors: list[str] = []
+        check(arguments, "", errors)
+        return errors
+
+    return validate
+
+
+_VALIDATORS: dict[str, Callable[[dict[str, Any]], list[str]]] = {
+    definition["name"]: compile_schema(definition["inputSchema"]) for definition in TOOL_DEFINITIONS
+}
+
+
+def validator_for(tool: str) -> Callable[[dict[str, Any]], list[str]] | None:
+    """Validateur compilé d'un outil (None pour un outil inconnu)."""
+    return _VALIDATORS.get(tool)
+
+
+def validate(tool: str, arguments: Any) -> None:
+    """Vérifie les arguments d'un outil (lève `ArgumentError` avec toutes les erreurs)."""
+    validator = validator_for(tool)
+    if validator is None:
+        return
+    errors = validator(arguments)
+    if errors:
+        raise ArgumentError(tool, errors)
@@ -0,0 +1,179 @@
+"""Préchargement du cache des réponses au démarrage.
+
+Une tâche de fond lancée à côté du serveur MCP lit des jeux de données avec les
+mêmes paramètres que les outils : les premiers appels de session sont servis
+par le cache. Par défaut, seules les données de référence (catégories, plan
+comptable, comptes bancaires) sont préchargées, et seulement avec un cache
+persistant ou partagé (`PENNYLANE_DISK_CACHE`, `PENNYLANE_REDIS_URL`) : en
+mémoire seule, une session stdio ou un worker paierait ces requêtes à chaque
+démarrage, pour des réponses souvent expirées avant le premier appel. En mode
+multi-processus, seul le premier worker précharge le cache disque commun.
+
+Le préchargement est de basse priorité : une requête à la fois, une pause entre
+deux requêtes, et attente tant que des appels d'outils sont en cours. Son état
+(`snapshot`) est exposé par `/ready` et `pennylane_server_stats` ; il est
+« prêt » une fois tous les jeux de données traités, même en cas d'échec de
+certains (le serveur répond alors sans cache pour ceux-ci).
+
+Variables d'environnement :
+    PENNYLANE_WARMUP: jeux de données préchargés, séparés par des virgules (défaut : données de référence
+        avec un cache persistant ou partagé, rien sinon ; "none" désactive)
+    PENNYLANE_WARMUP_PAUSE: pause entre deux requêtes de préchargement (secondes, défaut 0.2)
+    PENNYLANE_WARMUP_INTERVAL: relance périodique du préchargement (secondes, défaut 0 : au démarrage seulement)
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator
+
+from . import backends, metrics, tools
+from .client import PennylaneClient
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PAUSE = float(os.getenv("PENNYLANE_WARMUP_PAUSE", "0.2"))
+WARMUP_INTERVAL = float(os.getenv("PENNYLANE_WARMUP_INTERVAL", "0"))
+
+# Jeux de données préchargés, appelés avec les paramètres par défaut des outils
+DATASETS: dict[str, Callable[[PennylaneClient], Awaitable[Any]]] = {
+    "categories": lambda client: tools.accounting.list_categories(client),
+    "ledger_accounts": lambda client: tools.accounting.list_ledger_accounts(client),
+    "bank_accounts": lambda client: tools.accounting.list_bank_accounts(client),
+    "customer_invoices": lambda client: tools.invoices.list_customer_invoices(client),
+    "transactions": lambda client: tools.transactions.list_transactions(client),
+}
+
+# Attente maximale des appels d'outils en cours avant une requête de préchargement
+_MAX_YIELD = 5.0
+
+WARMUP_READY = metrics.register(metrics.Gauge(
+    "pennylane_warmup_ready", "Préchargement du cache terminé (1) ou en cours (0)"
+))
+
+
+def _selected(persistent: bool) -> list[str]:
+    raw = os.getenv("PENNYLANE_WARMUP")
+    if raw is None:
+        return [name for name in DATASETS if name in backends.REFERENCE_RESOURCES] if persistent else []
+    raw = raw.strip()
+    if raw.lower() in ("", "0", "none", "false", "no"):
+        return []
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in DATASETS]
+    if unknown:
+        raise ValueError(f"Unknown PENNYLANE_WARMUP dataset(s): {', '.join(unknown)}")
+    return names
+
+
+class Warmup:
+    """Tâche de préchargement et état de préparation du serveur."""
+
+    def __init__(self, datasets: list[str], pause: float = WARMUP_PAUSE, interval: float = WARMUP_INTERVAL):
+        self.datasets = datasets
+        self.pause = pause
+        self.interval = interval
+        self.status = "pending"
+        self.loaded: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.ready = asyncio.Event()
+        self.active_calls = 0
+        self._task: asyncio.Task | None = None
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """Signale un appel d'outil en cours (le préchargement lui cède la place)."""
+        self.active_calls += 1
+        try:
+            yield
+        finally:
+            self.active_calls -= 1
+
+    async def _yield_to_tools(self) -> None:
+        waited = 0.0
+        while self.active_calls and waited < _MAX_YIELD:
+            await asyncio.sleep(0.05)
+            waited += 0.05
+
+    async def run_once(self, client: PennylaneClient) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+        for name in self.datasets:
+            await self._yield_to_tools()
+            start = time.perf_counter()
+            try:
+                await DATASETS[name](client)
+                self.loaded[name] = round(time.perf_counter() - start, 3)
+                self.errors.pop(name, None)
+            except Exception as e:
+                self.errors[name] = str(e)
+                logger.warning(f"Warm-up of {name} failed: {e}")
+            await asyncio.sleep(self.pause)
+        self.finished_at = time.time()
+        self.status = "degraded" if self.errors else "ready"
+        self.ready.set()
+        WARMUP_READY.set(1)
+        logger.info(f"Warm-up {self.status}: {len(self.loaded)}/{len(self.datasets)} dataset(s) in {self.finished_at - self.started_at:.1f}s")
+
+    async def run(self, client: PennylaneClient) -> None:
+        await self.run_once(client)
+        while self.interval > 0:
+            await asyncio.sleep(self.interval)
+            await self.run_once(client)
+
+    def start(self, client: PennylaneClient) -> None:
+        if not self.datasets:
+            self.status = "ready"
+            self.ready.set()
+            WARMUP_READY.set(1)
+            return
+        self._task = asyncio.create_task(self.run(client))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready.is_set(),
+            "datasets": self.datasets,
+            "loaded_seconds": dict(self.loaded),
+            "errors": dict(self.errors),
+        }
+
+
+warmup: Warmup | None = None
+
+
+def configure_from_env(persistent: bool = False, primary: bool = True) -> Warmup:
+    """Prépare le préchargement selon `PENNYLANE_WARMUP`.
+
+    `persistent` : le cache a un niveau disque ou partagé ; `primary` : processus
+    chargé du préchargement (les autres workers lisent le cache disque commun).
+    """
+    global warmup
+    if warmup is None:
+        warmup = Warmup(_selected(persistent) if primary else [])
+    return warmup
+
+
+def snapshot() -> dict[str, Any]:
+    """État de préparation (prêt d'office sans préchargement configuré)."""
+    if warmup is None:
+        return {"status": "ready", "ready": True, "datasets": []}
+    return warmup.snapshot()
+
+
+@contextmanager
+def foreground() -> Iterator[None]:
+    if warmup is None:
+        yield
+        return
+    with warmup.foreground():
+        yield
@@ -0,0 +1,102 @@
+"""Application HTTP du serveur MCP : transport MCP (`/mcp`), métriques Prometheus, état de préparation et webhooks."""
+import contextlib
+import json
+import logging
+from typing import Any
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from . import metrics, warmup, webhooks
+
+logger = logging.getLogger(__name__)
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Expose les métriques au format texte Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def ready_endpoint(request: Request) -> JSONResponse:
+    """État de préparation : 200 une fois le préchargement du cache terminé, 503 avant."""
+    state = warmup.snapshot()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+async def webhook_endpoint(request: Request) -> JSONResponse:
+    """Reçoit les notifications de modification Pennylane (un événement ou une liste)."""
+    if not webhooks.WEBHOOK_SECRET:
+        return JSONResponse({"error": "Webhooks disabled"}, status_code=404)
+    body = await request.body()
+    try:
+        webhooks.verify(
+            webhooks.WEBHOOK_SECRET,
+            body,
+            request.headers.get(webhooks.SIGNATURE_HEADER),
+            request.headers.get(webhooks.TIMESTAMP_HEADER),
+        )
+    except webhooks.WebhookError as e:
+        logger.warning(f"Webhook rejected: {e}")
+        return JSONResponse({"error": str(e)}, status_code=401)
+    try:
+        payload = json.loads(body)
+        events = [webhooks.parse_event(item) for item in (payload if isinstance(payload, list) else [payload])]
+    except (ValueError, AttributeError, webhooks.WebhookError) as e:
+        return JSONResponse({"error": f"Invalid event: {e}"}, status_code=400)
+    applied = 0
+    for event in events:
+        if await webhooks.dispatch(event):
+            applied += 1
+    return JSONResponse({"received": len(events), "applied": applied})
+
+
+class _MCPEndpoint:
+    """Application ASGI déléguant au gestionnaire de sessions MCP (Streamable HTTP)."""
+
+    def __init__(self, session_manager: Any):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_app(mcp_server: Any = None, stateless: bool = False) -> Starlette:
+    """Construit l'application HTTP ; avec `mcp_server`, sert aussi le transport MCP sur `/mcp`.
+
+    `stateless` : sessions MCP sans état, pour plusieurs workers servant le même port.
+    """
+    routes = [
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+        Route("/ready", ready_endpoint, methods=["GET"]),
+        Route("/webhooks/pennylane", webhook_endpoint, methods=["POST"]),
+    ]
+    if mcp_server is not None:
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+
+        session_manager = StreamableHTTPSessionManager(app=mcp_server, stateless=stateless)
+        routes.append(Route("/mcp", _MCPEndpoint(session_manager)))
+
+        @contextlib.asynccontextmanager
+        async def _session_lifespan(app: Starlette):
+            async with session_manager.run():
+                yield
+
+    return Starlette(routes=routes, lifespan=_session_lifespan if mcp_server is not None else None)
+
+
+def create_server(app: Starlette, host: str, port: int):
+    """Crée un serveur uvicorn sans configuration de logs propre (aucune écriture sur stdout)."""
+    import uvicorn
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_config=None,
+        access_log=False,
+        lifespan="auto" if app.router.lifespan_context else "off",
+    )
+    logger.info(f"HTTP endpoints listening on {host}:{port}")
+    return uvicorn.Server(config)
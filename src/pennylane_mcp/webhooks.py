@@ -0,0 +1,144 @@
+"""Réception des notifications de modification (webhooks) Pennylane.
+
+Chaque événement est authentifié (HMAC-SHA256 du corps, horodaté), dédoublonné
+puis transmis aux abonnés (`subscribe`) : le cache des réponses GET du client
+(invalidation ciblée ou mise à jour en place) et les états conservés par les
+outils (historique de la prévision de trésorerie, ...). Les données locales
+restent ainsi à jour sans interroger l'API.
+
+Format attendu :
+    POST /webhooks/pennylane
+    X-Pennylane-Timestamp: <secondes epoch>
+    X-Pennylane-Signature: sha256=<hex HMAC-SHA256(secret, "<timestamp>." + corps)>
+
+    {"id": "evt_...", "event": "customer_invoice.updated", "data": {"id": 42, ...}}
+
+Variables d'environnement :
+    PENNYLANE_WEBHOOK_SECRET: secret partagé (le endpoint est désactivé sans secret)
+    PENNYLANE_WEBHOOK_TOLERANCE: écart maximal toléré sur l'horodatage (secondes, défaut 300)
+"""
+import hashlib
+import hmac
+import inspect
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_SECRET = os.getenv("PENNYLANE_WEBHOOK_SECRET")
+WEBHOOK_TOLERANCE = float(os.getenv("PENNYLANE_WEBHOOK_TOLERANCE", "300"))
+SIGNATURE_HEADER = "x-pennylane-signature"
+TIMESTAMP_HEADER = "x-pennylane-timestamp"
+
+# Objet de l'événement -> ressource de l'API
+RESOURCES = {
+    "customer_invoice": "customer_invoices",
+    "supplier_invoice": "supplier_invoices",
+    "customer": "customers",
+    "supplier": "suppliers",
+    "quote": "quotes",
+    "transaction": "transactions",
+    "product": "products",
+    "category": "categories",
+    "bank_account": "bank_accounts",
+    "ledger_account": "ledger_accounts",
+}
+ACTIONS = frozenset({"created", "updated", "deleted"})
+
+WEBHOOK_EVENTS = metrics.register(metrics.Counter(
+    "pennylane_webhook_events_total", "Événements webhook reçus", ("resource", "action", "result")
+))
+
+_DEDUP_SIZE = 10_000
+
+
+class WebhookError(Exception):
+    """Notification rejetée (signature, horodatage ou contenu invalide)."""
+
+
+@dataclass
+class Event:
+    """Modification d'un enregistrement Pennylane."""
+
+    resource: str
+    action: str
+    record_id: int | None
+    data: dict[str, Any] = field(default_factory=dict)
+    event_id: str | None = None
+
+
+Listener = Callable[[Event], Any]
+_listeners: list[Listener] = []
+_seen: OrderedDict[str, None] = OrderedDict()
+
+
+def subscribe(listener: Listener) -> Listener:
+    """Abonne une fonction aux événements (retourne la fonction, utilisable en décorateur)."""
+    _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener: Listener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def sign(secret: str, body: bytes, timestamp: int) -> str:
+    """Calcule l'en-tête de signature d'un corps de requête."""
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify(secret: str, body: bytes, signature: str | None, timestamp: str | None, now: float | None = None) -> None:
+    """Vérifie la signature et la fraîcheur d'une notification (lève `WebhookError`)."""
+    if not signature or not timestamp:
+        raise WebhookError("Missing signature headers")
+    try:
+        sent_at = int(timestamp)
+    except ValueError:
+        raise WebhookError("Invalid timestamp")
+    if abs((now or time.time()) - sent_at) > WEBHOOK_TOLERANCE:
+        raise WebhookError("Timestamp outside tolerance")
+    if not hmac.compare_digest(sign(secret, body, sent_at), signature):
+        raise WebhookError("Invalid signature")
+
+
+def parse_event(payload: dict[str, Any]) -> Event:
+    """Construit un `Event` depuis le corps JSON d'une notification."""
+    name = payload.get("event") or payload.get("type") or ""
+    obj, _, action = name.rpartition(".")
+    if obj not in RESOURCES or action not in ACTIONS:
+        raise WebhookError(f"Unsupported event: {name}")
+    data = payload.get("data") or {}
+    if not isinstance(data, dict):
+        raise WebhookError("Invalid event data")
+    record_id = data.get("id")
+    return Event(RESOURCES[obj], action, int(record_id) if record_id is not None else None, data, payload.get("id"))
+
+
+async def dispatch(event: Event) -> int:
+    """Transmet un événement aux abonnés (fonctions ou coroutines) ; retourne le nombre d'abonnés notifiés (0 si doublon)."""
+    if event.event_id:
+        if event.event_id in _seen:
+            WEBHOOK_EVENTS.inc(resource=event.resource, action=event.action, result="duplicate")
+            return 0
+        _seen[event.event_id] = None
+        if len(_seen) > _DEDUP_SIZE:
+            _seen.popitem(last=False)
+    notified = 0
+    for listener in list(_listeners):
+        try:
+            result = listener(event)
+            if inspect.isawaitable(result):
+                await result
+            notified += 1
+        except Exception as e:
+            logger.error(f"Webhook listener failed for {event.resource}.{event.action}: {e}", exc_info=True)
+    WEBHOOK_EVENTS.inc(resource=event.resource, action=event.action, result="applied")
+    return notified
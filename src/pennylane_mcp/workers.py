@@ -0,0 +1,128 @@
+"""Mode multi-processus du transport HTTP (workers pré-forkés).
+
+Un seul processus asyncio plafonne à un cœur (décodage et sérialisation JSON
+des gros agrégats). Avec `PENNYLANE_WORKERS=N`, le processus parent ouvre le
+port d'écoute puis crée N workers par `fork` : chacun sert le transport MCP sur
+le même socket (le noyau répartit les connexions) et le parent relance un
+worker qui s'arrête de façon inattendue.
+
+L'état qui doit rester global est partagé par des fichiers locaux d'un
+répertoire commun (`shared_path`) :
+- le budget de débit de l'API (`backends.FileRateLimiter`, seau à jetons
+  verrouillé par `flock`) ;
+- le second niveau du cache des réponses (`diskcache.DiskCache`, SQLite WAL,
+  taille totale tenue dans la base), si `PENNYLANE_DISK_CACHE` n'est pas défini.
+
+Les sessions MCP sont sans état en mode multi-processus (chaque requête peut
+arriver sur n'importe quel worker). Le cache mémoire, les métriques et les
+index (doublons, historique de trésorerie) restent propres à chaque worker ;
+seul le premier worker vide la file durable des créations.
+
+Variables d'environnement :
+    PENNYLANE_WORKERS: nombre de workers HTTP (défaut 1 : un seul processus, sans fork)
+"""
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Any, Callable
+
+from . import logs
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("PENNYLANE_WORKERS", "1"))
+
+# Délai avant de relancer un worker arrêté (évite une boucle de redémarrages rapides)
+_RESTART_DELAY = 1.0
+
+# Répertoire des fichiers partagés et rang du worker courant (hérités au fork)
+shared_dir: str | None = None
+worker_index = 0
+worker_count = 1
+
+
+def enabled() -> bool:
+    return worker_count > 1
+
+
+def is_primary() -> bool:
+    """Premier worker (ou processus unique) : tâches qui ne doivent tourner qu'une fois."""
+    return worker_index == 0
+
+
+def shared_path(name: str) -> str | None:
+    """Chemin d'un fichier partagé par les workers, ou None hors mode multi-processus."""
+    return os.path.join(shared_dir, name) if shared_dir else None
+
+
+def snapshot() -> dict[str, Any]:
+    return {"worker": worker_index, "workers": worker_count, "pid": os.getpid()}
+
+
+def prefork(target: Callable[[socket.socket], None], host: str, port: int, count: int = WORKERS) -> None:
+    """Ouvre le port puis lance et supervise `count` workers exécutant `target(sock)`."""
+    global shared_dir, worker_count
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    shared_dir = tempfile.mkdtemp(prefix="pennylane-mcp-")
+    worker_count = count
+    children: dict[int, int] = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        global worker_index
+        pid = os.fork()
+        if pid:
+            children[pid] = index
+            return
+        # Worker : gestionnaires de signaux par défaut (uvicorn installe les siens)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        worker_index = index
+        code = 0
+        try:
+            target(sock)
+        except BaseException:
+            logger.exception(f"Worker {index} crashed")
+            code = 1
+        finally:
+            # `os._exit` ne passe pas par atexit : logs en attente écrits avant de quitter
+            logs.shutdown()
+            logging.shutdown()
+            os._exit(code)
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    logger.info(f"Starting {count} HTTP workers on {host}:{port} (shared state in {shared_dir})")
+    for index in range(count):
+        spawn(index)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = children.pop(pid, None)
+            if index is None or stopping:
+                continue
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+            time.sleep(_RESTART_DELAY)
+            if not stopping:
+                spawn(index)
+    finally:
+        sock.close()
+        shutil.rmtree(shared_dir, ignore_errors=True)
+        logger.info("All workers stopped")
@@ -0,0 +1,282 @@
+"""File d'attente durable des créations (factures clients, transactions, fournisseurs).
+
+Activée avec `PENNYLANE_WRITE_QUEUE`, la file conserve chaque POST dans une base
+SQLite locale avant de l'envoyer : l'outil retourne immédiatement un ticket
+(`pennylane_get_write_ticket` pour suivre son état) et un worker vide la file au
+débit soutenable par l'API, avec nouvelles tentatives sur 429/5xx/erreur réseau.
+
+Chaque écriture porte une clé d'idempotence : celle fournie par l'appelant,
+une clé dérivée du contenu si l'appelant demande la déduplication
+(`deduplicate`), sinon une clé aléatoire (deux créations identiques restent
+deux écritures, ex. deux factures mensuelles identiques à un même client) :
+- une même clé soumise à nouveau retourne le ticket existant, sans second POST ;
+- la clé est envoyée dans l'en-tête `Idempotency-Key` à chaque tentative.
+
+La documentation de l'API Pennylane ne garantit pas la prise en compte de
+`Idempotency-Key` : l'en-tête n'évite un doublon que si l'API l'honore. Une
+tentative qui échoue après l'envoi du POST (expiration, erreur réseau, 5xx)
+est rejouée ; si le POST avait abouti côté Pennylane et que l'en-tête est
+ignoré, le rejeu crée un doublon. L'erreur de la tentative précédente reste
+visible dans le ticket (`error`, `attempts`) pour vérification.
+
+Les écritures en cours survivent aux redémarrages : celles interrompues pendant
+leur envoi sont remises en file au démarrage suivant. En mode multi-processus
+(`workers.py`), tous les workers enregistrent dans la même base et seul le
+premier la vide.
+
+Variables d'environnement :
+    PENNYLANE_WRITE_QUEUE: chemin de la base SQLite (file désactivée si absent)
+    PENNYLANE_WRITE_RATE: écritures par seconde envoyées à l'API (défaut 4)
+    PENNYLANE_WRITE_MAX_ATTEMPTS: tentatives avant échec définitif (défaut 8)
+    PENNYLANE_WRITE_RETENTION: conservation des tickets terminés (secondes, défaut 7 jours)
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import secrets
+import sqlite3
+import time
+from typing import Any
+
+import httpx
+
+from . import metrics
+from .breaker import CircuitOpenError
+from .client import PennylaneAPIError, PennylaneClient
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = os.getenv("PENNYLANE_WRITE_QUEUE")
+WRITE_RATE = float(os.getenv("PENNYLANE_WRITE_RATE", "4"))
+MAX_ATTEMPTS = int(os.getenv("PENNYLANE_WRITE_MAX_ATTEMPTS", "8"))
+RETENTION = float(os.getenv("PENNYLANE_WRITE_RETENTION", str(7 * 24 * 3600)))
+
+# Délai maximal entre deux tentatives (secondes)
+_MAX_BACKOFF = 300.0
+# Relecture de la base quand la file est vide (écritures enregistrées par d'autres processus)
+_IDLE_POLL = 1.0
+
+QUEUE_DEPTH = metrics.register(metrics.Gauge(
+    "pennylane_write_queue_depth", "Écritures en attente dans la file durable"
+))
+QUEUE_WRITES = metrics.register(metrics.Counter(
+    "pennylane_write_queue_total", "Écritures traitées par la file durable", ("endpoint", "result")
+))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    ticket TEXT PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    endpoint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS writes_pending ON writes (status, next_attempt_at);
+"""
+
+
+def idempotency_key(endpoint: str, data: dict[str, Any] | None) -> str:
+    """Clé dérivée du contenu (déduplication demandée) : deux soumissions identiques ne créent qu'un enregistrement."""
+    body = json.dumps(data or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{endpoint.strip('/')}\n{body}".encode()).hexdigest()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, PennylaneAPIError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (httpx.TransportError, CircuitOpenError))
+
+
+class WriteQueue:
+    """File SQLite des POST à envoyer, vidée par un worker à débit limité."""
+
+    def __init__(self, path: str, rate: float = WRITE_RATE, max_attempts: int = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.bucket = TokenBucket(rate)
+        # Transactions locales de quelques dizaines de µs : accès synchrone
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _recover(self) -> None:
+        """Remet en file les envois interrompus et purge les tickets terminés trop anciens."""
+        now = time.time()
+        resumed = self.db.execute(
+            "UPDATE writes SET status = 'queued', next_attempt_at = ? WHERE status = 'processing'", (now,)
+        ).rowcount
+        self.db.execute(
+            "DELETE FROM writes WHERE status IN ('done', 'failed') AND updated_at < ?", (now - RETENTION,)
+        )
+        if resumed:
+            logger.warning(f"Write queue: {resumed} interrupted write(s) queued again")
+        QUEUE_DEPTH.set(self.depth())
+
+    def depth(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM writes WHERE status IN ('queued', 'processing')").fetchone()[0]
+
+    def submit(
+        self, endpoint: str, data: dict[str, Any] | None, key: str | None = None, deduplicate: bool = False
+    ) -> dict[str, Any]:
+        """Enregistre un POST et retourne son ticket (le ticket existant si la clé est déjà connue)."""
+        endpoint = endpoint.strip("/")
+        payload = json.dumps(data or {}, sort_keys=True, default=str)
+        if key is None:
+            key = idempotency_key(endpoint, data) if deduplicate else secrets.token_hex(16)
+        existing = self.db.execute("SELECT * FROM writes WHERE idempotency_key = ?", (key,)).fetchone()
+        if existing:
+            if existing["endpoint"] != endpoint or existing["payload"] != payload:
+                raise ValueError(f"Idempotency key {key} already used for a different write")
+            return {**self._view(existing), "duplicate": True}
+
+        now = time.time()
+        ticket = f"wr_{secrets.token_urlsafe(12)}"
+        self.db.execute(
+            "INSERT INTO writes (ticket, idempotency_key, endpoint, payload, status, created_at, updated_at, next_attempt_at)"
+            " VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (ticket, key, endpoint, payload, now, now, now),
+        )
+        QUEUE_DEPTH.set(self.depth())
+        self._wakeup.set()
+        return self.ticket(ticket)
+
+    def ticket(self, ticket: str) -> dict[str, Any]:
+        """État d'une écriture (résultat de l'API une fois envoyée)."""
+        row = self.db.execute("SELECT * FROM writes WHERE ticket = ?", (ticket,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown write ticket: {ticket}")
+        return self._view(row)
+
+    def _view(self, row: sqlite3.Row) -> dict[str, Any]:
+        view: dict[str, Any] = {
+            "ticket": row["ticket"],
+            "status": row["status"],
+            "endpoint": row["endpoint"],
+            "idempotency_key": row["idempotency_key"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        if row["status"] == "queued":
+            view["position"] = self.db.execute(
+                "SELECT COUNT(*) FROM writes WHERE status = 'queued' AND created_at <= ?", (row["created_at"],)
+            ).fetchone()[0]
+            if row["attempts"]:
+                view["next_attempt_in"] = round(max(0.0, row["next_attempt_at"] - time.time()), 1)
+        if row["result"] is not None:
+            view["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            view["error"] = row["error"]
+        return view
+
+    def _next(self) -> sqlite3.Row | None:
+        return self.db.execute(
+            "SELECT * FROM writes WHERE status = 'queued' ORDER BY next_attempt_at, created_at LIMIT 1"
+        ).fetchone()
+
+    def _update(self, ticket: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self.db.execute(f"UPDATE writes SET {columns} WHERE ticket = ?", (*fields.values(), ticket))
+
+    async def _send(self, client: PennylaneClient, row: sqlite3.Row) -> None:
+        endpoint = row["endpoint"]
+        attempts = row["attempts"] + 1
+        self._update(row["ticket"], status="processing", attempts=attempts)
+        try:
+            result = await client.post(endpoint, json.loads(row["payload"]), headers={"Idempotency-Key": row["idempotency_key"]})
+        except Exception as e:
+            if _is_retryable(e) and attempts < self.max_attempts:
+                retry_after = getattr(e, "retry_after", None) or getattr(e, "retry_in", None)
+                if retry_after:
+                    self.bucket.penalize(retry_after)
+                delay = retry_after or min(_MAX_BACKOFF, 2 ** attempts) * random.uniform(0.5, 1.0)
+                self._update(row["ticket"], status="queued", error=str(e), next_attempt_at=time.time() + delay)
+                metrics.record_retry(endpoint)
+                logger.warning(f"Write {row['ticket']} to {endpoint} failed (attempt {attempts}), retrying in {delay:.1f}s: {e}")
+            else:
+                self._update(row["ticket"], status="failed", error=str(e))
+                QUEUE_WRITES.inc(endpoint=endpoint, result="failed")
+                logger.error(f"Write {row['ticket']} to {endpoint} failed permanently: {e}")
+            return
+        self._update(row["ticket"], status="done", error=None, result=json.dumps(result, ensure_ascii=False, default=str))
+        QUEUE_WRITES.inc(endpoint=endpoint, result="done")
+
+    async def run(self, client: PennylaneClient) -> None:
+        """Vide la file en continu (une écriture à la fois, au débit du seau à jetons)."""
+        while True:
+            row = self._next()
+            if row is None or row["next_attempt_at"] > time.time():
+                self._wakeup.clear()
+                timeout = row["next_attempt_at"] - time.time() if row is not None else _IDLE_POLL
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.bucket.acquire()
+            await self._send(client, row)
+            QUEUE_DEPTH.set(self.depth())
+
+    def start(self, client: PennylaneClient) -> None:
+        """Reprend les envois interrompus et lance le worker (un seul processus par base)."""
+        if self._task is None:
+            self._recover()
+            self._task = asyncio.create_task(self.run(client))
+
+    async def stop(self) -> None:
+        """Arrête le worker ; une écriture en cours d'envoi sera reprise au prochain démarrage."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.db.close()
+
+    def writer(self, key: str | None = None, deduplicate: bool = False) -> "QueuedWriter":
+        return QueuedWriter(self, key, deduplicate)
+
+
+class QueuedWriter:
+    """Remplace le client auprès des outils de création : le POST est mis en file et le ticket retourné."""
+
+    def __init__(self, queue: WriteQueue, key: str | None = None, deduplicate: bool = False):
+        self.queue = queue
+        self.key = key
+        self.deduplicate = deduplicate
+
+    async def post(self, endpoint: str, data: dict[str, Any] | None = None) -> dict[str, Any]:
+        return self.queue.submit(endpoint, data, self.key, self.deduplicate)
+
+
+queue: WriteQueue | None = None
+
+
+def configure_from_env() -> WriteQueue | None:
+    """Ouvre la file durable si `PENNYLANE_WRITE_QUEUE` est défini."""
+    global queue
+    if QUEUE_PATH and queue is None:
+        queue = WriteQueue(QUEUE_PATH)
+        logger.info(f"Write queue: {QUEUE_PATH} ({queue.depth()} pending, {WRITE_RATE}/s)")
+    return queue
+
+
+def get_ticket(ticket: str) -> dict[str, Any]:
+    if queue is None:
+        raise ValueError("Write queue is disabled (set PENNYLANE_WRITE_QUEUE)")
+    return queue.ticket(ticket)